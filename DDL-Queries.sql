@@ -75,6 +75,7 @@ CREATE TABLE [dbo].[Payment] (
     [PaidAt] UtcStamp,
     [Method] PaymentMethod NOT NULL,
     [Status] NVARCHAR(100) NOT NULL DEFAULT 'Pending',
+    [CreatedAt] UtcStamp NOT NULL DEFAULT GETUTCDATE(),
     CONSTRAINT [PK_Payment] PRIMARY KEY CLUSTERED ([PaymentId]),
     CONSTRAINT [CK_Method] CHECK ([Method] IN ('CreditCard','Cash')),
     CONSTRAINT [CK_Payment_Status] CHECK ([Status] IN ('Pending','Completed','Failed','Refunded')),
@@ -473,7 +474,7 @@ ADD CONSTRAINT [FK_VehicleTest_Vehicle]
     FOREIGN KEY ([InspectorId]) REFERENCES [dbo].[Inspector]([InspectorId])
     ON DELETE NO ACTION;
 
-/* VehicleAvailabilityDaily → Vehicle */
+/* DriverAvailability → UserServiceEnrollment, Geofencezone */
 ALTER TABLE [dbo].[DriverAvailability]
 ADD CONSTRAINT [FK_DriverAvailability_Enrollment]
     FOREIGN KEY ([EnrollId]) REFERENCES [dbo].[UserServiceEnrollment]([EnrollId])
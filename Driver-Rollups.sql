@@ -0,0 +1,132 @@
+-- ========================= Driver rating / earnings rollups ========================= --
+-- Summary tables per driver and per driver-day, kept current by triggers on Rating and
+-- Payment: every insert, update or delete applies its +/- delta, so profile and ranking
+-- pages read one row instead of aggregating the whole history.
+-- Counted: ratings whose TargetUserId is a Driver; payments to a Driver with
+-- Status = 'Completed' and a PaidAt.
+-- Rebuild / verify against the base tables with: python rollups.py --rebuild | --verify
+-- (archived payments included: they are read through dbo.PaymentHistory when it exists)
+-- Idempotent: safe to re-run.
+
+SET QUOTED_IDENTIFIER ON;
+GO
+
+IF OBJECT_ID('dbo.DriverRollup') IS NULL
+CREATE TABLE [dbo].[DriverRollup] (
+    [DriverUserId] UNIQUEIDENTIFIER NOT NULL,
+    [Ratings] INT NOT NULL DEFAULT 0,
+    [StarsSum] INT NOT NULL DEFAULT 0,
+    [Payments] INT NOT NULL DEFAULT 0,
+    [Gross] DECIMAL(14,2) NOT NULL DEFAULT 0,
+    [Fee] DECIMAL(14,2) NOT NULL DEFAULT 0,
+    [Payout] DECIMAL(14,2) NOT NULL DEFAULT 0,
+    [AvgStars] AS CAST([StarsSum] AS DECIMAL(9,4)) / NULLIF([Ratings], 0) PERSISTED,
+    [UpdatedAt] UtcStamp NOT NULL DEFAULT GETUTCDATE(),
+    CONSTRAINT [PK_DriverRollup] PRIMARY KEY CLUSTERED ([DriverUserId])
+);
+
+IF OBJECT_ID('dbo.DriverDailyRollup') IS NULL
+CREATE TABLE [dbo].[DriverDailyRollup] (
+    [DriverUserId] UNIQUEIDENTIFIER NOT NULL,
+    [Day] DATE NOT NULL,
+    [Ratings] INT NOT NULL DEFAULT 0,
+    [StarsSum] INT NOT NULL DEFAULT 0,
+    [Payments] INT NOT NULL DEFAULT 0,
+    [Gross] DECIMAL(14,2) NOT NULL DEFAULT 0,
+    [Fee] DECIMAL(14,2) NOT NULL DEFAULT 0,
+    [Payout] DECIMAL(14,2) NOT NULL DEFAULT 0,
+    CONSTRAINT [PK_DriverDailyRollup] PRIMARY KEY CLUSTERED ([DriverUserId], [Day])
+);
+
+-- Rankings: best rated / top earning drivers without sorting the table
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_DriverRollup_AvgStars' AND object_id = OBJECT_ID('dbo.DriverRollup'))
+CREATE NONCLUSTERED INDEX [IX_DriverRollup_AvgStars]
+    ON [dbo].[DriverRollup] ([AvgStars] DESC)
+    INCLUDE ([Ratings]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_DriverRollup_Payout' AND object_id = OBJECT_ID('dbo.DriverRollup'))
+CREATE NONCLUSTERED INDEX [IX_DriverRollup_Payout]
+    ON [dbo].[DriverRollup] ([Payout] DESC)
+    INCLUDE ([Payments], [Gross]);
+GO
+
+CREATE OR ALTER PROCEDURE [dbo].[ApplyDriverRollupDelta]
+AS
+BEGIN
+    -- Applies #RollupDelta (DriverUserId, Day, Ratings, StarsSum, Payments, Gross, Fee, Payout)
+    SET NOCOUNT ON;
+
+    MERGE dbo.DriverDailyRollup WITH (HOLDLOCK) AS t
+    USING #RollupDelta AS s
+    ON t.DriverUserId = s.DriverUserId AND t.[Day] = s.[Day]
+    WHEN MATCHED THEN UPDATE SET
+        Ratings = t.Ratings + s.Ratings, StarsSum = t.StarsSum + s.StarsSum,
+        Payments = t.Payments + s.Payments, Gross = t.Gross + s.Gross,
+        Fee = t.Fee + s.Fee, Payout = t.Payout + s.Payout
+    WHEN NOT MATCHED THEN INSERT (DriverUserId, [Day], Ratings, StarsSum, Payments, Gross, Fee, Payout)
+        VALUES (s.DriverUserId, s.[Day], s.Ratings, s.StarsSum, s.Payments, s.Gross, s.Fee, s.Payout);
+
+    MERGE dbo.DriverRollup WITH (HOLDLOCK) AS t
+    USING (SELECT DriverUserId, SUM(Ratings) AS Ratings, SUM(StarsSum) AS StarsSum, SUM(Payments) AS Payments,
+                  SUM(Gross) AS Gross, SUM(Fee) AS Fee, SUM(Payout) AS Payout
+           FROM #RollupDelta GROUP BY DriverUserId) AS s
+    ON t.DriverUserId = s.DriverUserId
+    WHEN MATCHED THEN UPDATE SET
+        Ratings = t.Ratings + s.Ratings, StarsSum = t.StarsSum + s.StarsSum,
+        Payments = t.Payments + s.Payments, Gross = t.Gross + s.Gross,
+        Fee = t.Fee + s.Fee, Payout = t.Payout + s.Payout, UpdatedAt = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN INSERT (DriverUserId, Ratings, StarsSum, Payments, Gross, Fee, Payout)
+        VALUES (s.DriverUserId, s.Ratings, s.StarsSum, s.Payments, s.Gross, s.Fee, s.Payout);
+END;
+GO
+
+CREATE OR ALTER TRIGGER [dbo].[TR_Rating_DriverRollup] ON [dbo].[Rating]
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    SELECT d.DriverUserId, d.[Day], SUM(d.Ratings) AS Ratings, SUM(d.Stars) AS StarsSum,
+           0 AS Payments, CAST(0 AS DECIMAL(14,2)) AS Gross, CAST(0 AS DECIMAL(14,2)) AS Fee,
+           CAST(0 AS DECIMAL(14,2)) AS Payout
+    INTO #RollupDelta
+    FROM (SELECT TargetUserId AS DriverUserId, CAST(CreatedAt AS DATE) AS [Day], 1 AS Ratings, Stars FROM inserted
+          UNION ALL
+          SELECT TargetUserId, CAST(CreatedAt AS DATE), -1, -Stars FROM deleted) AS d
+    WHERE EXISTS (SELECT 1 FROM dbo.Driver dr WHERE dr.UserId = d.DriverUserId)
+    GROUP BY d.DriverUserId, d.[Day]
+    HAVING SUM(d.Ratings) <> 0 OR SUM(d.Stars) <> 0;
+
+    IF @@ROWCOUNT > 0
+        EXEC dbo.ApplyDriverRollupDelta;
+END;
+GO
+
+CREATE OR ALTER TRIGGER [dbo].[TR_Payment_DriverRollup] ON [dbo].[Payment]
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- archiver.py moving payments to PaymentArchive is not a retraction: keep the totals
+    IF CAST(SESSION_CONTEXT(N'archiving') AS INT) = 1
+        RETURN;
+
+    SELECT d.DriverUserId, d.[Day], 0 AS Ratings, 0 AS StarsSum, SUM(d.Payments) AS Payments,
+           CAST(SUM(d.Gross) AS DECIMAL(14,2)) AS Gross, CAST(SUM(d.Fee) AS DECIMAL(14,2)) AS Fee,
+           CAST(SUM(d.Payout) AS DECIMAL(14,2)) AS Payout
+    INTO #RollupDelta
+    FROM (SELECT ReceiverUserId AS DriverUserId, CAST(PaidAt AS DATE) AS [Day], 1 AS Payments,
+                 GrossAmount AS Gross, OsrhFee AS Fee, DriverPayout AS Payout
+          FROM inserted WHERE [Status] = 'Completed' AND PaidAt IS NOT NULL
+          UNION ALL
+          SELECT ReceiverUserId, CAST(PaidAt AS DATE), -1, -GrossAmount, -OsrhFee, -DriverPayout
+          FROM deleted WHERE [Status] = 'Completed' AND PaidAt IS NOT NULL) AS d
+    WHERE EXISTS (SELECT 1 FROM dbo.Driver dr WHERE dr.UserId = d.DriverUserId)
+    GROUP BY d.DriverUserId, d.[Day]
+    HAVING SUM(d.Payments) <> 0 OR SUM(d.Gross) <> 0 OR SUM(d.Fee) <> 0 OR SUM(d.Payout) <> 0;
+
+    IF @@ROWCOUNT > 0
+        EXEC dbo.ApplyDriverRollupDelta;
+END;
+GO
@@ -0,0 +1,249 @@
+-- ========================= Hot / cold history archive ========================= --
+-- Cold twins of the unbounded history tables. Aged rows are moved by
+-- archiver.py with DELETE ... OUTPUT INTO, so the live tables (and their clustered
+-- indexes) only hold recent rows and hot-path queries never read history.
+-- Reporting reads the *History views: the live table UNION ALL its archive.
+-- Archive tables carry no FKs, CHECKs or triggers (OUTPUT INTO requires it); the
+-- archiver only moves rows nothing live still references (see Referential_Actions.md).
+-- Idempotent: safe to re-run.
+
+SET QUOTED_IDENTIFIER ON;
+GO
+
+-- Failed and refunded payments have no PaidAt and often no ride: they age by CreatedAt.
+-- Rows older than the column are stamped with the time it is added.
+IF COL_LENGTH('dbo.Payment', 'CreatedAt') IS NULL
+    ALTER TABLE dbo.Payment ADD [CreatedAt] UtcStamp NOT NULL
+        CONSTRAINT [DF_Payment_CreatedAt] DEFAULT GETUTCDATE();
+IF COL_LENGTH('dbo.PaymentArchive', 'CreatedAt') IS NULL AND OBJECT_ID('dbo.PaymentArchive') IS NOT NULL
+    ALTER TABLE dbo.PaymentArchive ADD [CreatedAt] UtcStamp NULL;
+GO
+
+IF OBJECT_ID('dbo.RideArchive') IS NULL
+BEGIN
+    CREATE TABLE [dbo].[RideArchive] (
+        [RideId] INT NOT NULL,
+        [OfferId] INT NOT NULL,
+        [DriverUserId] UNIQUEIDENTIFIER NOT NULL,
+        [PassengerUserId] UNIQUEIDENTIFIER NOT NULL,
+        [VehicleId] UNIQUEIDENTIFIER NOT NULL,
+        [StartedAt] UtcStamp NOT NULL,
+        [EndedAt] UtcStamp NOT NULL,
+        [PriceFinal] DECIMAL(12,2) NOT NULL,
+        [Status] NVARCHAR(100) NOT NULL,
+        [Rating] INT,
+        [Payment] UNIQUEIDENTIFIER,
+        CONSTRAINT [PK_RideArchive] PRIMARY KEY NONCLUSTERED ([RideId])
+    );
+    CREATE CLUSTERED INDEX [CIX_RideArchive_StartedAt] ON [dbo].[RideArchive] ([StartedAt], [RideId])
+        WITH (DATA_COMPRESSION = PAGE);
+    CREATE NONCLUSTERED INDEX [IX_RideArchive_DriverUserId_StartedAt]
+        ON [dbo].[RideArchive] ([DriverUserId], [StartedAt] DESC) WITH (DATA_COMPRESSION = PAGE);
+    CREATE NONCLUSTERED INDEX [IX_RideArchive_PassengerUserId_StartedAt]
+        ON [dbo].[RideArchive] ([PassengerUserId], [StartedAt] DESC) WITH (DATA_COMPRESSION = PAGE);
+    CREATE NONCLUSTERED INDEX [IX_RideArchive_Payment]
+        ON [dbo].[RideArchive] ([Payment]) WHERE [Payment] IS NOT NULL;
+END;
+
+IF OBJECT_ID('dbo.PaymentArchive') IS NULL
+BEGIN
+    CREATE TABLE [dbo].[PaymentArchive] (
+        [PaymentId] UNIQUEIDENTIFIER NOT NULL,
+        [SenderUserId] UNIQUEIDENTIFIER NOT NULL,
+        [ReceiverUserId] UNIQUEIDENTIFIER NOT NULL,
+        [GrossAmount] MoneyAmount NOT NULL,
+        [OsrhFee] MoneyAmount NOT NULL,
+        [DriverPayout] MoneyAmount NOT NULL,
+        [PaidAt] UtcStamp,
+        [Method] PaymentMethod NOT NULL,
+        [Status] NVARCHAR(100) NOT NULL,
+        [CreatedAt] UtcStamp NULL,
+        CONSTRAINT [PK_PaymentArchive] PRIMARY KEY NONCLUSTERED ([PaymentId])
+    );
+    CREATE CLUSTERED INDEX [CIX_PaymentArchive_CreatedAt] ON [dbo].[PaymentArchive] ([CreatedAt], [PaymentId])
+        WITH (DATA_COMPRESSION = PAGE);
+    CREATE NONCLUSTERED INDEX [IX_PaymentArchive_SenderUserId]
+        ON [dbo].[PaymentArchive] ([SenderUserId], [PaidAt]) INCLUDE ([GrossAmount], [Status])
+        WITH (DATA_COMPRESSION = PAGE);
+    CREATE NONCLUSTERED INDEX [IX_PaymentArchive_ReceiverUserId]
+        ON [dbo].[PaymentArchive] ([ReceiverUserId], [PaidAt]) INCLUDE ([GrossAmount], [OsrhFee], [DriverPayout], [Status])
+        WITH (DATA_COMPRESSION = PAGE);
+END;
+
+-- Older archives are clustered on PaidAt, which is NULL for every unpaid payment: re-cluster
+-- them on (CreatedAt, PaymentId), which every row has and both archiver passes roughly follow.
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'CIX_PaymentArchive_PaidAt' AND object_id = OBJECT_ID('dbo.PaymentArchive'))
+BEGIN
+    DROP INDEX [CIX_PaymentArchive_PaidAt] ON [dbo].[PaymentArchive];
+    CREATE CLUSTERED INDEX [CIX_PaymentArchive_CreatedAt] ON [dbo].[PaymentArchive] ([CreatedAt], [PaymentId])
+        WITH (DATA_COMPRESSION = PAGE);
+END;
+
+IF OBJECT_ID('dbo.InAppMessageArchive') IS NULL
+BEGIN
+    CREATE TABLE [dbo].[InAppMessageArchive] (
+        [MsgId] INT NOT NULL,
+        [SenderUserId] UNIQUEIDENTIFIER NOT NULL,
+        [RecipientUserId] UNIQUEIDENTIFIER NOT NULL,
+        [Body] NVARCHAR(MAX) NOT NULL,
+        [SentAt] UtcStamp NOT NULL,
+        [Ride] INT NOT NULL,
+        CONSTRAINT [PK_InAppMessageArchive] PRIMARY KEY NONCLUSTERED ([MsgId])
+    );
+    -- A conversation is read per ride
+    CREATE CLUSTERED INDEX [CIX_InAppMessageArchive_Ride] ON [dbo].[InAppMessageArchive] ([Ride], [SentAt])
+        WITH (DATA_COMPRESSION = PAGE);
+END;
+
+IF OBJECT_ID('dbo.DispatchOfferArchive') IS NULL
+BEGIN
+    CREATE TABLE [dbo].[DispatchOfferArchive] (
+        [OfferId] INT NOT NULL,
+        [LegId] INT NOT NULL,
+        [RecipientUserId] UNIQUEIDENTIFIER NOT NULL,
+        [Status] NVARCHAR(100) NOT NULL,
+        [SentAt] UtcStamp,
+        [RespondedAt] UtcStamp,
+        CONSTRAINT [PK_DispatchOfferArchive] PRIMARY KEY NONCLUSTERED ([OfferId])
+    );
+    CREATE CLUSTERED INDEX [CIX_DispatchOfferArchive_SentAt] ON [dbo].[DispatchOfferArchive] ([SentAt], [OfferId])
+        WITH (DATA_COMPRESSION = PAGE);
+    CREATE NONCLUSTERED INDEX [IX_DispatchOfferArchive_LegId]
+        ON [dbo].[DispatchOfferArchive] ([LegId]) WITH (DATA_COMPRESSION = PAGE);
+    CREATE NONCLUSTERED INDEX [IX_DispatchOfferArchive_RecipientUserId]
+        ON [dbo].[DispatchOfferArchive] ([RecipientUserId], [SentAt] DESC) WITH (DATA_COMPRESSION = PAGE);
+END;
+
+-- Same clustered key as the live log, so LogEntryId range reads merge both halves in order
+IF OBJECT_ID('dbo.RideRequestLogArchive') IS NULL
+CREATE TABLE [dbo].[RideRequestLogArchive] (
+    [LogEntryId] BIGINT NOT NULL,
+    [RequestId] INT NOT NULL,
+    [Operation] CHAR(1) NOT NULL,
+    [ChangedAt] DATETIME2(3) NOT NULL,
+    [ChangedBy] UNIQUEIDENTIFIER NULL,
+    [PassengerId] UNIQUEIDENTIFIER NOT NULL,
+    [NumOfPeople] INT NOT NULL,
+    [PickupAt] UtcStamp NOT NULL,
+    [PickupLat] DECIMAL(9,6) NOT NULL,
+    [PickupLng] DECIMAL(9,6) NOT NULL,
+    [DropLat] DECIMAL(9,6) NOT NULL,
+    [DropLng] DECIMAL(9,6) NOT NULL,
+    [PickupCountry] LongText,
+    [PickupRegion] LongText,
+    [PickupCity] LongText,
+    [PickupDistrict] LongText,
+    [PickupPostalCode] LongText,
+    [DropCountry] LongText,
+    [DropRegion] LongText,
+    [DropCity] LongText,
+    [DropDistrict] LongText,
+    [DropPostalCode] LongText,
+    [CreatedAt] UtcStamp NOT NULL,
+    [UpdatedAt] UtcStamp,
+    [Status] NVARCHAR(100) NOT NULL,
+    [RideProfileId] UNIQUEIDENTIFIER NOT NULL,
+    CONSTRAINT [PK_RideRequestLogArchive] PRIMARY KEY CLUSTERED ([LogEntryId]) WITH (DATA_COMPRESSION = PAGE)
+);
+
+-- One row per archived table: cutoff of the current run and rows moved so far
+IF OBJECT_ID('dbo.ArchiveProgress') IS NULL
+CREATE TABLE [dbo].[ArchiveProgress] (
+    [TableName] NVARCHAR(100) NOT NULL,
+    [Cutoff] DATETIME2(3) NOT NULL,
+    [RowsMoved] BIGINT NOT NULL DEFAULT 0,
+    [Batches] INT NOT NULL DEFAULT 0,
+    [StartedAt] DATETIME2(3) NOT NULL DEFAULT SYSUTCDATETIME(),
+    [UpdatedAt] DATETIME2(3) NOT NULL DEFAULT SYSUTCDATETIME(),
+    [FinishedAt] DATETIME2(3),
+    CONSTRAINT [PK_ArchiveProgress] PRIMARY KEY CLUSTERED ([TableName])
+);
+
+-- Live-table indexes the archiver seeks on: age order, and "still referenced by a live ride"
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Ride_StartedAt' AND object_id = OBJECT_ID('dbo.Ride'))
+CREATE NONCLUSTERED INDEX [IX_Ride_StartedAt]
+    ON [dbo].[Ride] ([StartedAt])
+    INCLUDE ([Status]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Ride_Payment' AND object_id = OBJECT_ID('dbo.Ride'))
+CREATE NONCLUSTERED INDEX [IX_Ride_Payment]
+    ON [dbo].[Ride] ([Payment])
+    WHERE [Payment] IS NOT NULL;
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Ride_OfferId' AND object_id = OBJECT_ID('dbo.Ride'))
+CREATE NONCLUSTERED INDEX [IX_Ride_OfferId]
+    ON [dbo].[Ride] ([OfferId]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_InAppMessage_Ride_SentAt' AND object_id = OBJECT_ID('dbo.InAppMessage'))
+CREATE NONCLUSTERED INDEX [IX_InAppMessage_Ride_SentAt]
+    ON [dbo].[InAppMessage] ([Ride], [SentAt]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Payment_PaidAt' AND object_id = OBJECT_ID('dbo.Payment'))
+CREATE NONCLUSTERED INDEX [IX_Payment_PaidAt]
+    ON [dbo].[Payment] ([PaidAt])
+    INCLUDE ([Status]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Payment_Unpaid_CreatedAt' AND object_id = OBJECT_ID('dbo.Payment'))
+CREATE NONCLUSTERED INDEX [IX_Payment_Unpaid_CreatedAt]
+    ON [dbo].[Payment] ([CreatedAt])
+    INCLUDE ([Status])
+    WHERE [PaidAt] IS NULL;
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_DispatchOffer_SentAt' AND object_id = OBJECT_ID('dbo.DispatchOffer'))
+CREATE NONCLUSTERED INDEX [IX_DispatchOffer_SentAt]
+    ON [dbo].[DispatchOffer] ([SentAt])
+    INCLUDE ([Status]);
+GO
+
+-- ---------- unified views for reporting ----------
+CREATE OR ALTER VIEW [dbo].[RideHistory] AS
+SELECT RideId, OfferId, DriverUserId, PassengerUserId, VehicleId, StartedAt, EndedAt, PriceFinal, [Status],
+       Rating, Payment, CAST(0 AS BIT) AS IsArchived
+FROM dbo.Ride
+UNION ALL
+SELECT RideId, OfferId, DriverUserId, PassengerUserId, VehicleId, StartedAt, EndedAt, PriceFinal, [Status],
+       Rating, Payment, CAST(1 AS BIT)
+FROM dbo.RideArchive;
+GO
+
+CREATE OR ALTER VIEW [dbo].[PaymentHistory] AS
+SELECT PaymentId, SenderUserId, ReceiverUserId, GrossAmount, OsrhFee, DriverPayout, PaidAt, Method, [Status],
+       CreatedAt, CAST(0 AS BIT) AS IsArchived
+FROM dbo.Payment
+UNION ALL
+SELECT PaymentId, SenderUserId, ReceiverUserId, GrossAmount, OsrhFee, DriverPayout, PaidAt, Method, [Status],
+       CreatedAt, CAST(1 AS BIT)
+FROM dbo.PaymentArchive;
+GO
+
+CREATE OR ALTER VIEW [dbo].[InAppMessageHistory] AS
+SELECT MsgId, SenderUserId, RecipientUserId, Body, SentAt, [Ride], CAST(0 AS BIT) AS IsArchived
+FROM dbo.InAppMessage
+UNION ALL
+SELECT MsgId, SenderUserId, RecipientUserId, Body, SentAt, [Ride], CAST(1 AS BIT)
+FROM dbo.InAppMessageArchive;
+GO
+
+CREATE OR ALTER VIEW [dbo].[DispatchOfferHistory] AS
+SELECT OfferId, LegId, RecipientUserId, [Status], SentAt, RespondedAt, CAST(0 AS BIT) AS IsArchived
+FROM dbo.DispatchOffer
+UNION ALL
+SELECT OfferId, LegId, RecipientUserId, [Status], SentAt, RespondedAt, CAST(1 AS BIT)
+FROM dbo.DispatchOfferArchive;
+GO
+
+CREATE OR ALTER VIEW [dbo].[RideRequestLogHistory] AS
+SELECT LogEntryId, RequestId, Operation, ChangedAt, ChangedBy, PassengerId, NumOfPeople, PickupAt,
+       PickupLat, PickupLng, DropLat, DropLng,
+       PickupCountry, PickupRegion, PickupCity, PickupDistrict, PickupPostalCode,
+       DropCountry, DropRegion, DropCity, DropDistrict, DropPostalCode,
+       CreatedAt, UpdatedAt, [Status], RideProfileId, CAST(0 AS BIT) AS IsArchived
+FROM dbo.RideRequestLog
+UNION ALL
+SELECT LogEntryId, RequestId, Operation, ChangedAt, ChangedBy, PassengerId, NumOfPeople, PickupAt,
+       PickupLat, PickupLng, DropLat, DropLng,
+       PickupCountry, PickupRegion, PickupCity, PickupDistrict, PickupPostalCode,
+       DropCountry, DropRegion, DropCity, DropDistrict, DropPostalCode,
+       CreatedAt, UpdatedAt, [Status], RideProfileId, CAST(1 AS BIT)
+FROM dbo.RideRequestLogArchive;
+GO
@@ -0,0 +1,119 @@
+-- ============================ Secondary index pack v1 ============================ --
+-- Nonclustered indexes for the query workload in benchmark.py (WORKLOAD) and for the
+-- FK columns used by cascade deletes (see Referential_Actions.md).
+-- Idempotent: every index is created only if it does not exist yet.
+-- Measure with: python benchmark.py --index-pack Index-Pack-v1.sql
+
+SET QUOTED_IDENTIFIER ON;
+GO
+
+-- RideRequest: ride history per passenger, newest first
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_RideRequest_PassengerId_CreatedAt' AND object_id = OBJECT_ID('dbo.RideRequest'))
+CREATE NONCLUSTERED INDEX [IX_RideRequest_PassengerId_CreatedAt]
+    ON [dbo].[RideRequest] ([PassengerId], [CreatedAt] DESC)
+    INCLUDE ([Status], [RideProfileId], [NumOfPeople]);
+
+-- RideRequest: open requests by age (dispatch queue)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_RideRequest_Pending_CreatedAt' AND object_id = OBJECT_ID('dbo.RideRequest'))
+CREATE NONCLUSTERED INDEX [IX_RideRequest_Pending_CreatedAt]
+    ON [dbo].[RideRequest] ([CreatedAt])
+    INCLUDE ([PassengerId], [RideProfileId], [PickupLat], [PickupLng])
+    WHERE [Status] = 'Pending';
+
+-- RideRequest: status dashboards
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_RideRequest_Status_CreatedAt' AND object_id = OBJECT_ID('dbo.RideRequest'))
+CREATE NONCLUSTERED INDEX [IX_RideRequest_Status_CreatedAt]
+    ON [dbo].[RideRequest] ([Status], [CreatedAt]);
+
+-- ItineraryLeg: legs of a request (UQ_ItineraryLeg_SeqNo_RideRequest leads with SeqNo)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ItineraryLeg_RideRequestId' AND object_id = OBJECT_ID('dbo.ItineraryLeg'))
+CREATE NONCLUSTERED INDEX [IX_ItineraryLeg_RideRequestId]
+    ON [dbo].[ItineraryLeg] ([RideRequestId], [SeqNo])
+    INCLUDE ([ViaBridgeId]);
+
+-- LegCrossesBridge: cascade from Bridge
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LegCrossesBridge_Bridge' AND object_id = OBJECT_ID('dbo.LegCrossesBridge'))
+CREATE NONCLUSTERED INDEX [IX_LegCrossesBridge_Bridge]
+    ON [dbo].[LegCrossesBridge] ([Bridge]);
+
+-- DispatchOffer: offers per leg
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_DispatchOffer_LegId' AND object_id = OBJECT_ID('dbo.DispatchOffer'))
+CREATE NONCLUSTERED INDEX [IX_DispatchOffer_LegId]
+    ON [dbo].[DispatchOffer] ([LegId])
+    INCLUDE ([RecipientUserId], [Status]);
+
+-- DispatchOffer: all offers of a driver (and cascade from User)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_DispatchOffer_RecipientUserId' AND object_id = OBJECT_ID('dbo.DispatchOffer'))
+CREATE NONCLUSTERED INDEX [IX_DispatchOffer_RecipientUserId]
+    ON [dbo].[DispatchOffer] ([RecipientUserId], [SentAt] DESC)
+    INCLUDE ([LegId], [Status]);
+
+-- DispatchOffer: open offers of a driver
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_DispatchOffer_Recipient_Sent' AND object_id = OBJECT_ID('dbo.DispatchOffer'))
+CREATE NONCLUSTERED INDEX [IX_DispatchOffer_Recipient_Sent]
+    ON [dbo].[DispatchOffer] ([RecipientUserId], [SentAt])
+    INCLUDE ([LegId])
+    WHERE [Status] = 'Sent';
+
+-- Ride: history per driver / passenger, offer lookup
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Ride_DriverUserId_StartedAt' AND object_id = OBJECT_ID('dbo.Ride'))
+CREATE NONCLUSTERED INDEX [IX_Ride_DriverUserId_StartedAt]
+    ON [dbo].[Ride] ([DriverUserId], [StartedAt] DESC)
+    INCLUDE ([PassengerUserId], [PriceFinal], [Status], [Rating], [Payment]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Ride_PassengerUserId_StartedAt' AND object_id = OBJECT_ID('dbo.Ride'))
+CREATE NONCLUSTERED INDEX [IX_Ride_PassengerUserId_StartedAt]
+    ON [dbo].[Ride] ([PassengerUserId], [StartedAt] DESC)
+    INCLUDE ([DriverUserId], [PriceFinal], [Status]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Ride_OfferId' AND object_id = OBJECT_ID('dbo.Ride'))
+CREATE NONCLUSTERED INDEX [IX_Ride_OfferId]
+    ON [dbo].[Ride] ([OfferId]);
+
+-- Payment: sender / receiver totals
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Payment_SenderUserId' AND object_id = OBJECT_ID('dbo.Payment'))
+CREATE NONCLUSTERED INDEX [IX_Payment_SenderUserId]
+    ON [dbo].[Payment] ([SenderUserId], [PaidAt])
+    INCLUDE ([GrossAmount], [Status]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Payment_ReceiverUserId' AND object_id = OBJECT_ID('dbo.Payment'))
+CREATE NONCLUSTERED INDEX [IX_Payment_ReceiverUserId]
+    ON [dbo].[Payment] ([ReceiverUserId], [PaidAt])
+    INCLUDE ([GrossAmount], [OsrhFee], [DriverPayout], [Status]);
+
+-- Rating: per-target averages, author FK
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Rating_TargetUserId' AND object_id = OBJECT_ID('dbo.Rating'))
+CREATE NONCLUSTERED INDEX [IX_Rating_TargetUserId]
+    ON [dbo].[Rating] ([TargetUserId])
+    INCLUDE ([Stars], [CreatedAt]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Rating_AuthorUserId' AND object_id = OBJECT_ID('dbo.Rating'))
+CREATE NONCLUSTERED INDEX [IX_Rating_AuthorUserId]
+    ON [dbo].[Rating] ([AuthorUserId]);
+
+-- InAppMessage: conversation of a ride (and cascade from Ride)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_InAppMessage_Ride_SentAt' AND object_id = OBJECT_ID('dbo.InAppMessage'))
+CREATE NONCLUSTERED INDEX [IX_InAppMessage_Ride_SentAt]
+    ON [dbo].[InAppMessage] ([Ride], [SentAt])
+    INCLUDE ([SenderUserId], [RecipientUserId]);
+
+-- PersonDocument / VehicleDocument: expiry scans and cascades from owner
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PersonDocument_ExpiryDate' AND object_id = OBJECT_ID('dbo.PersonDocument'))
+CREATE NONCLUSTERED INDEX [IX_PersonDocument_ExpiryDate]
+    ON [dbo].[PersonDocument] ([ExpiryDate])
+    INCLUDE ([UserId], [DocType]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PersonDocument_UserId' AND object_id = OBJECT_ID('dbo.PersonDocument'))
+CREATE NONCLUSTERED INDEX [IX_PersonDocument_UserId]
+    ON [dbo].[PersonDocument] ([UserId]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VehicleDocument_ExpiryDate' AND object_id = OBJECT_ID('dbo.VehicleDocument'))
+CREATE NONCLUSTERED INDEX [IX_VehicleDocument_ExpiryDate]
+    ON [dbo].[VehicleDocument] ([ExpiryDate])
+    INCLUDE ([VehicleId], [DocType]);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VehicleDocument_VehicleId' AND object_id = OBJECT_ID('dbo.VehicleDocument'))
+CREATE NONCLUSTERED INDEX [IX_VehicleDocument_VehicleId]
+    ON [dbo].[VehicleDocument] ([VehicleId]);
+
+GO
@@ -0,0 +1,76 @@
+-- ======================= RideRequestLog change consumer ======================= --
+-- Trigger that appends an I/U/D snapshot of every RideRequest change to RideRequestLog,
+-- plus the tables request_log_consumer.py keeps its watermark and aggregates in.
+-- Idempotent: safe to re-run.
+
+SET QUOTED_IDENTIFIER ON;
+GO
+
+-- The log has to outlive the request it describes: with this FK in place every logged request
+-- becomes undeletable (including the Passenger/User cascade) and the 'D' branch below can never commit
+IF EXISTS (SELECT 1 FROM sys.foreign_keys WHERE name = 'FK_RideRequestLog_RideRequest')
+    ALTER TABLE dbo.RideRequestLog DROP CONSTRAINT FK_RideRequestLog_RideRequest;
+GO
+
+CREATE OR ALTER TRIGGER [dbo].[TR_RideRequest_Log] ON [dbo].[RideRequest]
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    INSERT dbo.RideRequestLog (RequestId, Operation, PassengerId, NumOfPeople, PickupAt,
+        PickupLat, PickupLng, DropLat, DropLng,
+        PickupCountry, PickupRegion, PickupCity, PickupDistrict, PickupPostalCode,
+        DropCountry, DropRegion, DropCity, DropDistrict, DropPostalCode,
+        CreatedAt, UpdatedAt, [Status], RideProfileId)
+    SELECT i.RequestId, CASE WHEN EXISTS (SELECT 1 FROM deleted) THEN 'U' ELSE 'I' END,
+        i.PassengerId, i.NumOfPeople, i.PickupAt, i.PickupLat, i.PickupLng, i.DropLat, i.DropLng,
+        i.PickupCountry, i.PickupRegion, i.PickupCity, i.PickupDistrict, i.PickupPostalCode,
+        i.DropCountry, i.DropRegion, i.DropCity, i.DropDistrict, i.DropPostalCode,
+        i.CreatedAt, i.UpdatedAt, i.[Status], i.RideProfileId
+    FROM inserted i;
+
+    INSERT dbo.RideRequestLog (RequestId, Operation, PassengerId, NumOfPeople, PickupAt,
+        PickupLat, PickupLng, DropLat, DropLng,
+        PickupCountry, PickupRegion, PickupCity, PickupDistrict, PickupPostalCode,
+        DropCountry, DropRegion, DropCity, DropDistrict, DropPostalCode,
+        CreatedAt, UpdatedAt, [Status], RideProfileId)
+    SELECT d.RequestId, 'D',
+        d.PassengerId, d.NumOfPeople, d.PickupAt, d.PickupLat, d.PickupLng, d.DropLat, d.DropLng,
+        d.PickupCountry, d.PickupRegion, d.PickupCity, d.PickupDistrict, d.PickupPostalCode,
+        d.DropCountry, d.DropRegion, d.DropCity, d.DropDistrict, d.DropPostalCode,
+        d.CreatedAt, d.UpdatedAt, d.[Status], d.RideProfileId
+    FROM deleted d
+    WHERE NOT EXISTS (SELECT 1 FROM inserted);
+END;
+GO
+
+-- Last LogEntryId applied, per consumer
+IF OBJECT_ID('dbo.ChangeConsumerWatermark') IS NULL
+CREATE TABLE [dbo].[ChangeConsumerWatermark] (
+    [Consumer] NVARCHAR(100) NOT NULL,
+    [LastLogEntryId] BIGINT NOT NULL DEFAULT 0,
+    [UpdatedAt] UtcStamp NOT NULL DEFAULT GETUTCDATE(),
+    CONSTRAINT [PK_ChangeConsumerWatermark] PRIMARY KEY CLUSTERED ([Consumer])
+);
+
+-- Live request counts per dimension: status, zone (pickup), hour (CreatedAt) and profile
+IF OBJECT_ID('dbo.RideRequestSummary') IS NULL
+CREATE TABLE [dbo].[RideRequestSummary] (
+    [Dimension] VARCHAR(20) NOT NULL,
+    [Key] NVARCHAR(100) NOT NULL,
+    [Requests] INT NOT NULL,
+    CONSTRAINT [PK_RideRequestSummary] PRIMARY KEY CLUSTERED ([Dimension], [Key])
+);
+
+-- What each request currently contributes to the summary, so updates and deletes can retract it
+IF OBJECT_ID('dbo.RideRequestSummaryState') IS NULL
+CREATE TABLE [dbo].[RideRequestSummaryState] (
+    [RequestId] INT NOT NULL,
+    [Status] NVARCHAR(100) NOT NULL,
+    [Zone] NVARCHAR(100) NOT NULL,
+    [Hour] NVARCHAR(100) NOT NULL,
+    [Profile] NVARCHAR(100) NOT NULL,
+    CONSTRAINT [PK_RideRequestSummaryState] PRIMARY KEY CLUSTERED ([RequestId])
+);
+GO
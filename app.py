@@ -1,23 +1,76 @@
-from flask import Flask, render_template_string, request
+from flask import Flask, Response, jsonify, render_template_string, request, stream_with_context
+from markupsafe import escape
 import pyodbc
 from dotenv import load_dotenv
 import os
 
+from db import connect
+from db_pool import ConnectionPool, pool_size_for_worker
+from export import FORMATS, available_formats, export_chunks
+from keyset import KeysetQuery, TokenError, make_token, read_token
+from query_cache import QueryCache
+from query_executor import DeadlineExceeded, QueryExecutor, Saturated
+from query_profiler import QueryProfile, SlowQueryLog
+
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 
-# Adjust for your server/auth
-CN_STR = (
-    "Driver={ODBC Driver 21 for SQL Server};"
-    f"Server={os.getenv('DB_HOST')},1433;"
-    f"Database={os.getenv('DB_NAME')};"
-    f"UID={os.getenv('DB_NAME')};PWD={os.getenv('DB_PASS')};"
-    "Encrypt=yes;TrustServerCertificate=yes"
+def _setup_connection(conn):
+    conn.add_output_converter(pyodbc.SQL_WVARCHAR, lambda x: x)  # basic
+
+
+# One pool per worker process, created at startup and shared by all requests
+pool = ConnectionPool(
+    lambda: connect(timeout=10),
+    max_size=pool_size_for_worker(),
+    min_size=int(os.getenv("DB_POOL_MIN", "0")),
+    max_idle=int(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    checkout_timeout=int(os.getenv("DB_POOL_TIMEOUT", "10")),
+    on_connect=_setup_connection,
+)
+
+# Console queries run on a bounded worker pool with a per-query deadline and admission limits
+executor = QueryExecutor(
+    pool,
+    workers=int(os.getenv("CONSOLE_WORKERS", str(pool.max_size))),
+    max_queue=int(os.getenv("CONSOLE_MAX_QUEUE", "16")),
+    per_user=int(os.getenv("CONSOLE_PER_USER", "2")),
+    deadline=int(os.getenv("CONSOLE_DEADLINE", "30")),
 )
 
-PAGE = """
+# Optional result cache for the non-streaming console (QUERY_CACHE=1 to enable)
+cache = None
+if os.getenv("QUERY_CACHE", "0") == "1":
+    cache = QueryCache(
+        ttl=int(os.getenv("QUERY_CACHE_TTL", "60")),
+        max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256")),
+        max_cells=int(os.getenv("QUERY_CACHE_MAX_CELLS", "1000000")),
+    )
+
+# Optional profiling (QUERY_PROFILE=1): per-phase timings of console queries, with the
+# slowest kept in a ring buffer shown at /slow
+slow_log = None
+if os.getenv("QUERY_PROFILE", "0") == "1":
+    slow_log = SlowQueryLog(
+        capacity=int(os.getenv("SLOW_QUERY_LOG_SIZE", "200")),
+        threshold_ms=float(os.getenv("SLOW_QUERY_MS", "500")),
+    )
+
+# Paging: queries with an ORDER BY on plain columns (or an explicit page key) are paged by
+# keyset; the continuation token is signed, so set CONSOLE_SECRET when running several workers
+PAGE_SIZE = int(os.getenv("CONSOLE_PAGE_SIZE", "100"))
+CONSOLE_SECRET = (os.getenv("CONSOLE_SECRET") or os.urandom(16).hex()).encode()
+
+# Streaming mode: rows are pulled with fetchmany and flushed as HTML chunks
+STREAM_BATCH = int(os.getenv("STREAM_BATCH", "500"))
+STREAM_MAX_ROWS = int(os.getenv("STREAM_MAX_ROWS", "100000"))
+
+# Export: full results, no row cap, fetched EXPORT_BATCH rows at a time
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", "10000"))
+
+PAGE_HEAD = """
 <!doctype html>
 <html>
 <head>
@@ -35,14 +88,33 @@ PAGE = """
 <body>
   <h1>SQL Console (read-only)</h1>
   <form method="POST">
-    <textarea name="sql" placeholder="SELECT TOP 50 * FROM dbo.User;"></textarea>
+    <textarea name="sql" placeholder="SELECT TOP 50 * FROM dbo.User;">{{ sql or '' }}</textarea>
+    <br><label>Page key <input name="key" size="40" value="{{ key or '' }}"
+      placeholder="from ORDER BY, or e.g. CreatedAt DESC, RequestId"></label>
+    <br><label><input type="checkbox" name="stream" value="1" {% if stream %}checked{% endif %}>
+      Stream full result</label>
+    {% if profiling %}<label><input type="checkbox" name="plan" value="1">
+      Capture plan and IO/TIME statistics</label>{% endif %}
     <br><button type="submit">Run</button>
+    <select name="format">{% for f in formats %}<option>{{ f }}</option>{% endfor %}</select>
+    <button type="submit" formaction="/export">Export</button>
   </form>
 
   {% if error %}<div class="error">{{ error }}</div>{% endif %}
+"""
+
+PAGE_TAIL = """
+</body>
+</html>
+"""
 
+PAGE = PAGE_HEAD + """
   {% if rows is not none %}
-    <p><strong>{{ rows|length }}</strong> row(s)</p>
+    <p>{% if page %}Page {{ page }}: {% endif %}<strong>{{ rows|length }}</strong> row(s)
+      {% if cache_age is not none %}<em>(served from cache, {{ cache_age|round|int }}s old)</em>{% endif %}
+      {% if profile %}<small>queue {{ profile.ms.queue|round(1) }} / connect {{ profile.ms.connect|round(1) }}
+        / execute {{ profile.ms.execute|round(1) }} / fetch {{ profile.ms.fetch|round(1) }} ms,
+        {{ profile.bytes }} bytes</small>{% endif %}</p>
     <table>
       <thead>
         <tr>
@@ -52,44 +124,283 @@ PAGE = """
       <tbody>
         {% for r in rows %}
           <tr>
-            {% for col in columns %}<td>{{ r[col] }}</td>{% endfor %}
+            {% for v in r %}<td>{{ v }}</td>{% endfor %}
           </tr>
         {% endfor %}
       </tbody>
     </table>
+    {% if next_token %}
+      <form method="POST">
+        <input type="hidden" name="sql" value="{{ sql }}">
+        <input type="hidden" name="key" value="{{ key or '' }}">
+        <input type="hidden" name="after" value="{{ next_token }}">
+        <button type="submit">Next page</button>
+      </form>
+    {% elif page is none and rows|length >= page_size %}
+      <p><em>Showing the first {{ page_size }} rows; add an ORDER BY (or a page key) to page through the rest.</em></p>
+    {% endif %}
   {% endif %}
-</body>
-</html>
-"""
+""" + PAGE_TAIL
+
+
+def _row_html(row):
+    return "<tr>" + "".join(f"<td>{escape(v)}</td>" for v in row) + "</tr>\n"
+
+
+def _console_user():
+    # Fairness key: the authenticated user if any, else the client address
+    auth = request.authorization
+    return auth.username if auth and auth.username else request.remote_addr
+
+
+def _stream_rows(sql):
+    # Generator kept alive by the response: holds a pooled connection until
+    # the last chunk is sent, and never more than one batch of rows in memory
+    yield render_template_string(PAGE_HEAD, sql=sql, stream=True, error=None, formats=available_formats(),
+                                 profiling=slow_log is not None, key="")
+    total = 0
+    try:
+        with pool.connection() as conn:
+            conn.timeout = executor.deadline   # bounds execution, not the transfer
+            cur = conn.cursor()
+            try:
+                cur.execute(sql)
+                head = "".join(f"<th>{escape(c[0])}</th>" for c in cur.description)
+                yield f"<table>\n<thead><tr>{head}</tr></thead>\n<tbody>\n"
+                while total < STREAM_MAX_ROWS:
+                    batch = cur.fetchmany(min(STREAM_BATCH, STREAM_MAX_ROWS - total))
+                    if not batch:
+                        break
+                    total += len(batch)
+                    yield "".join(_row_html(row) for row in batch)
+                yield "</tbody>\n</table>\n"
+            finally:
+                cur.close()
+                conn.timeout = 0
+        note = " (truncated)" if total >= STREAM_MAX_ROWS else ""
+        yield f"<p><strong>{total}</strong> row(s){note}</p>"
+    except Exception as e:
+        yield f'<div class="error">{escape(str(e))}</div>'
+    yield PAGE_TAIL
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     error = None
     columns, rows = None, None
+    sql, stream = "", False
+    cache_age = None
+    profile = None
+    key, page, next_token = "", None, None
+    status, headers = 200, {}
     if request.method == "POST":
         sql = (request.form.get("sql") or "").strip()
+        stream = request.form.get("stream") == "1"
+        key = (request.form.get("key") or "").strip()
 
         # --- safety: only allow SELECTs for demo grading ---
         first = sql.split(None, 1)[0].upper() if sql else ""
         if first != "SELECT":
             error = "Only SELECT statements are allowed in this console."
+        elif stream:
+            user = _console_user()
+            try:
+                executor.admit(user)
+            except Saturated as e:
+                error, status, headers = f"Console is busy, retry shortly: {e}", 429, {"Retry-After": "1"}
+            else:
+                response = Response(stream_with_context(_stream_rows(sql)), mimetype="text/html")
+                response.call_on_close(lambda: executor.release(user))
+                return response
         else:
-            # Optional: enforce TOP limit
-            if " TOP " not in sql.upper():
-                sql = "SELECT TOP 100 * FROM (" + sql + ") AS t"
-
+            # Keyset paging when the query is ordered on plain columns, else a TOP cap
+            query, params, keyset = sql, [], None
             try:
-                with pyodbc.connect(CN_STR, timeout=10) as conn:
-                    conn.add_output_converter(pyodbc.SQL_WVARCHAR, lambda x: x)  # basic
-                    with conn.cursor() as cur:
-                        cur.execute(sql)
-                        cols = [c[0] for c in cur.description]
-                        data = [dict(zip(cols, row)) for row in cur.fetchall()]
-                        columns, rows = cols, data
-            except Exception as e:
-                error = str(e)
-
-    return render_template_string(PAGE, error=error, columns=columns, rows=rows)
+                keyset = KeysetQuery.plan(sql, key or None)
+                if keyset:
+                    after = request.form.get("after")
+                    last, page = read_token(CONSOLE_SECRET, keyset, after) if after else (None, 1)
+                    query, params = keyset.page_sql(PAGE_SIZE + 1, last)   # one extra row: is there a next page?
+                elif " TOP " not in query.upper():
+                    query = f"SELECT TOP {PAGE_SIZE} * FROM (" + query + ") AS t"
+            except (TokenError, ValueError) as e:
+                error, status = str(e), 400
+
+            if error is None:
+                if slow_log:
+                    plan = request.form.get("plan") == "1"
+                    profile = QueryProfile(_console_user(), query, capture=plan, plan=plan)
+                cache_key = f"{query} -- {params!r}" if params else query
+                hit = cache.get(cache_key) if cache and not (profile and profile.capture) else None
+                if hit:
+                    columns, rows, cache_age = hit
+                    if profile:
+                        profile.cached, profile.rows = True, len(rows)
+                else:
+                    try:
+                        columns, rows = executor.execute(_console_user(), query, params, profile=profile)
+                        if cache:
+                            cache.put(cache_key, columns, rows)
+                    except Saturated as e:
+                        error, status, headers = f"Console is busy, retry shortly: {e}", 429, {"Retry-After": "1"}
+                    except DeadlineExceeded as e:
+                        error, status = str(e), 504
+                    except Exception as e:
+                        error = str(e)
+                    if profile:
+                        profile.error = error
+
+            if keyset and rows is not None and len(rows) > PAGE_SIZE:
+                rows = rows[:PAGE_SIZE]
+                try:
+                    next_token = make_token(CONSOLE_SECRET, keyset, keyset.last_key(columns, rows[-1]), page + 1)
+                except ValueError as e:
+                    error = str(e)
+
+    html = render_template_string(PAGE, error=error, columns=columns, rows=rows, sql=sql, stream=stream,
+                                  cache_age=cache_age, formats=available_formats(), profile=profile,
+                                  profiling=slow_log is not None, key=key, page=page, next_token=next_token,
+                                  page_size=PAGE_SIZE)
+    if profile:
+        profile.phase("render")
+        slow_log.record(profile)
+    return html, status, headers
+
+
+SLOW_PAGE = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Slow queries</title>
+  <style>
+    body { font-family: system-ui, sans-serif; margin: 2rem; }
+    table { border-collapse: collapse; }
+    th, td { border: 1px solid #ccc; padding: 6px 10px; vertical-align: top; }
+    th { background: #f6f6f6; }
+    pre { white-space: pre-wrap; max-width: 60rem; margin: 0; }
+  </style>
+</head>
+<body>
+  <h1>Slow queries</h1>
+  <p>{{ stats.logged }} of {{ stats.profiled }} profiled queries took at least {{ stats.threshold_ms }} ms or failed;
+    the last {{ stats.capacity }} are kept.
+    <a href="?order=recent">Most recent</a> | <a href="?order=slowest">Slowest</a> |
+    <a href="/slow.json?order={{ order }}">JSON</a></p>
+  <table>
+    <thead><tr><th>at</th><th>user</th><th>total ms</th><th>queue / connect / execute / fetch / render</th>
+      <th>rows</th><th>bytes</th><th>SQL</th></tr></thead>
+    <tbody>
+      {% for e in entries %}
+        <tr>
+          <td>{{ e.at }}</td><td>{{ e.user }}</td><td>{{ e.total_ms }}</td>
+          <td>{{ e.queue_ms }} / {{ e.connect_ms }} / {{ e.execute_ms }} / {{ e.fetch_ms }} / {{ e.render_ms }}</td>
+          <td>{{ e.rows }}{% if e.cached %} (cached){% endif %}</td><td>{{ e.bytes }}</td>
+          <td><pre>{{ e.sql }}</pre>
+            {% if e.error %}<div class="error">{{ e.error }}</div>{% endif %}
+            {% if e.stats %}<details><summary>IO / TIME</summary><pre>{{ e.stats|join("\n") }}</pre></details>{% endif %}
+            {% if e.plan %}<details><summary>Actual plan (XML)</summary><pre>{{ e.plan }}</pre></details>{% endif %}
+          </td>
+        </tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</body>
+</html>
+"""
+
+
+@app.route("/slow")
+def slow_queries():
+    if not slow_log:
+        return "Profiling is disabled (set QUERY_PROFILE=1).", 404
+    order = request.args.get("order", "recent")
+    return render_template_string(SLOW_PAGE, entries=slow_log.entries(order), stats=slow_log.stats(), order=order)
+
+
+@app.route("/slow.json")
+def slow_queries_json():
+    if not slow_log:
+        return jsonify(enabled=False), 404
+    return jsonify(stats=slow_log.stats(), entries=slow_log.entries(request.args.get("order", "recent")))
+
+
+@app.route("/export", methods=["GET", "POST"])
+def export_result():
+    sql = (request.values.get("sql") or "").strip()
+    fmt = request.values.get("format", "csv")
+    first = sql.split(None, 1)[0].upper() if sql else ""
+    if first != "SELECT":
+        return "Only SELECT statements can be exported.", 400
+    if fmt not in available_formats():
+        return f"Unsupported format {fmt!r} (available: {', '.join(available_formats())}).", 400
+
+    user = _console_user()
+    try:
+        executor.admit(user)
+    except Saturated as e:
+        return f"Console is busy, retry shortly: {e}", 429, {"Retry-After": "1"}
+
+    # Execute before answering so SQL errors get a proper status; the cursor is
+    # then drained batch by batch while the response is written
+    conn = cur = None
+    try:
+        conn = pool.acquire()
+        conn.timeout = executor.deadline
+        cur = conn.cursor()
+        cur.execute(sql)
+        conn.timeout = 0
+    except Exception as e:
+        if conn is not None:
+            pool.release(conn, discard=True)
+        executor.release(user)
+        return str(e), 400
+
+    drained = False
+
+    def chunks():
+        nonlocal drained
+        yield from export_chunks(cur, fmt, EXPORT_BATCH)
+        drained = True
+
+    def finish():
+        try:
+            cur.close()
+        except Exception:
+            pass
+        # Client gone or export failed mid-stream: the connection may still be
+        # busy with the rest of the result, so don't hand it to the next request
+        pool.release(conn, discard=not drained)
+        executor.release(user)
+
+    mimetype, extension = FORMATS[fmt]
+    response = Response(chunks(), mimetype=mimetype,
+                        headers={"Content-Disposition": f"attachment; filename=export.{extension}"})
+    response.call_on_close(finish)
+    return response
+
+@app.route("/pool")
+def pool_stats():
+    return jsonify(pool.stats())
+
+@app.route("/executor")
+def executor_stats():
+    return jsonify(executor.stats())
+
+@app.route("/cache")
+def cache_stats():
+    return jsonify(cache.stats() if cache else {"enabled": False})
+
+@app.route("/cache/invalidate", methods=["POST"])
+def cache_invalidate():
+    # Hook for writers: POST table=<name> after changing a table, or nothing to clear all
+    if not cache:
+        return jsonify(dropped=0)
+    table = request.values.get("table")
+    if table:
+        return jsonify(dropped=cache.invalidate_table(table))
+    cache.clear()
+    return jsonify(dropped="all")
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,230 @@
+import argparse
+import datetime
+import time
+
+from db import connect
+
+_MSG = "MsgId, SenderUserId, RecipientUserId, Body, SentAt, [Ride]"
+_RIDE = "RideId, OfferId, DriverUserId, PassengerUserId, VehicleId, StartedAt, EndedAt, PriceFinal, [Status], Rating, Payment"
+_PAYMENT = "PaymentId, SenderUserId, ReceiverUserId, GrossAmount, OsrhFee, DriverPayout, PaidAt, Method, [Status], CreatedAt"
+_OFFER = "OfferId, LegId, RecipientUserId, [Status], SentAt, RespondedAt"
+_LOG = """LogEntryId, RequestId, Operation, ChangedAt, ChangedBy, PassengerId, NumOfPeople, PickupAt,
+          PickupLat, PickupLng, DropLat, DropLng,
+          PickupCountry, PickupRegion, PickupCity, PickupDistrict, PickupPostalCode,
+          DropCountry, DropRegion, DropCity, DropDistrict, DropPostalCode,
+          CreatedAt, UpdatedAt, [Status], RideProfileId"""
+
+_FINISHED_RIDE = "[Status] IN ('Completed','Cancelled')"
+
+# (progress name, table, columns, eligible rows of alias t, batch order), in the order they must move.
+# Deleting a Ride cascades its InAppMessages and nulls nothing we keep, so messages go first
+# and a ride only moves once it has none left. That probe takes UPDLOCK + HOLDLOCK (a key-range
+# lock on IX_InAppMessage_Ride_SentAt) until the batch commits, so a message posted in between
+# waits instead of being cascaded away unarchived. Payment (SET NULL from Ride) and DispatchOffer
+# (NO ACTION from Ride) only move once no live ride references them. Payment takes two passes,
+# so each seeks its own index: paid rows by PaidAt (IX_Payment_PaidAt), and rows never paid
+# (failed, refunded, often without a ride) by CreatedAt (IX_Payment_Unpaid_CreatedAt).
+# RideRequestLog rows move below @bound: older than the cutoff and already read by every
+# change consumer.
+TABLES = [
+    ("InAppMessage", "InAppMessage", _MSG,
+     f"""EXISTS (SELECT 1 FROM dbo.Ride r WHERE r.RideId = t.[Ride] AND r.StartedAt < @cutoff
+                AND r.{_FINISHED_RIDE})""",
+     "t.[Ride], t.MsgId"),
+    ("Ride", "Ride", _RIDE,
+     f"""t.StartedAt < @cutoff AND t.{_FINISHED_RIDE}
+         AND NOT EXISTS (SELECT 1 FROM dbo.InAppMessage m WITH (UPDLOCK, HOLDLOCK) WHERE m.[Ride] = t.RideId)""",
+     "t.StartedAt, t.RideId"),
+    ("Payment", "Payment", _PAYMENT,
+     """t.PaidAt < @cutoff AND t.[Status] <> 'Pending'
+        AND NOT EXISTS (SELECT 1 FROM dbo.Ride r WHERE r.Payment = t.PaymentId)""",
+     "t.PaidAt, t.PaymentId"),
+    ("PaymentUnpaid", "Payment", _PAYMENT,
+     """t.PaidAt IS NULL AND t.CreatedAt < @cutoff AND t.[Status] <> 'Pending'
+        AND NOT EXISTS (SELECT 1 FROM dbo.Ride r WHERE r.Payment = t.PaymentId)""",
+     "t.CreatedAt, t.PaymentId"),
+    ("DispatchOffer", "DispatchOffer", _OFFER,
+     """t.SentAt < @cutoff AND t.[Status] <> 'Sent'
+        AND NOT EXISTS (SELECT 1 FROM dbo.Ride r WHERE r.OfferId = t.OfferId)""",
+     "t.SentAt, t.OfferId"),
+    ("RideRequestLog", "RideRequestLog", _LOG, "t.LogEntryId < @bound", "t.LogEntryId"),
+]
+
+
+def _retryable(exc):
+    # 1205: chosen as deadlock victim, 1222: SET LOCK_TIMEOUT expired
+    return "(1205)" in str(exc) or "(1222)" in str(exc)
+
+
+class Archiver:
+    """Moves aged rows of the history tables into their *Archive twins.
+
+    Each batch is one transaction: DELETE TOP (batch) ... OUTPUT deleted.*
+    INTO the archive, plus the ArchiveProgress counters. An interrupted run
+    therefore loses nothing and resumes with the same cutoff. The session
+    runs at low deadlock priority with a short lock timeout, backs off and
+    retries when it collides with live traffic, and sleeps between batches
+    so it spends at most `duty` of the wall clock working.
+    """
+
+    def __init__(self, conn, batch_size=2000, duty=0.5, lock_timeout_ms=2000, max_retries=10, log=print):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.duty = duty
+        self.lock_timeout_ms = lock_timeout_ms
+        self.max_retries = max_retries
+        self.log = log
+        self._metrics = dict.fromkeys(("batches", "rows", "retries", "seconds_working", "seconds_sleeping"), 0)
+
+    def _session(self, cur):
+        cur.execute(f"SET LOCK_TIMEOUT {int(self.lock_timeout_ms)}; SET DEADLOCK_PRIORITY LOW;")
+        # TR_Payment_DriverRollup skips archival deletes: the rollups keep counting archived payments
+        cur.execute("EXEC sp_set_session_context N'archiving', 1")
+        self.conn.commit()
+
+    def _cutoff(self, cur, name, older_than):
+        """Cutoff of the unfinished run for pass `name`, or a new run's cutoff."""
+        row = cur.execute("SELECT Cutoff FROM dbo.ArchiveProgress WHERE TableName = ? AND FinishedAt IS NULL",
+                          name).fetchone()
+        if row:
+            return row[0], True
+        cutoff = cur.execute("SELECT DATEADD(DAY, -?, SYSUTCDATETIME())", older_than).fetchone()[0]
+        cur.execute("""
+            MERGE dbo.ArchiveProgress WITH (HOLDLOCK) AS t
+            USING (VALUES (?, ?)) AS s(TableName, Cutoff) ON t.TableName = s.TableName
+            WHEN MATCHED THEN UPDATE SET Cutoff = s.Cutoff, RowsMoved = 0, Batches = 0,
+                StartedAt = SYSUTCDATETIME(), UpdatedAt = SYSUTCDATETIME(), FinishedAt = NULL
+            WHEN NOT MATCHED THEN INSERT (TableName, Cutoff) VALUES (s.TableName, s.Cutoff);
+        """, name, cutoff)
+        self.conn.commit()
+        return cutoff, False
+
+    def _log_bound(self, cur, cutoff):
+        # First log entry at or after the cutoff (the log is appended in ChangedAt order), capped
+        # by the slowest consumer's watermark so no unread entry leaves the live log
+        bound = cur.execute("""
+            SELECT COALESCE((SELECT TOP 1 LogEntryId FROM dbo.RideRequestLog WHERE ChangedAt >= ? ORDER BY LogEntryId),
+                            (SELECT MAX(LogEntryId) + 1 FROM dbo.RideRequestLog), 0)""", cutoff).fetchone()[0]
+        if cur.execute("SELECT OBJECT_ID('dbo.ChangeConsumerWatermark')").fetchone()[0] is not None:
+            watermark = cur.execute("SELECT MIN(LastLogEntryId) FROM dbo.ChangeConsumerWatermark").fetchone()[0]
+            if watermark is not None:
+                bound = min(bound, watermark + 1)
+        self.conn.commit()
+        return bound
+
+    def move_batch(self, cur, name, table, columns, eligible, order, cutoff, bound=None):
+        """Move one batch; returns the number of rows moved."""
+        cur.execute(f"""
+            SET NOCOUNT ON;
+            DECLARE @cutoff DATETIME2(3) = ?, @bound BIGINT = ?, @moved INT;
+            WITH batch AS (SELECT TOP (?) * FROM dbo.{table} AS t WHERE {eligible} ORDER BY {order})
+            DELETE batch OUTPUT {', '.join('deleted.' + c.strip() for c in columns.split(','))}
+                INTO dbo.{table}Archive ({columns});
+            SET @moved = @@ROWCOUNT;
+            UPDATE dbo.ArchiveProgress SET RowsMoved = RowsMoved + @moved, Batches = Batches + 1,
+                UpdatedAt = SYSUTCDATETIME()
+            WHERE TableName = ?;
+            SELECT @moved;""", cutoff, bound, self.batch_size, name)
+        moved = cur.fetchone()[0]
+        self.conn.commit()
+        return moved
+
+    def archive_table(self, cur, spec, older_than, deadline=None):
+        name, table, columns, eligible, order = spec
+        cutoff, resumed = self._cutoff(cur, name, older_than)
+        bound = self._log_bound(cur, cutoff) if table == "RideRequestLog" else None
+        self.log(f"{name}: {'resuming' if resumed else 'archiving'} rows older than {cutoff}")
+        moved, retries = 0, 0
+        while deadline is None or time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                n = self.move_batch(cur, *spec, cutoff, bound)
+            except Exception as e:
+                self.conn.rollback()
+                if not _retryable(e) or retries >= self.max_retries:
+                    raise
+                retries += 1
+                self._metrics["retries"] += 1
+                time.sleep(min(5.0, 0.1 * 2 ** retries))
+                continue
+            retries = 0
+            took = time.perf_counter() - started
+            moved += n
+            self._metrics["batches"] += 1
+            self._metrics["rows"] += n
+            self._metrics["seconds_working"] += took
+            if n < self.batch_size:
+                cur.execute("UPDATE dbo.ArchiveProgress SET FinishedAt = SYSUTCDATETIME() WHERE TableName = ?", name)
+                self.conn.commit()
+                self.log(f"{name}: done, {moved} rows moved")
+                return moved, True
+            # Duty cycle: work `duty` of the time, leave the rest to live traffic
+            pause = took * (1 - self.duty) / self.duty
+            self._metrics["seconds_sleeping"] += pause
+            time.sleep(pause)
+        self.log(f"{name}: stopped at the time limit after {moved} rows; the next run resumes")
+        return moved, False
+
+    def run(self, older_than=180, tables=None, max_seconds=None):
+        """Archive every table in FK order; stops early (resumably) after `max_seconds`."""
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        cur = self.conn.cursor()
+        try:
+            self._session(cur)
+            for spec in TABLES:
+                if tables and spec[1] not in tables:
+                    continue
+                _moved, finished = self.archive_table(cur, spec, older_than, deadline)
+                if not finished:
+                    break
+        finally:
+            cur.close()
+        return self.metrics()
+
+    def status(self):
+        """[(pass name, live rows, archived rows, cutoff, rows moved, finished at)]; counts are per table."""
+        cur = self.conn.cursor()
+        try:
+            rows = []
+            for name, table, *_ in TABLES:
+                counts = cur.execute("""
+                    SELECT SUM(CASE WHEN object_id = OBJECT_ID(?) THEN row_count END),
+                           SUM(CASE WHEN object_id = OBJECT_ID(?) THEN row_count END)
+                    FROM sys.dm_db_partition_stats WHERE index_id IN (0, 1)""",
+                                     f"dbo.{table}", f"dbo.{table}Archive").fetchone()
+                progress = cur.execute("SELECT Cutoff, RowsMoved, FinishedAt FROM dbo.ArchiveProgress WHERE TableName = ?",
+                                       name).fetchone() or (None, 0, None)
+                rows.append((name, counts[0] or 0, counts[1] or 0, *progress))
+            return rows
+        finally:
+            cur.close()
+
+    def metrics(self):
+        m = dict(self._metrics)
+        m["rows_per_s"] = m["rows"] / m["seconds_working"] if m["seconds_working"] else 0.0
+        return m
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move aged history rows into the archive tables")
+    parser.add_argument("--older-than", type=int, default=180, help="archive rows older than this many days")
+    parser.add_argument("--table", action="append", choices=list(dict.fromkeys(t[1] for t in TABLES)),
+                        help="only these tables (repeatable; FK order is kept)")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--duty", type=float, default=0.5, help="share of wall time spent moving rows (0-1]")
+    parser.add_argument("--lock-timeout", type=int, default=2000, help="milliseconds before yielding a lock")
+    parser.add_argument("--max-seconds", type=float, help="stop after this long; the next run resumes")
+    parser.add_argument("--status", action="store_true", help="show live/archived row counts and progress")
+    args = parser.parse_args()
+
+    cn = connect(autocommit=False)
+    archiver = Archiver(cn, args.batch_size, max(0.01, min(1.0, args.duty)), args.lock_timeout)
+    if args.status:
+        for table, live, archived, cutoff, moved, finished in archiver.status():
+            state = "" if cutoff is None else f"  cutoff {cutoff}  moved {moved}  " + \
+                (f"finished {finished}" if finished else "in progress")
+            print(f"{table:16} live {live:>12,}  archived {archived:>12,}{state}")
+    else:
+        started = datetime.datetime.now()
+        print(archiver.run(args.older_than, args.table, args.max_seconds))
+        print(f"archival took {datetime.datetime.now() - started}")
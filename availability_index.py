@@ -0,0 +1,336 @@
+import argparse
+import datetime
+import random
+import time
+from collections import OrderedDict, namedtuple
+
+DAY_SECONDS = 86400
+
+# One DriverAvailability row; owner is the EnrollId, starts/ends are seconds since midnight.
+Window = namedtuple("Window", "owner zone day starts ends recurring")
+
+
+def _seconds(value):
+    if isinstance(value, str):
+        value = datetime.time.fromisoformat(value)
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+
+
+class IntervalTree:
+    """Static centered interval tree over half-open [start, end) intervals.
+
+    Each node keeps the intervals containing its center sorted by start and
+    by end; the rest go left (end <= center) or right (start > center).
+    Centering on the median start at least halves every subtree, so depth is
+    O(log n) and a stabbing query costs O(log n + hits).
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center, here, left, right):
+        self.center = center
+        self.by_start = sorted(here, key=lambda iv: iv[0])
+        self.by_end = sorted(here, key=lambda iv: iv[1], reverse=True)
+        self.left = left
+        self.right = right
+
+    @classmethod
+    def build(cls, intervals):
+        """Tree over [(start, end, value)], or None when there are none."""
+        if not intervals:
+            return None
+        center = sorted(iv[0] for iv in intervals)[len(intervals) // 2]
+        here, left, right = [], [], []
+        for iv in intervals:
+            (left if iv[1] <= center else right if iv[0] > center else here).append(iv)
+        return cls(center, here, cls.build(left), cls.build(right))
+
+    def stab(self, t, out):
+        """Append the value of every interval containing t to out."""
+        node = self
+        while node is not None:
+            if t < node.center:
+                for start, _end, value in node.by_start:
+                    if start > t:
+                        break
+                    out.append(value)
+                node = node.left
+            else:
+                for _start, end, value in node.by_end:
+                    if end <= t:
+                        break
+                    out.append(value)
+                node = node.right
+        return out
+
+    def overlap(self, a, b, out):
+        """Append the value of every interval overlapping [a, b) to out."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if b <= node.center:
+                for start, _end, value in node.by_start:
+                    if start >= b:
+                        break
+                    out.append(value)
+                stack.append(node.left)
+            elif a > node.center:
+                for _start, end, value in node.by_end:
+                    if end <= a:
+                        break
+                    out.append(value)
+                stack.append(node.right)
+            else:
+                out += [value for _start, _end, value in node.by_start]
+                stack += (node.left, node.right)
+        return out
+
+
+class AvailabilityIndex:
+    """Who can work when: the DriverAvailability windows of approved enrollments.
+
+    There is no separate vehicle calendar in the schema; an enrollment ties
+    one driver to one vehicle, so a vehicle is available exactly while one of
+    its approved enrollments has a DriverAvailability window.
+
+    Windows are grouped per (zone, day) and each group gets an interval tree
+    over time of day, built on first use and kept in a bounded LRU. Recurring
+    windows repeat daily from their AvailabilityDate on and are only expanded
+    into the days that are actually queried. Updates invalidate just the
+    cached days they touch.
+    """
+
+    def __init__(self, max_trees=4096):
+        self.max_trees = max_trees
+        self.enrollments = {}       # EnrollId -> (VehicleId, UserId), approved only
+        self.windows = {}           # (EnrollId, day, starts) -> Window
+        self._one_off = {}          # (zone, day) -> {key: Window}
+        self._recurring = {}        # zone -> {key: Window}
+        self._zones = set()
+        self._trees = OrderedDict()  # (zone, day) -> IntervalTree | None
+        self.metrics = dict.fromkeys(("queries", "tree_builds", "tree_hits", "invalidations"), 0)
+
+    @classmethod
+    def from_db(cls, cur, max_trees=4096):
+        index = cls(max_trees)
+        for enroll_id, vehicle_id, user_id in cur.execute(
+                """SELECT EnrollId, VehicleId, UserId FROM dbo.UserServiceEnrollment
+                   WHERE [Status] = 'Approved'"""):
+            index.enroll(enroll_id, vehicle_id, user_id)
+        # One-off windows in the past can never match again
+        for enroll_id, zone_id, day, starts, ends, recurring in cur.execute(
+                """SELECT EnrollId, GeofencezoneId, AvailabilityDate, StartsAt, EndsAt, IsRecurring
+                   FROM dbo.DriverAvailability
+                   WHERE IsRecurring = 1 OR AvailabilityDate >= CAST(SYSUTCDATETIME() AS DATE)"""):
+            index.add_window(enroll_id, zone_id, day, starts, ends, recurring)
+        return index
+
+    # ---------- incremental updates ----------
+    def enroll(self, enroll_id, vehicle_id, user_id):
+        self.enrollments[enroll_id] = (vehicle_id, user_id)
+
+    def unenroll(self, enroll_id):
+        self.enrollments.pop(enroll_id, None)
+
+    def add_window(self, enroll_id, zone_id, day, starts_at, ends_at, recurring=False):
+        """Insert or replace the window keyed like the table: (EnrollId, AvailabilityDate, StartsAt)."""
+        w = Window(enroll_id, zone_id, day, _seconds(starts_at), _seconds(ends_at), bool(recurring))
+        key = (w.owner, w.day, w.starts)
+        self.remove_window(enroll_id, day, starts_at)
+        self.windows[key] = w
+        if w.recurring:
+            self._recurring.setdefault(w.zone, {})[key] = w
+        else:
+            self._one_off.setdefault((w.zone, w.day), {})[key] = w
+        self._zones.add(w.zone)
+        self._invalidate(w)
+
+    def remove_window(self, enroll_id, day, starts_at):
+        key = (enroll_id, day, _seconds(starts_at))
+        w = self.windows.pop(key, None)
+        if w is None:
+            return
+        if w.recurring:
+            self._discard(self._recurring, w.zone, key)
+        else:
+            self._discard(self._one_off, (w.zone, w.day), key)
+        self._invalidate(w)
+
+    @staticmethod
+    def _discard(groups, group, key):
+        members = groups[group]
+        del members[key]
+        if not members:
+            del groups[group]
+
+    def _invalidate(self, w):
+        if not w.recurring:
+            stale = [(w.zone, w.day)] if (w.zone, w.day) in self._trees else []
+        else:
+            stale = [k for k in self._trees if k[0] == w.zone and k[1] >= w.day]
+        for k in stale:
+            del self._trees[k]
+        self.metrics["invalidations"] += len(stale)
+
+    # ---------- day trees ----------
+    def _tree(self, zone, day):
+        k = (zone, day)
+        if k in self._trees:
+            self._trees.move_to_end(k)
+            self.metrics["tree_hits"] += 1
+            return self._trees[k]
+        windows = list(self._one_off.get(k, {}).values())
+        windows += [w for w in self._recurring.get(zone, {}).values() if w.day <= day]
+        tree = IntervalTree.build([(w.starts, w.ends, w) for w in windows])
+        self._trees[k] = tree
+        self.metrics["tree_builds"] += 1
+        if len(self._trees) > self.max_trees:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _stab(self, zone, at):
+        self.metrics["queries"] += 1
+        day, t, hits = at.date(), _seconds(at.time()), []
+        for z in self._zones if zone is None else (zone,):
+            tree = self._tree(z, day)
+            if tree is not None:
+                tree.stab(t, hits)
+        return hits
+
+    def _overlapping(self, zone, start, end):
+        """Windows overlapping [start, end), day by day."""
+        self.metrics["queries"] += 1
+        hits, day = [], start.date()
+        while day <= end.date():
+            a = _seconds(start.time()) if day == start.date() else 0
+            b = _seconds(end.time()) if day == end.date() else DAY_SECONDS
+            if a < b:
+                for z in self._zones if zone is None else (zone,):
+                    tree = self._tree(z, day)
+                    if tree is not None:
+                        tree.overlap(a, b, hits)
+            day += datetime.timedelta(days=1)
+        return hits
+
+    def _approved(self, hits, enrollments):
+        found, seen = [], set()
+        for w in hits:
+            enrolled = self.enrollments.get(w.owner)
+            if enrolled is None or w.owner in seen or (enrollments is not None and w.owner not in enrollments):
+                continue
+            seen.add(w.owner)
+            found.append((w.owner, *enrolled))
+        return found
+
+    # ---------- queries ----------
+    def drivers_at(self, at, zone=None, enrollments=None):
+        """EnrollIds with a window in `zone` (any zone if None) covering `at`."""
+        return {w.owner for w in self._stab(zone, at) if enrollments is None or w.owner in enrollments}
+
+    def drivers_during(self, start, end, zone=None, enrollments=None):
+        """EnrollIds with a window in `zone` overlapping [start, end)."""
+        return {w.owner for w in self._overlapping(zone, start, end)
+                if enrollments is None or w.owner in enrollments}
+
+    def vehicles_at(self, at, zone=None):
+        """VehicleIds with an approved enrollment whose driver works in `zone` at `at`."""
+        return {vehicle_id for _e, vehicle_id, _u in self.available_at(at, zone)}
+
+    def vehicles_during(self, start, end, zone=None):
+        return {vehicle_id for _e, vehicle_id, _u in self.available_during(start, end, zone)}
+
+    def available_at(self, at, zone=None, enrollments=None):
+        """[(EnrollId, VehicleId, UserId)]: approved enrollments with a window in `zone` covering `at`."""
+        return self._approved(self._stab(zone, at), enrollments)
+
+    def available_during(self, start, end, zone=None, enrollments=None):
+        """Like available_at, for windows overlapping [start, end)."""
+        return self._approved(self._overlapping(zone, start, end), enrollments)
+
+
+# ---------- benchmark ----------
+def _covers(w, day, t):
+    return (w.day == day or (w.recurring and w.day <= day)) and w.starts <= t < w.ends
+
+
+def _naive_available_at(windows, enrollments, at, zone):
+    # What a per-request join does: scan every window of the zone
+    day, t = at.date(), _seconds(at.time())
+    drivers = {w.owner for w in windows if w.zone == zone and _covers(w, day, t)}
+    return sorted((e, *enrollments[e]) for e in drivers if e in enrollments)
+
+
+def benchmark(num_windows, num_queries, zones, seed=342):
+    rng = random.Random(seed)
+    base = datetime.date(2025, 1, 1)
+    num_enrollments = max(1, num_windows // 10)
+    index = AvailabilityIndex()
+    for e in range(num_enrollments):
+        if e % 10:  # every tenth enrollment is still pending
+            index.enroll(e, f"vehicle-{e}", f"driver-{e}")
+
+    def random_window():
+        recurring = rng.random() < 0.2
+        day = base + datetime.timedelta(days=rng.randrange(7 if recurring else 28))
+        starts = rng.randrange(0, 20) * 3600 + rng.choice((0, 1800))
+        ends = min(DAY_SECONDS - 1, starts + rng.randrange(1, 9) * 3600)
+        return day, datetime.time(starts // 3600, starts % 3600 // 60), \
+            datetime.time(ends // 3600, ends % 3600 // 60, ends % 60), recurring
+
+    started = time.perf_counter()
+    for _ in range(num_windows):
+        e = rng.randrange(num_enrollments)
+        zone = e % zones if rng.random() < 0.9 else rng.randrange(zones)
+        index.add_window(e, zone, *random_window())
+    print(f"{len(index.windows):,} windows ({num_enrollments:,} enrollments, {zones} zones), "
+          f"{num_queries:,} queries")
+    print(f"load                 {time.perf_counter() - started:8.2f} s")
+
+    queries = [(datetime.datetime.combine(base, datetime.time()) +
+                datetime.timedelta(seconds=rng.randrange(28 * DAY_SECONDS)), rng.randrange(zones))
+               for _ in range(num_queries)]
+
+    windows = list(index.windows.values())
+    sample = queries[:max(1, num_queries // 100)]
+    started = time.perf_counter()
+    expected = [_naive_available_at(windows, index.enrollments, at, zone) for at, zone in sample]
+    naive = (time.perf_counter() - started) / len(sample)
+    print(f"naive join scan      {1 / naive:10,.0f} queries/s")
+
+    for label in ("indexed (cold)", "indexed (warm)"):
+        started = time.perf_counter()
+        for at, zone in queries:
+            index.available_at(at, zone)
+        elapsed = (time.perf_counter() - started) / num_queries
+        print(f"{label:20} {1 / elapsed:10,.0f} queries/s   x{naive / elapsed:.0f}")
+    assert expected == [sorted(index.available_at(at, zone)) for at, zone in sample]
+
+    started = time.perf_counter()
+    for at, zone in queries:
+        index.available_during(at, at + datetime.timedelta(hours=1), zone)
+    print(f"1h range (warm)      {num_queries / (time.perf_counter() - started):10,.0f} queries/s")
+
+    keys = rng.sample(list(index.windows), min(10000, len(index.windows)))
+    started = time.perf_counter()
+    for owner, day, starts in keys:
+        w = index.windows[(owner, day, starts)]
+        index.remove_window(owner, day, datetime.time(int(starts) // 3600, int(starts) % 3600 // 60))
+        index.add_window(owner, w.zone, *random_window())
+    print(f"update (move window) {(time.perf_counter() - started) / len(keys) * 1e6:8.2f} us")
+
+    started = time.perf_counter()
+    for at, zone in queries:
+        index.available_at(at, zone)
+    print(f"after updates        {num_queries / (time.perf_counter() - started):10,.0f} queries/s")
+    print("metrics", index.metrics)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the availability interval index")
+    parser.add_argument("--windows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--zones", type=int, default=50)
+    args = parser.parse_args()
+    benchmark(args.windows, args.queries, args.zones)
@@ -0,0 +1,271 @@
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import datetime
+import statistics
+import subprocess
+import time
+
+from db import connect
+from stats import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DDL_SCRIPT = os.path.join(HERE, "DDL-Queries.sql")
+
+# Samplers are ordered so every run draws parameters from the same candidates
+PASSENGERS = "SELECT TOP 200 UserId FROM dbo.Passenger ORDER BY UserId"
+DRIVERS = "SELECT TOP 200 UserId FROM dbo.Driver ORDER BY UserId"
+
+# Query catalogue: (name, kind, sql, sampler). The sampler returns candidate values for the
+# single ? parameter; each iteration picks one with the seeded RNG. Writes run inside a
+# transaction that is rolled back, so the data set is identical for every query and run.
+WORKLOAD = [
+    ("passenger_requests", "read",
+     "SELECT TOP 50 RequestId, [Status], CreatedAt FROM dbo.RideRequest WHERE PassengerId = ? ORDER BY CreatedAt DESC",
+     PASSENGERS),
+    ("pending_requests", "read",
+     """SELECT RequestId, PassengerId, RideProfileId FROM dbo.RideRequest
+        WHERE [Status] = 'Pending' AND CreatedAt >= DATEADD(HOUR, -24, SYSUTCDATETIME())""",
+     None),
+    ("offers_for_leg", "read",
+     "SELECT OfferId, RecipientUserId, [Status] FROM dbo.DispatchOffer WHERE LegId = ?",
+     "SELECT TOP 200 LegId FROM dbo.ItineraryLeg ORDER BY LegId"),
+    ("open_offers_per_driver", "read",
+     "SELECT OfferId, LegId, SentAt FROM dbo.DispatchOffer WHERE RecipientUserId = ? AND [Status] = 'Sent'",
+     DRIVERS),
+    ("driver_ride_history", "read",
+     "SELECT TOP 50 RideId, StartedAt, PriceFinal FROM dbo.Ride WHERE DriverUserId = ? ORDER BY StartedAt DESC",
+     DRIVERS),
+    ("passenger_ride_history", "read",
+     "SELECT TOP 50 RideId, StartedAt, PriceFinal FROM dbo.Ride WHERE PassengerUserId = ? ORDER BY StartedAt DESC",
+     PASSENGERS),
+    ("passenger_spend", "read",
+     "SELECT SUM(GrossAmount) FROM dbo.Payment WHERE SenderUserId = ? AND [Status] = 'Completed'",
+     PASSENGERS),
+    ("driver_earnings", "read",
+     """SELECT COUNT(*), SUM(GrossAmount), SUM(OsrhFee), SUM(DriverPayout) FROM dbo.Payment
+        WHERE ReceiverUserId = ? AND [Status] = 'Completed'""",
+     DRIVERS),
+    ("driver_rating", "read",
+     "SELECT COUNT(*), AVG(CAST(Stars AS FLOAT)) FROM dbo.Rating WHERE TargetUserId = ?",
+     DRIVERS),
+    ("ride_messages", "read",
+     "SELECT MsgId, SenderUserId, SentAt FROM dbo.InAppMessage WHERE [Ride] = ? ORDER BY SentAt",
+     "SELECT TOP 200 RideId FROM dbo.Ride ORDER BY RideId"),
+    ("zone_occupancy", "read",
+     """SELECT z.ZoneId, COUNT(v.VehicleId) FROM dbo.Geofencezone z
+        LEFT JOIN dbo.VehicleLocationLive v
+          ON v.Lat BETWEEN z.MinLat AND z.MaxLat AND v.Lng BETWEEN z.MinLng AND z.MaxLng
+        GROUP BY z.ZoneId""",
+     None),
+    ("person_docs_expiring", "read",
+     "SELECT DocId, UserId, DocType FROM dbo.PersonDocument WHERE ExpiryDate < DATEADD(DAY, 7, SYSUTCDATETIME())",
+     None),
+    ("vehicle_docs_expiring", "read",
+     "SELECT VehDocId, VehicleId, DocType FROM dbo.VehicleDocument WHERE ExpiryDate < DATEADD(DAY, 7, SYSUTCDATETIME())",
+     None),
+    ("accept_offer", "write",
+     "UPDATE dbo.DispatchOffer SET [Status] = 'Accepted', RespondedAt = SYSUTCDATETIME() WHERE OfferId = ?",
+     "SELECT TOP 200 OfferId FROM dbo.DispatchOffer WHERE [Status] = 'Sent' ORDER BY OfferId"),
+    ("vehicle_location_update", "write",
+     "UPDATE dbo.VehicleLocationLive SET Lat = Lat + 0.0001, UpdatedAt = SYSUTCDATETIME() WHERE VehicleId = ?",
+     "SELECT TOP 200 VehicleId FROM dbo.VehicleLocationLive ORDER BY VehicleId"),
+    ("create_ride_request", "write",
+     """INSERT dbo.RideRequest(PassengerId, NumOfPeople, PickupLat, PickupLng, DropLat, DropLng, RideProfileId)
+        SELECT ?, 1, 34.690, 32.960, 34.720, 33.010, (SELECT TOP 1 RideProfileId FROM dbo.AllowedRideProfile)""",
+     PASSENGERS),
+]
+
+_LOGICAL_READS = re.compile(r"logical reads (\d+)")
+_INDEX_NAME = re.compile(r"CREATE\s+(?:UNIQUE\s+)?NONCLUSTERED\s+INDEX\s+\[?(\w+)\]?\s+ON\s+(\[?\w+\]?\.\[?\w+\]?)",
+                         re.IGNORECASE)
+
+
+# ---------- schema helpers ----------
+def script_batches(path):
+    # Split a T-SQL script on GO separator lines
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return [b for b in re.split(r"^\s*GO\s*$", text, flags=re.MULTILINE | re.IGNORECASE) if b.strip()]
+
+
+def run_script(cur, path):
+    for batch in script_batches(path):
+        cur.execute(batch)
+        while cur.nextset():
+            pass
+
+
+def reset_schema(cur):
+    # Drop every FK, table and user-defined type so DDL-Queries.sql can be re-run
+    cur.execute("""
+        DECLARE @sql NVARCHAR(MAX) = N'';
+        SELECT @sql += N'ALTER TABLE ' + QUOTENAME(OBJECT_SCHEMA_NAME(parent_object_id)) + N'.'
+                     + QUOTENAME(OBJECT_NAME(parent_object_id)) + N' DROP CONSTRAINT ' + QUOTENAME(name) + N';'
+        FROM sys.foreign_keys;
+        EXEC sp_executesql @sql;
+        SET @sql = N'';
+        SELECT @sql += N'DROP TABLE ' + QUOTENAME(SCHEMA_NAME(schema_id)) + N'.' + QUOTENAME(name) + N';'
+        FROM sys.tables WHERE is_ms_shipped = 0;
+        EXEC sp_executesql @sql;
+        SET @sql = N'';
+        SELECT @sql += N'DROP TYPE ' + QUOTENAME(SCHEMA_NAME(schema_id)) + N'.' + QUOTENAME(name) + N';'
+        FROM sys.types WHERE is_user_defined = 1;
+        EXEC sp_executesql @sql;
+    """)
+
+
+def drop_index_pack(cur, path):
+    for name, table in _INDEX_NAME.findall("\n".join(script_batches(path))):
+        cur.execute(f"DROP INDEX IF EXISTS [{name}] ON {table}")
+
+
+def seed(scale, workers, seed_value):
+    subprocess.run([sys.executable, os.path.join(HERE, "db_seeder.py"), "--scale", str(scale),
+                    "--workers", str(workers), "--seed", str(seed_value)], check=True)
+
+
+# ---------- measurement ----------
+def logical_reads(cur):
+    # STATISTICS IO arrives as informational messages, one set per result set
+    reads = 0
+    while True:
+        for _kind, text in getattr(cur, "messages", None) or []:
+            reads += sum(int(n) for n in _LOGICAL_READS.findall(text))
+        if not cur.nextset():
+            return reads
+
+
+def run_query(cn, cur, kind, sql, params):
+    started = time.perf_counter()
+    if kind == "write":
+        cn.autocommit = False
+        try:
+            cur.execute(sql, *params)
+            rows = cur.rowcount
+            reads = logical_reads(cur)
+        finally:
+            cn.rollback()
+            cn.autocommit = True
+    else:
+        cur.execute(sql, *params)
+        rows = len(cur.fetchall())
+        reads = logical_reads(cur)
+    return time.perf_counter() - started, max(rows, 0), reads
+
+
+def run_workload(cn, iterations, warmup, seed):
+    rng = random.Random(seed)
+    cur = cn.cursor()
+    cur.execute("SET STATISTICS IO ON")
+    results = {}
+    for name, kind, sql, sampler in WORKLOAD:
+        candidates = [row[0] for row in cur.execute(sampler).fetchall()] if sampler else [None]
+        logical_reads(cur)
+        if not candidates:
+            continue
+        timings, total_rows, reads = [], 0, []
+        for i in range(warmup + iterations):
+            params = [rng.choice(candidates)] if sampler else []
+            elapsed, rows, io = run_query(cn, cur, kind, sql, params)
+            if i < warmup:
+                continue
+            timings.append(elapsed)
+            total_rows += rows
+            reads.append(io)
+        timings.sort()
+        total = sum(timings)
+        results[name] = {
+            "kind": kind,
+            "iterations": iterations,
+            "mean_ms": total / iterations * 1000,
+            "p50_ms": percentile(timings, 50) * 1000,
+            "p95_ms": percentile(timings, 95) * 1000,
+            "p99_ms": percentile(timings, 99) * 1000,
+            "rows": total_rows,
+            "rows_per_s": total_rows / total if total else 0.0,
+            "logical_reads": statistics.mean(reads),
+        }
+    cur.execute("SET STATISTICS IO OFF")
+    cur.close()
+    return results
+
+
+def print_results(scale, variant, results):
+    print(f"\n=== scale {scale}, {variant} ===")
+    print(f"{'query':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rows/s':>11}{'reads':>10}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['rows_per_s']:>11.0f}{r['logical_reads']:>10.0f}")
+
+
+def diff(old_path, new_path):
+    with open(old_path) as f:
+        old = {(r["scale"], r["variant"], r["query"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {(r["scale"], r["variant"], r["query"]): r for r in json.load(f)["results"]}
+    print(f"{'scale':<8}{'variant':<12}{'query':<26}{'old p95':>9}{'new p95':>9}{'change':>9}{'reads':>14}")
+    for key in sorted(old.keys() & new.keys(), key=str):
+        o, n = old[key], new[key]
+        change = (n["p95_ms"] - o["p95_ms"]) / o["p95_ms"] * 100 if o["p95_ms"] else 0.0
+        print(f"{key[0]!s:<8}{key[1]:<12}{key[2]:<26}{o['p95_ms']:>9.2f}{n['p95_ms']:>9.2f}{change:>+8.1f}%"
+              f"{o['logical_reads']:>7.0f}->{n['logical_reads']:<6.0f}")
+    for key in sorted(old.keys() ^ new.keys(), key=str):
+        print(f"only in {'old' if key in old else 'new'}: {key}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed at several scales and benchmark the query catalogue")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=342, help="seeds both the data and the parameter choice")
+    parser.add_argument("--workers", type=int, default=4, help="seeder worker processes")
+    parser.add_argument("--index-pack", default=os.path.join(HERE, "Index-Pack-v1.sql"),
+                        help="also run every scale with this index pack applied")
+    parser.add_argument("--no-index-pack", action="store_true", help="run the schema as is only")
+    parser.add_argument("--no-seed", action="store_true", help="benchmark the current database as is")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="compare two JSON result files")
+    args = parser.parse_args()
+
+    if args.diff:
+        diff(*args.diff)
+        return
+
+    records = []
+    cn = connect(autocommit=True)
+    cur = cn.cursor()
+    for scale in ([None] if args.no_seed else args.scales):
+        if scale is not None:
+            reset_schema(cur)
+            run_script(cur, DDL_SCRIPT)
+            seed(scale, args.workers, args.seed)
+
+        variants = ["current"]
+        if not args.no_index_pack:
+            drop_index_pack(cur, args.index_pack)
+            variants = ["baseline", "index-pack"]
+        for variant in variants:
+            if variant == "index-pack":
+                run_script(cur, args.index_pack)
+                cur.execute("EXEC sp_updatestats")
+            results = run_workload(cn, args.iterations, args.warmup, args.seed)
+            print_results(scale or "current", variant, results)
+            records += [dict(r, scale=scale or "current", variant=variant, query=name) for name, r in results.items()]
+    cn.close()
+
+    if args.json:
+        meta = {"created_at": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+                "seed": args.seed, "iterations": args.iterations, "warmup": args.warmup,
+                "workers": args.workers, "index_pack": None if args.no_index_pack else os.path.basename(args.index_pack)}
+        with open(args.json, "w") as f:
+            json.dump({"meta": meta, "results": records}, f, indent=2)
+        print(f"\nresults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import time
+
+
+class BulkLoader:
+    """Buffers rows per table in columnar form and flushes them in batches.
+
+    Tables must be registered in FK-dependency order (parents first). Flushing
+    a table first flushes every table registered before it, so a child batch
+    never reaches the database ahead of the parent rows it references.
+    Tables named in `identity_insert` carry explicit values for their
+    IDENTITY column and are flushed with IDENTITY_INSERT switched on.
+    """
+
+    def __init__(self, cursor, tables, batch_size=5000, log=print, identity_insert=()):
+        self.cur = cursor
+        self.batch_size = batch_size
+        self.log = log
+        self.identity_insert = set(identity_insert)
+        self._order = [name for name, _cols in tables]
+        self._sql = {}
+        self._columns = {}
+        self._pending = {}
+        self.stats = {}
+        for name, cols in tables:
+            col_list = ", ".join(f"[{c}]" for c in cols)
+            params = ", ".join("?" * len(cols))
+            self._sql[name] = f"INSERT dbo.[{name}]({col_list}) VALUES({params})"
+            self._columns[name] = [[] for _ in cols]
+            self._pending[name] = 0
+            self.stats[name] = {"rows": 0, "batches": 0, "seconds": 0.0}
+
+    def add(self, table, *values):
+        columns = self._columns[table]
+        if len(values) != len(columns):
+            raise ValueError(f"{table}: expected {len(columns)} values, got {len(values)}")
+        for col, value in zip(columns, values):
+            col.append(value)
+        self._pending[table] += 1
+        if self._pending[table] >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, upto=None):
+        # Flush `upto` and all of its ancestors, or every table when omitted
+        stop = self._order.index(upto) + 1 if upto else len(self._order)
+        for name in self._order[:stop]:
+            self._flush_table(name)
+
+    def _flush_table(self, name):
+        count = self._pending[name]
+        if not count:
+            return
+        columns = self._columns[name]
+        rows = list(zip(*columns))
+        started = time.perf_counter()
+        self.cur.fast_executemany = True
+        if name in self.identity_insert:
+            # Only one table per session may have it on, so it is scoped to this flush
+            self.cur.execute(f"SET IDENTITY_INSERT dbo.[{name}] ON")
+            try:
+                self.cur.executemany(self._sql[name], rows)
+            finally:
+                self.cur.execute(f"SET IDENTITY_INSERT dbo.[{name}] OFF")
+        else:
+            self.cur.executemany(self._sql[name], rows)
+        elapsed = time.perf_counter() - started
+
+        for col in columns:
+            col.clear()
+        self._pending[name] = 0
+        stat = self.stats[name]
+        stat["rows"] += count
+        stat["batches"] += 1
+        stat["seconds"] += elapsed
+
+    def merge_stats(self, stats):
+        # Fold in the counters of a loader that ran in another process
+        for name, s in stats.items():
+            for key, value in s.items():
+                self.stats[name][key] += value
+
+    def report(self):
+        self.log(f"{'Table':<28}{'Rows':>10}{'Batches':>9}{'Seconds':>10}{'Rows/s':>12}")
+        total_rows, total_secs = 0, 0.0
+        for name in self._order:
+            s = self.stats[name]
+            if not s["rows"]:
+                continue
+            rate = s["rows"] / s["seconds"] if s["seconds"] else 0.0
+            self.log(f"{name:<28}{s['rows']:>10}{s['batches']:>9}{s['seconds']:>10.2f}{rate:>12.0f}")
+            total_rows += s["rows"]
+            total_secs += s["seconds"]
+        rate = total_rows / total_secs if total_secs else 0.0
+        self.log(f"{'TOTAL':<28}{total_rows:>10}{'':>9}{total_secs:>10.2f}{rate:>12.0f}")
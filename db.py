@@ -0,0 +1,26 @@
+import os
+
+
+def conn_str():
+    """ODBC connection string for the app and the command-line tools.
+
+    Read from the environment / .env: DB_HOST, DB_NAME (also the login),
+    DB_PASS and optionally DB_DRIVER (default "ODBC Driver 18 for SQL Server").
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    name = os.getenv("DB_NAME", "YOUR_DB")
+    return (
+        f"Driver={{{os.getenv('DB_DRIVER', 'ODBC Driver 18 for SQL Server')}}};"
+        f"Server={os.getenv('DB_HOST', 'YOUR_SERVER')},1433;Database={name};"
+        f"UID={name};PWD={os.getenv('DB_PASS', 'YOUR_PASSWORD')};"
+        "Encrypt=yes;TrustServerCertificate=yes"
+    )
+
+
+def connect(**kwargs):
+    """pyodbc connection from conn_str(); kwargs go to pyodbc.connect (autocommit, timeout)."""
+    import pyodbc
+
+    return pyodbc.connect(conn_str(), **kwargs)
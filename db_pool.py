@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def pool_size_for_worker(total=None, workers=None):
+    # Split the DB connection budget across the web server's worker processes
+    total = int(total if total is not None else os.getenv("DB_POOL_TOTAL", "10"))
+    workers = int(workers if workers is not None else os.getenv("WEB_CONCURRENCY", "1"))
+    return max(1, total // max(1, workers))
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections.
+
+    `connect` is any zero-argument callable returning a connection, so the
+    pool works with pyodbc in production and with e.g.
+    `lambda: sqlite3.connect(":memory:", check_same_thread=False)` locally.
+    """
+
+    def __init__(self, connect, max_size=5, min_size=0, max_idle=300,
+                 ping_after=30, checkout_timeout=10, ping_sql="SELECT 1", on_connect=None):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("invalid pool size")
+        self._connect = connect
+        self.max_size = max_size
+        self.min_size = min_size
+        self.max_idle = max_idle            # seconds before an idle conn is closed
+        self.ping_after = ping_after        # seconds idle before a checkout health check
+        self.checkout_timeout = checkout_timeout
+        self.ping_sql = ping_sql
+        self.on_connect = on_connect
+
+        self._idle = []                     # [(conn, last_used)], most recent last
+        self._size = 0                      # open connections (idle + in use)
+        self._closed = False
+        self._cond = threading.Condition()
+        self._metrics = dict.fromkeys(
+            ("checkouts", "waits", "creates", "discards", "evictions", "health_failures", "timeouts"), 0)
+
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append((self._create(), time.monotonic()))
+
+    # ---------- internals ----------
+    def _create(self):
+        try:
+            conn = self._connect()
+            if self.on_connect:
+                self.on_connect(conn)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics["creates"] += 1
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute(self.ping_sql)
+            cur.fetchall()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_locked(self, now):
+        # Drop connections idle for too long, oldest first, keeping min_size open
+        evicted = []
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            evicted.append(self._idle.pop(0)[0])
+            self._size -= 1
+            self._metrics["evictions"] += 1
+        return evicted
+
+    # ---------- public API ----------
+    def acquire(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("pool is closed")
+                evicted = self._evict_locked(time.monotonic())
+                conn = last_used = None
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    self._metrics["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle and self._size >= self.max_size:
+                            self._metrics["timeouts"] += 1
+                            raise PoolTimeout(f"no connection available within {timeout}s")
+                    continue
+                self._metrics["checkouts"] += 1
+
+            for c in evicted:
+                self._close_quietly(c)
+
+            if conn is None:
+                return self._create()
+
+            if time.monotonic() - last_used > self.ping_after and not self._healthy(conn):
+                # Stale connection (server restart, network blip): replace it
+                self._close_quietly(conn)
+                with self._cond:
+                    self._metrics["health_failures"] += 1
+                return self._create()
+            return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                conn.rollback()  # never hand out a connection with an open transaction
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+                self._metrics["discards"] += discard
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            # The error may have left the connection unusable; don't reuse it
+            self.release(conn, discard=not self._healthy(conn))
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self):
+        with self._cond:
+            evicted = self._evict_locked(time.monotonic())
+        for c in evicted:
+            self._close_quietly(c)
+        return len(evicted)
+
+    def stats(self):
+        with self._cond:
+            return dict(self._metrics, size=self._size, idle=len(self._idle),
+                        in_use=self._size - len(self._idle), max_size=self.max_size)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for c, _ in idle:
+            self._close_quietly(c)
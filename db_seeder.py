@@ -1,17 +1,17 @@
-import os
-import uuid, random, datetime
+import argparse
+import hashlib
+import uuid, random, datetime, itertools
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
 from faker import Faker
-from dotenv import load_dotenv
-import pyodbc
 
-load_dotenv()
+from bulk_loader import BulkLoader
+from db import connect
+from pricing import FareEngine
+from reference_data import ReferenceData
+from route_planner import RoutePlanner
 
 # ---------- CONFIG ----------
-SERVER   = os.getenv("DB_HOST", "YOUR_SERVER") + ",1433"
-DB_NAME = os.getenv("DB_NAME", "YOUR_DB")
-PASSWORD = os.getenv("DB_PASS", "YOUR_PASSWORD")
-
 NUM_ADMINS     = 5
 NUM_OPERATORS  = 30
 NUM_INSPECTORS = 100
@@ -19,477 +19,504 @@ NUM_INSPECTORS = 100
 NUM_PASSENGERS = 600
 NUM_DRIVERS    = 400
 NUM_VEHICLES_PER_DRIVER = 2
-NUM_CREDIT_CARDS_PER_ENTITY = 3
 
 NUM_COMPANIES  = 5
 NUM_REPR_PER_COMPANY = 40
 
 NUM_GEOFENCE_ZONES = 10
 RIDES_TO_CREATE = 10
+
+BATCH_SIZE = 5000   # rows buffered per table before a bulk flush
+SEED = 342
+
+# Knobs multiplied by --scale (per-entity counts such as vehicles per driver stay fixed)
+SCALED_KNOBS = ["NUM_OPERATORS", "NUM_INSPECTORS", "NUM_PASSENGERS", "NUM_DRIVERS",
+                "NUM_COMPANIES", "NUM_GEOFENCE_ZONES", "RIDES_TO_CREATE"]
 # ----------------------------
 
 fake = Faker("el_GR")   # greek
-Faker.seed(342)
+Faker.seed(SEED)
 
-def guid(): return str(uuid.uuid4())
+# ids come from the seeded RNG so a run is reproducible for a given seed and worker count
+def guid(): return str(uuid.UUID(int=random.getrandbits(128), version=4))
 utcnow = datetime.datetime.utcnow
 
-cn = pyodbc.connect(
-    "Driver={ODBC Driver 18 for SQL Server};"
-    f"Server={SERVER};Database={DB_NAME};UID={DB_NAME};PWD={PASSWORD};"
-    "Encrypt=yes;TrustServerCertificate=yes"
-)
-cn.autocommit = False
-
-with cn:
-    cur = cn.cursor()
-    start_time = datetime.datetime.now()
-
-    # Ride Types
-    ride_types = [
-        ("vehicle_with_driver", "Όχημα με οδηγό"),
-        ("vehicle_no_driver",   "Όχημα χωρίς οδηγό"),
-        ("teledriving",         "Όχημα τηλεοδήγησης στη θέση χρήστη"),
-        ("fully_autonomous",    "Όχημα πλήρως αυτόνομο στη θέση χρήστη"),
-        ("small_cargo_van",     "Μικρό βαν για φορτία"),
-    ]
-    rt_ids = {}
-    for key, label in ride_types:
-        cur.execute("""
-            IF NOT EXISTS(SELECT 1 FROM dbo.Ridetype WHERE [Name]=?)
-            INSERT dbo.Ridetype([Name],[Description]) VALUES(?,?);
-        """, label, label, label)
-        # capture actual id
-        ridrow = cur.execute("SELECT TOP 1 RideTypeId FROM dbo.Ridetype WHERE [Name]=?", label).fetchone()
-        rt_ids[key] = ridrow[0]
-
-    # Service Types
-    services = [
-        ("simple_route",    "Μεταφορά επιβάτη από Α σε Ω"),
-        ("luxury_route",    "Όπως απλή αλλά με ανώτερες προδιαγραφές"),
-        ("light_cargo",     "Μικρός οικιακός όγκος/βάρος"),
-        ("heavy_cargo",     "Μετακόμιση/μεγαλύτερος όγκος"),
-        ("bridged_route",   "Πολλαπλά μέσα λόγω geofencing/bridges"),
-    ]
-    svc_ids = {}
-    for name, desc in services:
-        cur.execute("""
-            IF NOT EXISTS(SELECT 1 FROM dbo.Servicetype WHERE [Name]=?)
-            INSERT dbo.Servicetype([Name],[Description],BaseFare,PerKm,PerMin,ValidFrom,Active)
-            VALUES(?, ?, 3.50, 0.80, 0.20, SYSUTCDATETIME(), 1);
-        """, name, name, desc)
-        row = cur.execute("SELECT TOP 1 ServiceTypeId FROM dbo.Servicetype WHERE [Name]=?", name).fetchone()
-        svc_ids[name] = row[0]
-
-    # Vehicle Types
-    veh_types = [
-        "Sedan", "Hatchback", "SUV", "Coupe", "Convertible", "Pickup Truck", "Minivan", "Van", 
-        "Wagon", "Crossover", "Luxury Car", "Sports Car", "Electric Car", "Hybrid Car", "Truck",
-    ]
-    vt_ids = {}
-    for vt in veh_types:
-        cur.execute("""
-            IF NOT EXISTS(SELECT 1 FROM dbo.VehicleType WHERE [Name]=?)
-            INSERT dbo.VehicleType(VehicleTypeId,[Name]) VALUES(NEWID(), ?);
-        """, vt, vt)
-        row = cur.execute("SELECT TOP 1 VehicleTypeId FROM dbo.VehicleType WHERE [Name]=?", vt).fetchone()
-        vt_ids[vt] = row[0]
-
-    # AllowedRideProfile + ServicetypeAllowedRidetype
-    combo_specs = [
-        ("simple_route",    "vehicle_with_driver", "Sedan",    "Απλή διαδρομή επιβάτη με sedan"),
-        ("simple_route",    "vehicle_with_driver", "Hatchback",    "Απλή διαδρομή επιβάτη με hatchback"),
-        ("simple_route",    "vehicle_with_driver", "SUV",    "Απλή διαδρομή επιβάτη με SUV"),
-        ("simple_route",    "vehicle_with_driver", "Coupe",    "Απλή διαδρομή επιβάτη με coupe"),
-        ("simple_route",    "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
-        ("simple_route",    "vehicle_with_driver", "Crossover",    "Απλή διαδρομή επιβάτη με crossover"),
-        ("simple_route",    "vehicle_with_driver", "Electric Car",    "Απλή διαδρομή επιβάτη με electric car"),
-        ("simple_route",    "vehicle_with_driver", "Hybrid Car",    "Απλή διαδρομή επιβάτη με hybrid car"),
-        ("simple_route",    "vehicle_with_driver", "Wagon",    "Απλή διαδρομή επιβάτη με wagon"),
-        ("simple_route",    "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
-        
-        ("luxury_route",    "vehicle_with_driver", "Luxury Car",      "Πολυτελής διαδρομή επιβάτη με luxury car"),
-        ("luxury_route",    "vehicle_with_driver", "Sports Car",      "Πολυτελής διαδρομή επιβάτη με sports car"),
-        ("luxury_route",    "vehicle_with_driver", "SUV",      "Πολυτελής διαδρομή επιβάτη με SUV"),
-        ("luxury_route",    "vehicle_with_driver", "Electric Car",      "Πολυτελής διαδρομή επιβάτη με electric car"),
-        ("luxury_route",    "vehicle_with_driver", "Minivan",      "Πολυτελής διαδρομή επιβάτη με minivan"),
-
-        ("light_cargo",     "small_cargo_van",     "Van",      "Μεταφορά ελαφριού φορτίου με van"),
-        ("light_cargo",     "small_cargo_van",     "Pickup Truck",      "Μεταφορά ελαφριού φορτίου με pickup truck"),
-        ("light_cargo",     "small_cargo_van",     "Truck",      "Μεταφορά ελαφριού φορτίου με truck"),
-
-        ("heavy_cargo",     "small_cargo_van",     "Minivan",  "Μεταφορά μεγάλου φορτίου με minivan"),
-        ("heavy_cargo",     "small_cargo_van",     "Van",  "Μεταφορά μεγάλου φορτίου με van"),
-        ("heavy_cargo",     "small_cargo_van",     "Truck",  "Μεταφορά μεγάλου φορτίου με truck"),
-
-        ("bridged_route",   "vehicle_with_driver", "Sedan",    "Απλή διαδρομή επιβάτη με sedan"),
-        ("bridged_route",   "vehicle_with_driver", "Hatchback",    "Απλή διαδρομή επιβάτη με hatchback"),
-        ("bridged_route",   "vehicle_with_driver", "SUV",    "Απλή διαδρομή επιβάτη με SUV"),
-        ("bridged_route",   "vehicle_with_driver", "Coupe",    "Απλή διαδρομή επιβάτη με coupe"),
-        ("bridged_route",   "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
-        ("bridged_route",   "vehicle_with_driver", "Crossover",    "Απλή διαδρομή επιβάτη με crossover"),
-        ("bridged_route",   "vehicle_with_driver", "Electric Car",    "Απλή διαδρομή επιβάτη με electric car"),
-        ("bridged_route",   "vehicle_with_driver", "Hybrid Car",    "Απλή διαδρομή επιβάτη με hybrid car"),
-        ("bridged_route",   "vehicle_with_driver", "Wagon",    "Απλή διαδρομή επιβάτη με wagon"),
-        ("bridged_route",   "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
-    ]
-    for svc_key, rt_key, vt_name, profile_name in combo_specs:
-        svc_id = svc_ids[svc_key]
-        rt_id = rt_ids[rt_key]
-        vt_id = vt_ids[vt_name]
-
-        # ensure junction row exists
-        row = cur.execute(
-            "SELECT 1 FROM dbo.ServicetypeAllowedRidetype WHERE ServiceTypeID = ? AND RideTypeID = ?",
-            svc_id, rt_id
-        ).fetchone()
-
-        if not row:
-            cur.execute(
-                "INSERT INTO dbo.ServicetypeAllowedRidetype (ServiceTypeID, RideTypeID) VALUES (?, ?)",
-                svc_id, rt_id
-            )
-
-        # insert allowed ride profile linked by service+ride type (avoid duplicates)
-        cur.execute("""
-            IF NOT EXISTS (
-                SELECT 1 FROM dbo.AllowedRideProfile
-                WHERE ServiceTypeId = ? AND RideTypeId = ? AND VehicleTypeId = ?
-            )
-            INSERT INTO dbo.AllowedRideProfile (RideProfileId, ServiceTypeId, RideTypeId, VehicleTypeId, ProfileName)
-            VALUES (NEWID(), ?, ?, ?, ?);
-        """, svc_id, rt_id, vt_id, svc_id, rt_id, vt_id, profile_name)
-
-    # pick one profile id for use later
-    profile_any = cur.execute("SELECT TOP 1 RideProfileId FROM dbo.AllowedRideProfile").fetchone()[0]
-
-    # Admins
+# Bulk-loaded tables in FK-dependency order (parents before children), columns as in DDL-Queries.sql
+TABLES = [
+    ("Admin",                    ["AdminId", "Username", "PasswordHash"]),
+    ("Operator",                 ["OperatorId", "Email", "Username", "PasswordHash", "ApprovedByAdmin",
+                                  "ApprovedAt"]),
+    ("Inspector",                ["InspectorId", "Email", "Username", "PasswordHash"]),
+    ("Geofencezone",             ["ZoneId", "MinLat", "MinLng", "MaxLat", "MaxLng", "Name"]),
+    ("Bridge",                   ["BridgeId", "Name", "FromZone", "ToZone"]),
+    ("User",                     ["UserId", "FirstName", "LastName", "Role", "Dob", "Gender", "Email", "Phone",
+                                  "Address", "Username", "PasswordHash"]),
+    ("CompanyRepresentative",    ["UserId", "Company"]),
+    ("Passenger",                ["UserId"]),
+    ("UserPreferences",          ["UserId", "NotificationsEnabled", "Language", "LocEnabled", "Timezone",
+                                  "PreferredPaymentMethod"]),
+    ("Driver",                   ["UserId"]),
+    ("PersonDocument",           ["UserId", "DocType", "IssueDate", "UploadedAt", "ExpiryDate", "FileUrl"]),
+    ("Vehicle",                  ["VehicleId", "VehicleTypeId", "OwnerUserId", "Seats", "CargoVolume",
+                                  "CargoWeight", "Status"]),
+    ("VehicleDocument",          ["VehicleId", "DocType", "IssueDate", "UploadedAt", "ExpiryDate", "FileUrl",
+                                  "Image"]),
+    ("VehicleTest",              ["TestId", "VehicleId", "InspectorId", "CheckDate", "Comments"]),
+    ("VehicleLocationLive",      ["VehicleId", "Lat", "Lng", "UpdatedAt"]),
+    ("UserServiceEnrollment",    ["EnrollId", "UserId", "VehicleId", "ServiceType", "RideType", "Status",
+                                  "ApprovedAt", "ApprovedById"]),
+    ("DriverAvailability",       ["EnrollId", "AvailabilityDate", "GeofencezoneId", "StartsAt", "EndsAt",
+                                  "IsRecurring", "UpdatedAt"]),
+    ("RideRequest",              ["RequestId", "PassengerId", "NumOfPeople", "PickupAt", "PickupLat", "PickupLng",
+                                  "DropLat", "DropLng", "PickupCountry", "PickupRegion", "PickupCity",
+                                  "PickupDistrict", "PickupPostalCode", "DropCountry", "DropRegion", "DropCity",
+                                  "DropDistrict", "DropPostalCode", "CreatedAt", "Status", "RideProfileId"]),
+    ("ItineraryLeg",             ["LegId", "SeqNo", "ViaBridgeId", "RideRequestId"]),
+    ("LegCrossesBridge",         ["ItineraryLeg", "Bridge"]),
+    ("DispatchOffer",            ["OfferId", "LegId", "RecipientUserId", "Status", "SentAt", "RespondedAt"]),
+    ("Payment",                  ["PaymentId", "SenderUserId", "ReceiverUserId", "GrossAmount", "OsrhFee",
+                                  "DriverPayout", "PaidAt", "Method", "Status"]),
+    ("Rating",                   ["RatingId", "AuthorUserId", "TargetUserId", "Stars", "Comment", "CreatedAt"]),
+    ("Ride",                     ["RideId", "OfferId", "DriverUserId", "PassengerUserId", "VehicleId", "StartedAt",
+                                  "EndedAt", "PriceFinal", "Status", "Rating", "Payment"]),
+    ("InAppMessage",             ["SenderUserId", "RecipientUserId", "Body", "SentAt", "Ride"]),
+]
+
+# IDENTITY columns the seeder assigns itself (IDENTITY_INSERT), so children can reference a
+# parent before it is flushed. Tables without children let the database number their rows.
+IDENTITY_COLUMNS = {
+    "Geofencezone": "ZoneId", "Bridge": "BridgeId", "UserServiceEnrollment": "EnrollId",
+    "RideRequest": "RequestId", "ItineraryLeg": "LegId", "DispatchOffer": "OfferId",
+    "Rating": "RatingId", "Ride": "RideId",
+}
+
+# Ride Types
+ride_types = [
+    ("vehicle_with_driver", "Όχημα με οδηγό"),
+    ("vehicle_no_driver",   "Όχημα χωρίς οδηγό"),
+    ("teledriving",         "Όχημα τηλεοδήγησης στη θέση χρήστη"),
+    ("fully_autonomous",    "Όχημα πλήρως αυτόνομο στη θέση χρήστη"),
+    ("small_cargo_van",     "Μικρό βαν για φορτία"),
+]
+
+# Service Types
+services = [
+    ("simple_route",    "Μεταφορά επιβάτη από Α σε Ω"),
+    ("luxury_route",    "Όπως απλή αλλά με ανώτερες προδιαγραφές"),
+    ("light_cargo",     "Μικρός οικιακός όγκος/βάρος"),
+    ("heavy_cargo",     "Μετακόμιση/μεγαλύτερος όγκος"),
+    ("bridged_route",   "Πολλαπλά μέσα λόγω geofencing/bridges"),
+]
+
+# Vehicle Types
+veh_types = [
+    "Sedan", "Hatchback", "SUV", "Coupe", "Convertible", "Pickup Truck", "Minivan", "Van", 
+    "Wagon", "Crossover", "Luxury Car", "Sports Car", "Electric Car", "Hybrid Car", "Truck",
+]
+
+# AllowedRideProfile combos (service type, ride type, vehicle type)
+combo_specs = [
+    ("simple_route",    "vehicle_with_driver", "Sedan",    "Απλή διαδρομή επιβάτη με sedan"),
+    ("simple_route",    "vehicle_with_driver", "Hatchback",    "Απλή διαδρομή επιβάτη με hatchback"),
+    ("simple_route",    "vehicle_with_driver", "SUV",    "Απλή διαδρομή επιβάτη με SUV"),
+    ("simple_route",    "vehicle_with_driver", "Coupe",    "Απλή διαδρομή επιβάτη με coupe"),
+    ("simple_route",    "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
+    ("simple_route",    "vehicle_with_driver", "Crossover",    "Απλή διαδρομή επιβάτη με crossover"),
+    ("simple_route",    "vehicle_with_driver", "Electric Car",    "Απλή διαδρομή επιβάτη με electric car"),
+    ("simple_route",    "vehicle_with_driver", "Hybrid Car",    "Απλή διαδρομή επιβάτη με hybrid car"),
+    ("simple_route",    "vehicle_with_driver", "Wagon",    "Απλή διαδρομή επιβάτη με wagon"),
+    ("simple_route",    "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
+
+    ("luxury_route",    "vehicle_with_driver", "Luxury Car",      "Πολυτελής διαδρομή επιβάτη με luxury car"),
+    ("luxury_route",    "vehicle_with_driver", "Sports Car",      "Πολυτελής διαδρομή επιβάτη με sports car"),
+    ("luxury_route",    "vehicle_with_driver", "SUV",      "Πολυτελής διαδρομή επιβάτη με SUV"),
+    ("luxury_route",    "vehicle_with_driver", "Electric Car",      "Πολυτελής διαδρομή επιβάτη με electric car"),
+    ("luxury_route",    "vehicle_with_driver", "Minivan",      "Πολυτελής διαδρομή επιβάτη με minivan"),
+
+    ("light_cargo",     "small_cargo_van",     "Van",      "Μεταφορά ελαφριού φορτίου με van"),
+    ("light_cargo",     "small_cargo_van",     "Pickup Truck",      "Μεταφορά ελαφριού φορτίου με pickup truck"),
+    ("light_cargo",     "small_cargo_van",     "Truck",      "Μεταφορά ελαφριού φορτίου με truck"),
+
+    ("heavy_cargo",     "small_cargo_van",     "Minivan",  "Μεταφορά μεγάλου φορτίου με minivan"),
+    ("heavy_cargo",     "small_cargo_van",     "Van",  "Μεταφορά μεγάλου φορτίου με van"),
+    ("heavy_cargo",     "small_cargo_van",     "Truck",  "Μεταφορά μεγάλου φορτίου με truck"),
+
+    ("bridged_route",   "vehicle_with_driver", "Sedan",    "Απλή διαδρομή επιβάτη με sedan"),
+    ("bridged_route",   "vehicle_with_driver", "Hatchback",    "Απλή διαδρομή επιβάτη με hatchback"),
+    ("bridged_route",   "vehicle_with_driver", "SUV",    "Απλή διαδρομή επιβάτη με SUV"),
+    ("bridged_route",   "vehicle_with_driver", "Coupe",    "Απλή διαδρομή επιβάτη με coupe"),
+    ("bridged_route",   "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
+    ("bridged_route",   "vehicle_with_driver", "Crossover",    "Απλή διαδρομή επιβάτη με crossover"),
+    ("bridged_route",   "vehicle_with_driver", "Electric Car",    "Απλή διαδρομή επιβάτη με electric car"),
+    ("bridged_route",   "vehicle_with_driver", "Hybrid Car",    "Απλή διαδρομή επιβάτη με hybrid car"),
+    ("bridged_route",   "vehicle_with_driver", "Wagon",    "Απλή διαδρομή επιβάτη με wagon"),
+    ("bridged_route",   "vehicle_with_driver", "Convertible",    "Απλή διαδρομή επιβάτη με convertible"),
+]
+
+# Seats / cargo ranges per vehicle type
+vehicle_specs = {
+    "Sedan":        {"seats": (4,5),   "vol": (350,500),    "wt": (200,400)},
+    "Hatchback":    {"seats": (4,5),   "vol": (250,400),    "wt": (150,300)},
+    "SUV":          {"seats": (5,7),   "vol": (500,800),    "wt": (400,800)},
+    "Coupe":        {"seats": (2,4),   "vol": (200,300),    "wt": (150,250)},
+    "Convertible":  {"seats": (2,4),   "vol": (150,300),    "wt": (150,250)},
+    "Pickup Truck": {"seats": (2,5),   "vol": (800,1500),   "wt": (1000,2000)},
+    "Minivan":      {"seats": (6,8),   "vol": (1000,1500),  "wt": (800,1500)},
+    "Van":          {"seats": (2,3),   "vol": (2000,4000),  "wt": (2000,4000)},
+    "Wagon":        {"seats": (4,5),   "vol": (500,700),    "wt": (400,800)},
+    "Crossover":    {"seats": (5,5),   "vol": (450,600),    "wt": (400,700)},
+    "Luxury Car":   {"seats": (4,5),   "vol": (400,600),    "wt": (300,600)},
+    "Sports Car":   {"seats": (2,4),   "vol": (150,300),    "wt": (150,300)},
+    "Electric Car": {"seats": (4,5),   "vol": (300,500),    "wt": (300,600)},
+    "Hybrid Car":   {"seats": (4,5),   "vol": (300,500),    "wt": (250,500)},
+    "Truck":        {"seats": (2,3),   "vol": (5000,20000), "wt": (5000,20000)},
+}
+
+
+def gen_staff(loader):
+    now = utcnow()
     admin_ids = []
     for i in range(NUM_ADMINS):
         aid = guid()
-        cur.execute("INSERT dbo.Admin(AdminId,Username,PasswordHash) VALUES(?,?,?)",
-                    aid, f"admin{i+1}", "admin-hash")
+        loader.add("Admin", aid, f"admin{i+1}", "admin-hash")
         admin_ids.append(aid)
 
-    # Operators
     operator_ids = []
     for i in range(NUM_OPERATORS):
         oid = guid()
-        cur.execute("INSERT dbo.Operator(OperatorId,Email,Username,PasswordHash,ApprovedByAdmin) VALUES(?,?,?,?,?)", 
-                    oid, f"operator{i+1}@example.com", f"operator{i+1}", "operator-hash", random.choice(admin_ids))
+        loader.add("Operator", oid, f"operator{i+1}@example.com", f"operator{i+1}", "operator-hash",
+                   random.choice(admin_ids), now)
         operator_ids.append(oid)
 
-    # Inspectors
     inspector_ids = []
     for i in range(NUM_INSPECTORS):
         ins = guid()
-        cur.execute("INSERT dbo.Inspector(InspectorId,Email,Username,PasswordHash) VALUES(?,?,?,?)",
-                    ins, f"inspector{i+1}@example.com", f"inspector{i+1}", "hash-inspector")
+        loader.add("Inspector", ins, f"inspector{i+1}@example.com", f"inspector{i+1}", "hash-inspector")
         inspector_ids.append(ins)
+    return admin_ids, operator_ids, inspector_ids
+
 
-    # Companies & Representatives
-    company_ids = []
-    comp_parties = []
-    for i in range(NUM_COMPANIES):
-        party_c = guid()
-        cur.execute("INSERT dbo.Party(PartyId,PartyType,CreatedAt) VALUES(?, 'C', SYSUTCDATETIME())", party_c)
-        cid = guid()
-        cur.execute("INSERT dbo.Company(CompanyId,Name,PartyId) VALUES(?,?,?)",
-                    cid, f"Company {i+1}", party_c)
-        company_ids.append(cid)
-        comp_parties.append(party_c)
-
-        # Representatives per company
+def gen_companies(loader, start, count):
+    # A company is only the name its representatives (users with Role 'C') work for
+    repr_ids = []
+    for i in range(start, start + count):
         for r in range(NUM_REPR_PER_COMPANY):
             user_id = guid()
-            email = f"repr{i+1}-{r+1}@example.com"
-            username = email.split('@')[0]
-            cur.execute("""INSERT dbo.CompanyRepresentative(CompanyRepresentativeId,CompanyId,Email,Username,PasswordHash)
-                   VALUES(?,?,?,?,?)""", user_id, cid, email, username, "hash")
-
-    # Passengers
-    passengers = []  # (party_id, user_id)
-    for i in range(NUM_PASSENGERS):
-        party_u = guid()
+            gen_user(loader, user_id, 'C', f"repr{i+1}-{r+1}@example.com", 22, 70)
+            loader.add("CompanyRepresentative", user_id, f"Company {i+1}")
+            repr_ids.append(user_id)
+    return repr_ids
+
+
+def gen_user(loader, user_id, role, email, min_age, max_age):
+    full_name = fake.name()
+    name_parts = full_name.split(' ', 1)
+    first_name = name_parts[0]
+    last_name = name_parts[1] if len(name_parts) > 1 else ''
+    loader.add("User", user_id, first_name, last_name, role,
+               fake.date_of_birth(minimum_age=min_age, maximum_age=max_age), random.choice(['M','F', 'm', 'f']),
+               email, fake.phone_number(), fake.address()[:250], email.split('@')[0], "hash")
+
+
+def gen_passengers(loader, start, count):
+    passengers = []  # user ids
+    for i in range(start, start + count):
         user_id = guid()
-        email = f"passenger{i+1}@example.com"
-        cur.execute("INSERT dbo.Party(PartyId,PartyType,CreatedAt) VALUES(?, 'U', SYSUTCDATETIME())", party_u)
-        
-        full_name = fake.name()
-        name_parts = full_name.split(' ', 1)
-        first_name = name_parts[0]
-        last_name = name_parts[1] if len(name_parts) > 1 else ''
-        
-        cur.execute("""INSERT dbo.[User](UserId,FirstName,LastName,Dob,Gender,Email,Phone,Address,Username,PasswordHash,PartyId)
-                       VALUES(?,?,?,?,?,?,?,?,?,?,?)""",
-                    user_id, first_name, last_name, fake.date_of_birth(minimum_age=18, maximum_age=75),
-                    random.choice(['M','F', 'm', 'f']), email, fake.phone_number(), fake.address()[:250],
-                    email.split('@')[0], "hash", party_u)
-        cur.execute("INSERT dbo.Passenger(UserId) VALUES(?)", user_id)
-        cur.execute("""INSERT dbo.UserPreferences(UserPreferencesId,UserId,NotificationsEnabled,[Language],LocEnabled,Timezone)
-                       VALUES(NEWID(), ?, ?, 'el', ?, N'Asia/Nicosia')""",
-                    user_id, random.choice([0,1]), random.choice([0,1]))
-        passengers.append((party_u, user_id))
-
-    # Drivers
-    drivers = []  # (driver_party, driver_user, [vehicle_ids])
-    for i in range(NUM_DRIVERS):
-        party_u = guid()
+        gen_user(loader, user_id, 'P', f"passenger{i+1}@example.com", 18, 75)
+        loader.add("Passenger", user_id)
+        loader.add("UserPreferences", user_id, random.choice([0,1]), 'el', random.choice([0,1]), 'Asia/Nicosia',
+                   random.choice(['CreditCard', 'Cash']))
+        passengers.append(user_id)
+    return passengers
+
+
+def gen_drivers(loader, start, count, refs):
+    drivers = []  # (driver_user, [vehicle_ids])
+    ref = refs["ref"]
+    vt_ids = ref.vehicle_types.ids
+    for i in range(start, start + count):
+        now = utcnow()
         user_id = guid()
-        email = f"driver{i+1}@example.com"
-        cur.execute("INSERT dbo.Party(PartyId,PartyType,CreatedAt) VALUES(?, 'U', SYSUTCDATETIME())", party_u)
-
-        full_name = fake.name()
-        name_parts = full_name.split(' ', 1)
-        first_name = name_parts[0]
-        last_name = name_parts[1] if len(name_parts) > 1 else ''
-        cur.execute("""INSERT dbo.[User](UserId,FirstName,LastName,Dob,Gender,Email,Phone,Address,Username,PasswordHash,PartyId)
-                       VALUES(?,?,?,?,?,?,?,?,?,?,?)""",
-                    user_id, first_name, last_name, fake.date_of_birth(minimum_age=22, maximum_age=70),
-                    random.choice(['M','F', 'm', 'f']), email, fake.phone_number(), fake.address()[:250],
-                    email.split('@')[0], "hash", party_u)
-        cur.execute("INSERT dbo.Driver(UserId,Company) VALUES(?, ?)", user_id, random.choice(company_ids))
+        gen_user(loader, user_id, 'D', f"driver{i+1}@example.com", 22, 70)
+        loader.add("Driver", user_id)
 
         # Documents for driver (ταυτότητα, άδεια οδήγησης, πιστοποιητικό λευκού ποινικού μητρώου, ιατρικό πιστοποιητικό)
-        # Driver License
-        pd_issue = utcnow() - datetime.timedelta(days=365*5)
-        pd_exp   = utcnow() + datetime.timedelta(days=365*3)
-        cur.execute("""INSERT dbo.PersonDocument(DocId,UserId,DocType,IssueDate,UploadedAt,ExpiryDate,FileUrl)
-               VALUES(NEWID(),?,?,?,?,?,?)""",
-            user_id, 'Driver License', pd_issue, utcnow(), pd_exp, 'https://example.com/license.pdf')
-        
-        # ID Document
-        id_issue = utcnow() - datetime.timedelta(days=365*8)
-        id_exp   = utcnow() + datetime.timedelta(days=365*2)
-        cur.execute("""INSERT dbo.PersonDocument(DocId,UserId,DocType,IssueDate,UploadedAt,ExpiryDate,FileUrl)
-               VALUES(NEWID(),?,?,?,?,?,?)""",
-            user_id, 'ID', id_issue, utcnow(), id_exp, 'https://example.com/id.pdf')
-        
-        # Criminal Record Certificate
-        criminal_issue = utcnow() - datetime.timedelta(days=90)
-        criminal_exp   = utcnow() + datetime.timedelta(days=275)
-        cur.execute("""INSERT dbo.PersonDocument(DocId,UserId,DocType,IssueDate,UploadedAt,ExpiryDate,FileUrl)
-               VALUES(NEWID(),?,?,?,?,?,?)""",
-            user_id, 'Criminal Record Certificate', criminal_issue, utcnow(), criminal_exp, 'https://example.com/criminal_record.pdf')
-        
-        # Medical Certificate
-        medical_issue = utcnow() - datetime.timedelta(days=180)
-        medical_exp   = utcnow() + datetime.timedelta(days=185)
-        cur.execute("""INSERT dbo.PersonDocument(DocId,UserId,DocType,IssueDate,UploadedAt,ExpiryDate,FileUrl)
-               VALUES(NEWID(),?,?,?,?,?,?)""",
-            user_id, 'Medical Certificate', medical_issue, utcnow(), medical_exp, 'https://example.com/medical_cert.pdf')
-
-        vehicle_specs = {
-            "Sedan":        {"seats": (4,5),   "vol": (350,500),    "wt": (200,400)},
-            "Hatchback":    {"seats": (4,5),   "vol": (250,400),    "wt": (150,300)},
-            "SUV":          {"seats": (5,7),   "vol": (500,800),    "wt": (400,800)},
-            "Coupe":        {"seats": (2,4),   "vol": (200,300),    "wt": (150,250)},
-            "Convertible":  {"seats": (2,4),   "vol": (150,300),    "wt": (150,250)},
-            "Pickup Truck": {"seats": (2,5),   "vol": (800,1500),   "wt": (1000,2000)},
-            "Minivan":      {"seats": (6,8),   "vol": (1000,1500),  "wt": (800,1500)},
-            "Van":          {"seats": (2,3),   "vol": (2000,4000),  "wt": (2000,4000)},
-            "Wagon":        {"seats": (4,5),   "vol": (500,700),    "wt": (400,800)},
-            "Crossover":    {"seats": (5,5),   "vol": (450,600),    "wt": (400,700)},
-            "Luxury Car":   {"seats": (4,5),   "vol": (400,600),    "wt": (300,600)},
-            "Sports Car":   {"seats": (2,4),   "vol": (150,300),    "wt": (150,300)},
-            "Electric Car": {"seats": (4,5),   "vol": (300,500),    "wt": (300,600)},
-            "Hybrid Car":   {"seats": (4,5),   "vol": (300,500),    "wt": (250,500)},
-            "Truck":        {"seats": (2,3),   "vol": (5000,20000), "wt": (5000,20000)},
-        }
+        for doc_type, issued_ago, expires_in, url in (
+            ('Driver License',              365*5, 365*3, 'https://example.com/license.pdf'),
+            ('ID',                          365*8, 365*2, 'https://example.com/id.pdf'),
+            ('Criminal Record Certificate', 90,    275,   'https://example.com/criminal_record.pdf'),
+            ('Medical Certificate',         180,   185,   'https://example.com/medical_cert.pdf'),
+        ):
+            loader.add("PersonDocument", user_id, doc_type, now - datetime.timedelta(days=issued_ago),
+                       now, now + datetime.timedelta(days=expires_in), url)
 
         vehicle_ids = []
-        
+
         # Vehicles per driver
         for v in range(NUM_VEHICLES_PER_DRIVER):
             veh_id = guid()
-            vt_id = random.choice(list(vt_ids.values()))
-            vt_name = [k for k, v in vt_ids.items() if v == vt_id][0]
+            vt_id = random.choice(vt_ids)
+            vt_name = ref.vehicle_types.key(vt_id)
 
             spec = vehicle_specs.get(vt_name, {"seats": (4,5), "vol": (300,500), "wt": (200,600)}) # get spec with fallback
             seats = random.randint(spec["seats"][0], spec["seats"][1])
             cargo_vol = Decimal(str(random.randint(spec["vol"][0], spec["vol"][1])))
             cargo_wt  = Decimal(str(random.randint(spec["wt"][0], spec["wt"][1])))
 
-            cur.execute("""INSERT dbo.Vehicle(VehicleId,VehicleTypeId,Seats,CargoVolume,CargoWeight,Status,UserOwnerPartyId)
-                VALUES(?,?,?,?,?,?,?)""",
-                veh_id, vt_id, seats, cargo_vol, cargo_wt, 'Active', party_u)
-
-            # Vehicle Documents
-            # MOT Document
-            mot_issue = utcnow() - datetime.timedelta(days=180)
-            mot_exp = utcnow() + datetime.timedelta(days=185)
-            cur.execute("""INSERT dbo.VehicleDocument(VehDocId,VehicleId,DocType,IssueDate,UploadedAt,ExpiryDate,FileUrl,Image)
-                       VALUES(NEWID(),?,?,?,?,?,?,?)""",
-                    veh_id, 'MOT', mot_issue, utcnow(), mot_exp,
-                    'https://example.com/mot.pdf', 'https://example.com/mot.png')
-            
-            # Ownership Document
-            ownership_issue = utcnow() - datetime.timedelta(days=365*2)
-            ownership_exp = utcnow() + datetime.timedelta(days=365*3)
-            cur.execute("""INSERT dbo.VehicleDocument(VehDocId,VehicleId,DocType,IssueDate,UploadedAt,ExpiryDate,FileUrl,Image)
-                       VALUES(NEWID(),?,?,?,?,?,?,?)""",
-                    veh_id, 'Ownership', ownership_issue, utcnow(), ownership_exp,
-                    'https://example.com/ownership.pdf', 'https://example.com/ownership.png')
-            
-            # Latest Service Report
-            service_issue = utcnow() - datetime.timedelta(days=90)
-            service_exp = utcnow() + datetime.timedelta(days=275)
-            cur.execute("""INSERT dbo.VehicleDocument(VehDocId,VehicleId,DocType,IssueDate,UploadedAt,ExpiryDate,FileUrl,Image)
-                       VALUES(NEWID(),?,?,?,?,?,?,?)""",
-                    veh_id, 'Service Report', service_issue, utcnow(), service_exp,
-                    'https://example.com/service.pdf', 'https://example.com/service.png')
-            
+            loader.add("Vehicle", veh_id, vt_id, user_id, seats, cargo_vol, cargo_wt, 'Active')
+
+            # Vehicle Documents (MOT, ownership, latest service report)
+            for doc_type, issued_ago, expires_in, name in (
+                ('MOT',            180,   185,   'mot'),
+                ('Ownership',      365*2, 365*3, 'ownership'),
+                ('Service Report', 90,    275,   'service'),
+            ):
+                loader.add("VehicleDocument", veh_id, doc_type, now - datetime.timedelta(days=issued_ago),
+                           now, now + datetime.timedelta(days=expires_in),
+                           f'https://example.com/{name}.pdf', f'https://example.com/{name}.png')
+
             # Vehicle Test
-            cur.execute("INSERT dbo.VehicleTest(TestId,VehicleId,InspectorId,CheckDate,Comments) VALUES(NEWID(), ?, ?, DATEADD(DAY,-20,SYSUTCDATETIME()), N'OK')", veh_id, random.choice(inspector_ids))
-
-            # Vehicle daily availability
-            avail_date = utcnow().date()
-            cur.execute("""INSERT dbo.VehicleAvailabilityDaily(VehicleId,AvailabilityDate,StartsAt,EndsAt,IsRecurring,UpdatedAt)
-                           VALUES(?,?,?,?,?,SYSUTCDATETIME())""",
-                        veh_id, avail_date, "08:00", "18:00", random.choice([0,1]))
-            
+            loader.add("VehicleTest", guid(), veh_id, random.choice(refs["inspector_ids"]),
+                       now - datetime.timedelta(days=20), 'OK')
+
             # Vehicle Location
-            cur.execute("""INSERT dbo.VehicleLocationLive(VehicleId,Lat,Lng,UpdatedAt)
-                           VALUES(?, 34.69, 32.96, SYSUTCDATETIME())""", veh_id)
+            loader.add("VehicleLocationLive", veh_id, 34.69, 32.96, now)
 
-            # Driver Service Enrollment (for compatible ride+service types)
-            compatible_combos = [(svc_key, rt_key) for svc_key, rt_key, vt, _ in combo_specs if vt == vt_name]
+            # Driver Service Enrollment (for compatible ride+service types) and the driver's daily window.
+            # EnrollIds follow from the driver's index, so shards never hand out the same one.
+            compatible_combos = ref.combos_by_vehicle_type.get(vt_id)
             if compatible_combos:
-                svc_key, rt_key = random.choice(compatible_combos)
-                cur.execute("""INSERT dbo.UserServiceEnrollment(EnrollId,[Status],VehicleId,ServiceType,RideType,ApprovedAt,ApprovedById,UserId)
-                               VALUES(NEWID(),'Approved', ?, ?, ?, SYSUTCDATETIME(), ?, ?)""",
-                            veh_id, svc_ids[svc_key], rt_ids[rt_key],
-                            random.choice(operator_ids), user_id)
+                enroll_id = refs["first_enroll_id"] + i * NUM_VEHICLES_PER_DRIVER + v
+                svc_id, rt_id = random.choice(compatible_combos)
+                loader.add("UserServiceEnrollment", enroll_id, user_id, veh_id, svc_id, rt_id, 'Approved', now,
+                           random.choice(refs["operator_ids"]))
+                loader.add("DriverAvailability", enroll_id, now.date(), random.choice(refs["zone_ids"]),
+                           "08:00", "18:00", random.choice([0,1]), now)
 
             vehicle_ids.append(veh_id)
 
-        drivers.append((party_u, user_id, vehicle_ids))
+        drivers.append((user_id, vehicle_ids))
+    return drivers
 
-    # Credit cards
-    owner_party_ids = []
-    owner_party_ids += [p_party for (p_party, _u) in passengers]
-    owner_party_ids += [d_party for (d_party, _u, _vehlist) in drivers]
-    owner_party_ids += comp_parties
 
-    cards = []
-    now = utcnow()
-    cur.fast_executemany = True
-    for owner in owner_party_ids:
-        for i in range(NUM_CREDIT_CARDS_PER_ENTITY):
-            card_id    = guid()
-            last4      = f"{random.randint(0, 9999):04d}"
-            exp_month  = random.randint(1, 12)
-            exp_year   = now.year + random.randint(1, 5)
-            token      = f"tok_{uuid.uuid4().hex}_{owner.replace('-', '')[:8]}_{i}"
-            is_default = 1 if i == 0 else 0
-            is_active  = 1 if i == 0 else random.choice([0, 1])
-
-            cards.append((
-                card_id, owner, last4, token,
-                exp_month, exp_year, is_default, is_active, now
-            ))
-
-    if cards:
-        cur.executemany("""
-            INSERT INTO dbo.CreditCard
-            (CardId, OwnerId, Last4, Token, ExpMonth, ExpYear, IsDefault, IsActive, AddedAt)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, cards)
-    
-    # Geofences & Bridges
+def gen_geofences(loader, next_id):
+    planner = RoutePlanner()
     zones = []
     for i in range(NUM_GEOFENCE_ZONES):
-        zid = guid()
+        zid = next(next_id["Geofencezone"])
         minlat = 34.65 + i*0.02
         minlng = 32.95 + i*0.02
         maxlat = minlat + 0.02
         maxlng = minlng + 0.03
-        cur.execute("""INSERT dbo.Geofencezone(ZoneId,MinLat,MinLng,MaxLat,MaxLng,[Name])
-                        VALUES(?,?,?,?,?,?)""",
-                    zid, minlat, minlng, maxlat, maxlng, f"Zone {i+1}")
+        loader.add("Geofencezone", zid, minlat, minlng, maxlat, maxlng, f"Zone {i+1}")
+        planner.add_zone(zid, minlat, minlng, maxlat, maxlng)
         zones.append(zid)
 
     # connect consecutive zones with a bridge
     bridge_ids = []
     for i in range(len(zones)-1):
-        bid = guid()
-        cur.execute("INSERT dbo.Bridge(BridgeId,[Name],FromZone,ToZone) VALUES(?,?,?,?)",
-                    bid, f"Bridge {i+1}", zones[i], zones[i+1])
+        bid = next(next_id["Bridge"])
+        loader.add("Bridge", bid, f"Bridge {i+1}", zones[i], zones[i+1])
+        planner.add_bridge(bid, zones[i], zones[i+1])
         bridge_ids.append(bid)
+    return zones, bridge_ids, planner
 
-    # Ride flow: requests -> legs -> dispatch offers -> rides (+payments, messages, rating) ----
-    # choose any profile
-    rp_id = profile_any
 
+def gen_rides(loader, passengers, drivers, planner, fares, rp_id, next_id):
+    # Ride flow: requests -> legs -> dispatch offers -> rides (+payments, messages, rating)
     for i in range(RIDES_TO_CREATE):
-        p_party, p_user = random.choice(passengers)
-        d_party, d_user, veh = random.choice(drivers)
+        now = utcnow()
+        p_user = random.choice(passengers)
+        d_user, vehicles = random.choice(drivers)
+        veh = random.choice(vehicles)
 
         # Ride Request
-        req_id = guid()
-        start_time = utcnow() - datetime.timedelta(minutes=random.randint(10, 120))
-        cur.execute("""INSERT dbo.RideRequest(RequestId,PassengerId,NumOfPeople,PickupAt,PickupLat,PickupLng,DropLat,DropLng,
-                     PickupCountry,PickupRegion,PickupCity,PickupDistrict,PickupPostalCode,
-                     DropCountry,DropRegion,DropCity,DropDistrict,DropPostalCode,
-                     CreatedAt,Status,RideProfileId)
-                     VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,SYSUTCDATETIME(),'Pending',?)""",
-                    req_id, p_user, random.randint(1,2), start_time,
-                    34.690, 32.960, 34.720, 33.010,
-                    'Κύπρος','Λευκωσία','Λευκωσία', 'Κέντρο','1010',
-                    'Κύπρος','Λευκωσία','Λευκωσία', 'Άλλη','1020',
-                    rp_id)
-
-        # Itinerary leg (maybe via first bridge)
-        leg_id = guid()
-        via_bid = random.choice(bridge_ids) if bridge_ids else None
-        cur.execute("INSERT dbo.ItineraryLeg(LegId,SeqNo,ViaBridgeId,RideRequestId) VALUES(?,1,?,?)",
-                    leg_id, via_bid, req_id)
-        if via_bid:
-            cur.execute("INSERT dbo.LegCrossesBridge(ItineraryLeg,Bridge) VALUES(?,?)", leg_id, via_bid)
-
-        # Dispatch Offer to DRIVER party
-        offer_id = guid()
+        req_id = next(next_id["RideRequest"])
+        start_time = now - datetime.timedelta(minutes=random.randint(10, 120))
+        loader.add("RideRequest", req_id, p_user, random.randint(1,2), start_time,
+                   34.690, 32.960, 34.720, 33.010,
+                   'Κύπρος','Λευκωσία','Λευκωσία', 'Κέντρο','1010',
+                   'Κύπρος','Λευκωσία','Λευκωσία', 'Άλλη','1020',
+                   now, 'Pending', rp_id)
+
+        # Itinerary legs: one per bridge on the shortest route between pickup and drop zones
+        new_leg_id = next_id["ItineraryLeg"].__next__
+        route = None
+        if planner.centroids:
+            route = planner.itinerary_rows(req_id, planner.zone_for(34.690, 32.960),
+                                           planner.zone_for(34.720, 33.010), new_leg_id)
+        legs, crossings = route or ([(new_leg_id(), 1, None, req_id)], [])
+        for leg in legs:
+            loader.add("ItineraryLeg", *leg)
+        for crossing in crossings:
+            loader.add("LegCrossesBridge", *crossing)
+        leg_id = legs[0][0]
+
+        # Dispatch Offer to the driver
+        offer_id = next(next_id["DispatchOffer"])
         status = random.choice(["Accepted","Sent","Declined"])
-        cur.execute("""INSERT dbo.DispatchOffer(OfferId,LegId,RecipientPartyId,VehicleId,[Status],SentAt,RespondedAt)
-                       VALUES(?,?,?, ?, ?, SYSUTCDATETIME(), CASE WHEN ?='Accepted' THEN SYSUTCDATETIME() ELSE NULL END)""",
-                    offer_id, leg_id, d_party, veh, status, status)
+        loader.add("DispatchOffer", offer_id, leg_id, d_user, status, now,
+                   now if status == "Accepted" else None)
 
         # If accepted, create payment + ride + messages + optional rating
         if status == "Accepted":
-            pay_id = guid()
-            gross = round(random.uniform(7, 25), 2)
-            fee   = round(gross * 0.1, 2)
-            payout= round(gross - fee, 2)
-            cur.execute("""INSERT dbo.Payment(PaymentId,SenderPartyId,ReceiverPartyId,GrossAmount,OsrhFee,DriverPayout,PaidAt,Method,[Status])
-                           VALUES(?,?,?,?,?,?,SYSUTCDATETIME(),'CreditCard','Completed')""",
-                        pay_id, p_party, d_party, gross, fee, payout)
-
-            ride_id = guid()
+            ride_id = next(next_id["Ride"])
             started = start_time + datetime.timedelta(minutes=random.randint(1, 10))
             ended   = started + datetime.timedelta(minutes=random.randint(10, 25))
-            cur.execute("""INSERT dbo.Ride(RideId,OfferId,DriverUserId,PassengerUserId,VehicleId,
-                           StartedAt,EndedAt,PriceFinal,[Status],Rating,[Payment])
-                           VALUES(?,?,?,?,?,?,?,?, 'Completed', NULL, ?)""",
-                        ride_id, offer_id, d_party, p_user, veh, started, ended, gross, pay_id)
 
-            # Messages
-            cur.execute("""INSERT dbo.InAppMessage(MsgId,SenderUserId,RecipientUserId,[Body],SentAt,[Ride])
-                           VALUES(NEWID(),?,?,N'Φτάνω σε 3 λεπτά',DATEADD(MINUTE,-2,SYSUTCDATETIME()),?)""",
-                        d_user, p_user, ride_id)
-            cur.execute("""INSERT dbo.InAppMessage(MsgId,SenderUserId,RecipientUserId,[Body],SentAt,[Ride])
-                           VALUES(NEWID(),?,?,N'ΟΚ, είμαι στο σημείο',DATEADD(MINUTE,-1,SYSUTCDATETIME()),?)""",
-                        p_user, d_user, ride_id)
-
-            # Sometimes a rating
+            # Fare from the service tariff for the trip distance and duration
+            pay_id = guid()
+            _km, gross, fee, payout = fares.quote_one(34.690, 32.960, 34.720, 33.010,
+                                                      (ended - started).total_seconds() / 60, rp_id)
+            loader.add("Payment", pay_id, p_user, d_user, gross, fee, payout, now, 'CreditCard', 'Completed')
+
+            # Sometimes a rating; it is loaded before the ride so Ride.Rating is set on insert
+            rating_id = None
             if random.random() < 0.6:
-                rating_id = guid()
+                rating_id = next(next_id["Rating"])
                 stars = random.randint(4,5) if random.random() < 0.7 else random.randint(2,3)
-                cur.execute("""INSERT dbo.Rating(RatingId,AuthorUserId,TargetUserId,Stars,Comment,CreatedAt)
-                               VALUES(?,?,?,?,?,SYSUTCDATETIME())""",
-                            rating_id, p_user, d_user, stars, "Ευχάριστη διαδρομή")
-                cur.execute("UPDATE dbo.Ride SET Rating=? WHERE RideId=?", rating_id, ride_id)
+                loader.add("Rating", rating_id, p_user, d_user, stars, "Ευχάριστη διαδρομή", now)
 
-    cn.commit()
-    end_time = datetime.datetime.now()
-    print("✅ Seed completed in " + str(end_time - start_time))
+            loader.add("Ride", ride_id, offer_id, d_user, p_user, veh, started, ended, gross, 'Completed',
+                       rating_id, pay_id)
 
+            # Messages
+            loader.add("InAppMessage", d_user, p_user, 'Φτάνω σε 3 λεπτά',
+                       now - datetime.timedelta(minutes=2), ride_id)
+            loader.add("InAppMessage", p_user, d_user, 'ΟΚ, είμαι στο σημείο',
+                       now - datetime.timedelta(minutes=1), ride_id)
+
+
+# ---------- sharding ----------
+def derive_seed(base, kind, shard):
+    # Stable across processes and runs (unlike hash())
+    digest = hashlib.sha256(f"{base}:{kind}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def reseed(seed):
+    Faker.seed(seed)
+    random.seed(seed)
+
+
+def split(total, parts):
+    # [(start, count)] ranges covering 0..total in `parts` near-equal shards
+    size, extra = divmod(total, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        n = size + (i < extra)
+        if n:
+            ranges.append((start, n))
+        start += n
+    return ranges
+
+
+def make_tasks(kind, total, workers, seed, refs=None):
+    return [(kind, start, count, derive_seed(seed, kind, shard), refs)
+            for shard, (start, count) in enumerate(split(total, workers))]
+
+
+def gen_shard(loader, task):
+    kind, start, count, seed, refs = task
+    reseed(seed)
+    if kind == "companies":
+        return gen_companies(loader, start, count)
+    if kind == "passengers":
+        return gen_passengers(loader, start, count)
+    return gen_drivers(loader, start, count, refs)
+
+
+def seed_shard(task, batch_size):
+    # Runs in a worker process with its own connection and transaction
+    cn = connect()
+    cn.autocommit = False
+    try:
+        cur = cn.cursor()
+        loader = BulkLoader(cur, TABLES, batch_size=batch_size, identity_insert=IDENTITY_COLUMNS)
+        result = gen_shard(loader, task)
+        loader.flush()
+        cn.commit()
+    finally:
+        cn.close()
+    return result, loader.stats
+
+
+def run_shards(executor, loader, tasks, batch_size):
+    if executor is None:
+        return [gen_shard(loader, task) for task in tasks]
+    results = []
+    for result, stats in executor.map(seed_shard, tasks, [batch_size] * len(tasks)):
+        loader.merge_stats(stats)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with fake data")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="rows buffered per table before a bulk flush")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes generating passengers, drivers and companies in parallel")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply the NUM_* entity counts, e.g. 100 for load-test data")
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    # Only the parent process reads these, so rebinding the module globals is enough
+    for knob in SCALED_KNOBS:
+        globals()[knob] = max(1, round(globals()[knob] * args.scale))
+
+    cn = connect()
+    cn.autocommit = False
+
+    with cn:
+        cur = cn.cursor()
+        seed_started = datetime.datetime.now()
+        reseed(derive_seed(args.seed, "main", 0))
+
+        ref = ReferenceData.ensure(cur, ride_types, services, veh_types, combo_specs)
+        loader = BulkLoader(cur, TABLES, batch_size=args.batch_size, identity_insert=IDENTITY_COLUMNS)
+        next_id = {table: itertools.count(cur.execute(f"SELECT ISNULL(MAX([{column}]), 0) + 1 FROM dbo.[{table}]")
+                                          .fetchone()[0])
+                   for table, column in IDENTITY_COLUMNS.items()}
+        admin_ids, operator_ids, inspector_ids = gen_staff(loader)
+        zones, bridge_ids, planner = gen_geofences(loader, next_id)
+
+        executor = None
+        if workers > 1:
+            # Workers use their own connections: parent rows must be committed first
+            loader.flush()
+            cn.commit()
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        try:
+            refs = {
+                "ref": ref, "operator_ids": operator_ids, "inspector_ids": inspector_ids, "zone_ids": zones,
+                "first_enroll_id": next(next_id["UserServiceEnrollment"]),
+            }
+            tasks = (make_tasks("companies", NUM_COMPANIES, workers, args.seed)
+                     + make_tasks("passengers", NUM_PASSENGERS, workers, args.seed)
+                     + make_tasks("drivers", NUM_DRIVERS, workers, args.seed, refs))
+            passengers, drivers = [], []
+            for task, result in zip(tasks, run_shards(executor, loader, tasks, args.batch_size)):
+                if task[0] == "passengers":
+                    passengers.extend(result)
+                elif task[0] == "drivers":
+                    drivers.extend(result)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        reseed(derive_seed(args.seed, "main", 1))
+        gen_rides(loader, passengers, drivers, planner, FareEngine.from_db(cur), ref.any_profile(), next_id)
+
+        loader.flush()
+        cn.commit()
+        end_time = datetime.datetime.now()
+        loader.report()
+        print("✅ Seed completed in " + str(end_time - seed_started))
+
+
+if __name__ == "__main__":
+    main()
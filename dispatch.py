@@ -0,0 +1,236 @@
+import argparse
+import datetime
+import random
+import re
+import statistics
+import time
+import uuid
+
+from spatial_index import PointIndex, ZoneIndex, haversine_km
+
+
+class DispatchEngine:
+    """Finds the k nearest vehicles able to serve a ride request.
+
+    Locations live in a grid index that takes incremental updates; the
+    eligibility data (vehicle capacity, approved enrollments, their
+    DriverAvailability windows, zones, ride profiles) is loaded once and
+    patched via the setters.
+    """
+
+    def __init__(self):
+        self.locations = PointIndex()
+        self.zones = ZoneIndex()
+        self.vehicles = {}      # VehicleId -> (Seats, CargoVolume, Status)
+        self.enrollments = {}   # VehicleId -> {(ServiceTypeId, RideTypeId): (EnrollId, UserId)}
+        self.availability = {}  # EnrollId -> [(GeofencezoneId, AvailabilityDate, StartsAt, EndsAt, IsRecurring)]
+        self.profiles = {}      # RideProfileId -> (ServiceTypeId, RideTypeId)
+
+    @classmethod
+    def from_db(cls, cur):
+        engine = cls()
+        for profile_id, svc_id, rt_id in cur.execute(
+                "SELECT RideProfileId, ServiceTypeId, RideTypeId FROM dbo.AllowedRideProfile"):
+            engine.profiles[profile_id] = (svc_id, rt_id)
+        for vehicle_id, seats, volume, status in cur.execute(
+                "SELECT VehicleId, Seats, CargoVolume, Status FROM dbo.Vehicle"):
+            engine.set_vehicle(vehicle_id, seats, volume, status)
+        for zone_id, min_lat, min_lng, max_lat, max_lng in cur.execute(
+                "SELECT ZoneId, MinLat, MinLng, MaxLat, MaxLng FROM dbo.Geofencezone"):
+            engine.zones.upsert(zone_id, min_lat, min_lng, max_lat, max_lng)
+        for enroll_id, vehicle_id, svc_id, rt_id, user_id in cur.execute(
+                """SELECT EnrollId, VehicleId, ServiceType, RideType, UserId FROM dbo.UserServiceEnrollment
+                   WHERE [Status] = 'Approved'"""):
+            engine.enroll(enroll_id, vehicle_id, svc_id, rt_id, user_id)
+        # A vehicle is available while the driver of one of its enrollments is;
+        # one-off windows in the past can never match again
+        for enroll_id, zone_id, day, starts, ends, recurring in cur.execute(
+                """SELECT a.EnrollId, a.GeofencezoneId, a.AvailabilityDate, a.StartsAt, a.EndsAt, a.IsRecurring
+                   FROM dbo.DriverAvailability a
+                   JOIN dbo.UserServiceEnrollment e ON e.EnrollId = a.EnrollId
+                   WHERE e.[Status] = 'Approved'
+                     AND (a.IsRecurring = 1 OR a.AvailabilityDate >= CAST(SYSUTCDATETIME() AS DATE))"""):
+            engine.add_availability(enroll_id, zone_id, day, starts, ends, recurring)
+        for vehicle_id, lat, lng in cur.execute("SELECT VehicleId, Lat, Lng FROM dbo.VehicleLocationLive"):
+            engine.update_location(vehicle_id, lat, lng)
+        return engine
+
+    # ---------- incremental updates ----------
+    def update_location(self, vehicle_id, lat, lng):
+        self.locations.move(vehicle_id, lat, lng)
+
+    def set_vehicle(self, vehicle_id, seats, cargo_volume, status="Active"):
+        self.vehicles[vehicle_id] = (seats, float(cargo_volume or 0), status)
+
+    def remove_vehicle(self, vehicle_id):
+        self.vehicles.pop(vehicle_id, None)
+        for enroll_id, _user_id in self.enrollments.pop(vehicle_id, {}).values():
+            self.availability.pop(enroll_id, None)
+        self.locations.remove(vehicle_id)
+
+    def enroll(self, enroll_id, vehicle_id, service_type_id, ride_type_id, user_id):
+        self.enrollments.setdefault(vehicle_id, {})[(service_type_id, ride_type_id)] = (enroll_id, user_id)
+
+    def unenroll(self, vehicle_id, service_type_id, ride_type_id):
+        enrolled = self.enrollments.get(vehicle_id, {}).pop((service_type_id, ride_type_id), None)
+        if enrolled is not None:
+            self.availability.pop(enrolled[0], None)
+
+    def add_availability(self, enroll_id, zone_id, day, starts_at, ends_at, recurring=False):
+        self.availability.setdefault(enroll_id, []).append(
+            (zone_id, day, _time(starts_at), _time(ends_at), bool(recurring)))
+
+    # ---------- queries ----------
+    def is_available(self, enroll_id, at, zones):
+        """True if the enrollment has a window covering `at` in one of `zones` (the pickup's zones)."""
+        day, t = at.date(), at.time()
+        for zone_id, window_day, starts, ends, recurring in self.availability.get(enroll_id, ()):
+            # Recurring windows repeat every day from AvailabilityDate on
+            if (zone_id in zones and (window_day == day or (recurring and window_day <= day))
+                    and starts <= t < ends):
+                return True
+        return False
+
+    def nearest(self, lat, lng, ride_profile_id, num_people=1, k=5, at=None, cargo_volume=0, max_km=50.0):
+        """[(VehicleId, DriverUserId, km)] for the k closest eligible vehicles."""
+        combo = self.profiles[ride_profile_id]
+        at = at or datetime.datetime.utcnow()
+        zones = set(self.zones.zones_at(lat, lng))
+        if not zones:
+            return []
+
+        def eligible(vehicle_id):
+            vehicle = self.vehicles.get(vehicle_id)
+            if vehicle is None:
+                return False
+            seats, volume, status = vehicle
+            enrolled = self.enrollments.get(vehicle_id, {}).get(combo)
+            return (status == "Active" and seats >= num_people and volume >= cargo_volume
+                    and enrolled is not None and self.is_available(enrolled[0], at, zones))
+
+        return [(vehicle_id, self.enrollments[vehicle_id][combo][1], km)
+                for vehicle_id, km in self.locations.nearest(lat, lng, k, eligible, max_km)]
+
+
+def _time(value):
+    if isinstance(value, str):
+        return datetime.time.fromisoformat(value)
+    return value
+
+
+# ---------- benchmark ----------
+def benchmark(num_vehicles, num_queries, k, seed=342):
+    rng = random.Random(seed)
+    lat0, lat1, lng0, lng1 = 34.55, 35.70, 32.25, 34.60
+    grid = 5
+    profiles = [f"profile-{i}" for i in range(10)]
+    today = datetime.date.today()
+
+    engine = DispatchEngine()
+    for i, profile in enumerate(profiles):
+        engine.profiles[profile] = (i % 5, i // 5)
+    dlat, dlng = (lat1 - lat0) / grid, (lng1 - lng0) / grid
+    for zone_id in range(grid * grid):
+        r, c = divmod(zone_id, grid)
+        engine.zones.upsert(zone_id, lat0 + r * dlat, lng0 + c * dlng, lat0 + (r + 1) * dlat, lng0 + (c + 1) * dlng)
+    enroll_id = 0
+    for vehicle_id in range(num_vehicles):
+        engine.set_vehicle(vehicle_id, rng.randint(2, 8), rng.randint(200, 4000),
+                           "Active" if rng.random() < 0.95 else "Inactive")
+        lat, lng = rng.uniform(lat0, lat1), rng.uniform(lng0, lng1)
+        home = engine.zones.zones_at(lat, lng)[0] if rng.random() < 0.9 else rng.randrange(grid * grid)
+        for profile in rng.sample(profiles, 2):
+            enroll_id += 1
+            engine.enroll(enroll_id, vehicle_id, *engine.profiles[profile], f"driver-{vehicle_id}")
+            engine.add_availability(enroll_id, home, today, "08:00", "18:00" if rng.random() < 0.8 else "09:00",
+                                    rng.random() < 0.5)
+        engine.update_location(vehicle_id, lat, lng)
+
+    at = datetime.datetime.combine(today, datetime.time(12, 0))
+    queries = [(rng.uniform(lat0, lat1), rng.uniform(lng0, lng1), rng.choice(profiles), rng.randint(1, 4))
+               for _ in range(num_queries)]
+
+    timings = []
+    for lat, lng, profile, people in queries:
+        started = time.perf_counter()
+        engine.nearest(lat, lng, profile, people, k=k, at=at)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"{num_vehicles} vehicles, {num_queries} queries, k={k}")
+    print(f"indexed   mean {statistics.mean(timings) * 1e6:8.1f} us   "
+          f"p50 {timings[len(timings) // 2] * 1e6:8.1f} us   p99 {timings[int(len(timings) * 0.99)] * 1e6:8.1f} us")
+
+    # Naive: distance to every vehicle, then filter and sort
+    sample = queries[:max(1, num_queries // 100)]
+    started = time.perf_counter()
+    for lat, lng, profile, people in sample:
+        combo = engine.profiles[profile]
+        zones = set(engine.zones.zones_at(lat, lng))
+        hits = [(haversine_km(lat, lng, *pos), v) for v, pos in engine.locations.points.items()
+                if engine.vehicles[v][2] == "Active" and engine.vehicles[v][0] >= people
+                and combo in engine.enrollments[v] and engine.is_available(engine.enrollments[v][combo][0], at, zones)]
+        sorted(hits)[:k]
+    naive = (time.perf_counter() - started) / len(sample)
+    print(f"full scan mean {naive * 1e6:8.1f} us")
+
+    # Location updates
+    started = time.perf_counter()
+    for _ in range(num_queries):
+        engine.update_location(rng.randrange(num_vehicles), rng.uniform(lat0, lat1), rng.uniform(lng0, lng1))
+    print(f"update    mean {(time.perf_counter() - started) / num_queries * 1e6:8.1f} us")
+
+
+# ---------- from_db check ----------
+class _FakeCursor:
+    """Answers from_db's queries with rows shaped like the DDL's tables."""
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def execute(self, sql, *params):
+        return iter(self.tables[re.search(r"FROM dbo\.(\w+)", sql).group(1)])
+
+
+def check_from_db():
+    """Load an engine from schema-shaped rows and check which vehicles from_db lets dispatch."""
+    today = datetime.date.today()
+    v1, v2, v3, v4 = (uuid.UUID(int=i) for i in range(1, 5))
+    u1, u2, u3, u4 = (uuid.UUID(int=i) for i in range(11, 15))
+    t = datetime.time.fromisoformat
+    cur = _FakeCursor({
+        "AllowedRideProfile": [(1, 10, 20)],                                 # RideProfileId, ServiceTypeId, RideTypeId
+        "Vehicle": [(v, 4, 500, "Active") for v in (v1, v2, v3, v4)],       # VehicleId, Seats, CargoVolume, Status
+        "Geofencezone": [(1, 32.00, 34.70, 32.20, 34.90),                    # ZoneId, MinLat, MinLng, MaxLat, MaxLng
+                         (2, 31.70, 35.10, 31.90, 35.30)],
+        # Approved only, as the query filters; EnrollId, VehicleId, ServiceType, RideType, UserId
+        "UserServiceEnrollment": [(1, v1, 10, 20, u1), (2, v2, 10, 20, u2), (3, v3, 10, 20, u3),
+                                  (4, v4, 10, 20, u4)],
+        # EnrollId, GeofencezoneId, AvailabilityDate, StartsAt, EndsAt, IsRecurring
+        "DriverAvailability": [(1, 1, today, t("08:00"), t("18:00"), False),
+                               (2, 2, today, t("08:00"), t("18:00"), False),          # other zone
+                               (3, 1, today, t("13:00"), t("18:00"), False),          # later shift
+                               (4, 1, today - datetime.timedelta(days=7), t("08:00"), t("18:00"), True)],
+        "VehicleLocationLive": [(v, 32.10, 34.80 + i * 0.001) for i, v in enumerate((v1, v2, v3, v4))],
+    })
+    engine = DispatchEngine.from_db(cur)
+    at = datetime.datetime.combine(today, datetime.time(12, 0))
+    found = [(vehicle_id, user_id) for vehicle_id, user_id, _km in engine.nearest(32.10, 34.80, 1, k=5, at=at)]
+    assert found == [(v1, u1), (v4, u4)], found
+    assert engine.nearest(31.80, 35.20, 1, k=5, at=at) == []  # v2 works there, but is parked in zone 1
+    assert engine.nearest(33.00, 35.00, 1, k=5, at=at) == []  # outside every zone
+    engine.remove_vehicle(v1)
+    assert 1 not in engine.availability
+    print("from_db check passed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark nearest-vehicle dispatch queries")
+    parser.add_argument("--vehicles", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="check from_db against schema-shaped rows and exit")
+    args = parser.parse_args()
+    if args.check:
+        check_from_db()
+    else:
+        benchmark(args.vehicles, args.queries, args.k)
@@ -0,0 +1,246 @@
+import argparse
+import bisect
+import datetime
+import json
+import random
+import time
+from collections import namedtuple
+
+from db import connect
+
+# (state, table, owner_id, doc_type, expires_at); state is "due" (inside the warning window) or "overdue"
+ExpiryEvent = namedtuple("ExpiryEvent", "state table owner_id doc_type expires_at")
+
+# Uploads committed slightly after the watermark was taken are re-read, which is harmless
+REFRESH_OVERLAP = datetime.timedelta(seconds=60)
+
+_LOAD_SQL = {
+    "PersonDocument": """SELECT UserId, DocType, MAX(ExpiryDate) FROM dbo.PersonDocument
+                         WHERE UploadedAt > ? GROUP BY UserId, DocType""",
+    "VehicleDocument": """SELECT VehicleId, DocType, MAX(ExpiryDate) FROM dbo.VehicleDocument
+                          WHERE COALESCE(UploadedAt, IssueDate) > ? GROUP BY VehicleId, DocType""",
+    "VehicleTest": """SELECT VehicleId, NULL, MAX(ExpiryDate) FROM dbo.VehicleTest
+                      WHERE CheckDate > ? GROUP BY VehicleId""",
+}
+
+
+class ExpiryQueue:
+    """Calendar queue: expiry times bucketed by day, buckets kept in day order.
+
+    Range queries touch only the buckets inside the range, and moving a key
+    (a renewal) is O(1) plus an insort when a new day bucket appears.
+    """
+
+    def __init__(self):
+        self.expiry = {}        # key -> expires_at
+        self._buckets = {}      # day ordinal -> {key: expires_at}
+        self._days = []         # sorted day ordinals with a bucket
+
+    def __len__(self):
+        return len(self.expiry)
+
+    def set(self, key, expires_at):
+        self.remove(key)
+        day = expires_at.toordinal()
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = {}
+            bisect.insort(self._days, day)
+        bucket[key] = expires_at
+        self.expiry[key] = expires_at
+
+    def remove(self, key):
+        old = self.expiry.pop(key, None)
+        if old is None:
+            return
+        day = old.toordinal()
+        bucket = self._buckets[day]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[day]
+            del self._days[bisect.bisect_left(self._days, day)]
+
+    def between(self, start, end):
+        """[(expires_at, key)] with start <= expires_at < end, earliest first."""
+        found = []
+        lo = bisect.bisect_left(self._days, start.toordinal())
+        hi = bisect.bisect_right(self._days, end.toordinal())
+        for day in self._days[lo:hi]:
+            found += [(at, key) for key, at in self._buckets[day].items() if start <= at < end]
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+class ExpiryScheduler:
+    """Due/overdue events for PersonDocument, VehicleDocument and VehicleTest.
+
+    Each (table, owner, doc type) is tracked at the latest ExpiryDate
+    uploaded for it, so a renewal replaces the old expiry. tick() only scans
+    the part of the timeline that entered the warning window or expired
+    since the previous tick, plus keys changed in between, and emits each
+    state once per expiry.
+    """
+
+    def __init__(self, warn=datetime.timedelta(days=7)):
+        self.warn = warn
+        self.queue = ExpiryQueue()
+        self.loaded_at = None
+        self._emitted = {}          # key -> "due" | "overdue" for its current expiry
+        self._changed = set()       # keys updated behind the scanned horizons
+        self._due_until = None      # due window already scanned up to here
+        self._overdue_until = None  # expiries already checked up to here
+
+    @classmethod
+    def from_db(cls, cur, warn=datetime.timedelta(days=7)):
+        scheduler = cls(warn)
+        scheduler.refresh(cur)
+        return scheduler
+
+    def refresh(self, cur):
+        """Apply uploads since the last refresh (everything on the first call)."""
+        now = cur.execute("SELECT SYSUTCDATETIME()").fetchone()[0]
+        since = self.loaded_at - REFRESH_OVERLAP if self.loaded_at else datetime.datetime(1900, 1, 1)
+        changed = 0
+        for table, sql in _LOAD_SQL.items():
+            for owner_id, doc_type, expires_at in cur.execute(sql, since).fetchall():
+                changed += self.update((table, owner_id, doc_type), expires_at)
+        self.loaded_at = now
+        return changed
+
+    def update(self, key, expires_at):
+        """Record an upload; only a later expiry than the tracked one counts."""
+        current = self.queue.expiry.get(key)
+        if current is not None and current >= expires_at:
+            return False
+        self.queue.set(key, expires_at)
+        self._emitted.pop(key, None)
+        if self._due_until is not None and expires_at < self._due_until:
+            self._changed.add(key)
+        return True
+
+    def remove(self, key):
+        self.queue.remove(key)
+        self._emitted.pop(key, None)
+        self._changed.discard(key)
+
+    def _emit(self, key, expires_at, now, events):
+        state = "overdue" if expires_at <= now else "due" if expires_at < now + self.warn else None
+        if state is None or self._emitted.get(key) == state:
+            return
+        self._emitted[key] = state
+        events.append(ExpiryEvent(state, key[0], key[1], key[2], expires_at))
+
+    def tick(self, now):
+        """Events for everything that became due or overdue since the last tick."""
+        events = []
+        horizon = now + self.warn
+        start = self._due_until or datetime.datetime.min
+        for expires_at, key in self.queue.between(start, horizon):
+            self._emit(key, expires_at, now, events)
+        start = self._overdue_until or datetime.datetime.min
+        for expires_at, key in self.queue.between(start, now + datetime.timedelta(microseconds=1)):
+            self._emit(key, expires_at, now, events)
+        for key in self._changed:
+            if key in self.queue.expiry:
+                self._emit(key, self.queue.expiry[key], now, events)
+        self._changed.clear()
+        self._due_until, self._overdue_until = horizon, now
+        return events
+
+    def expiring(self, now, within=datetime.timedelta(days=7)):
+        return self.queue.between(now, now + within)
+
+
+def apply_overdue(conn, events, batch_size=1000):
+    """Suspend what overdue documents cover: the vehicle, or the driver's approved enrollments."""
+    vehicles = sorted({e.owner_id for e in events if e.state == "overdue" and e.table != "PersonDocument"})
+    people = sorted({e.owner_id for e in events if e.state == "overdue" and e.table == "PersonDocument"})
+    cur = conn.cursor()
+    try:
+        suspended = 0
+        for i in range(0, len(vehicles), batch_size):
+            cur.execute("""UPDATE dbo.Vehicle SET [Status] = 'Inactive'
+                           WHERE [Status] = 'Active' AND VehicleId IN (SELECT [value] FROM OPENJSON(?))""",
+                        json.dumps([str(v) for v in vehicles[i:i + batch_size]]))
+            suspended += cur.rowcount
+        for i in range(0, len(people), batch_size):
+            cur.execute("""UPDATE dbo.UserServiceEnrollment SET [Status] = 'Pending'
+                           WHERE [Status] = 'Approved' AND UserId IN (SELECT [value] FROM OPENJSON(?))""",
+                        json.dumps([str(p) for p in people[i:i + batch_size]]))
+            suspended += cur.rowcount
+        conn.commit()
+        return suspended
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# ---------- benchmark ----------
+def benchmark(num_docs, queries, seed=342):
+    rng = random.Random(seed)
+    now = datetime.datetime(2025, 1, 1)
+    docs = [(("PersonDocument", i // 4, i % 4), now + datetime.timedelta(seconds=rng.randrange(-90, 1095) * 86400))
+            for i in range(num_docs)]
+    print(f"{num_docs:,} documents, {queries} 'expiring in the next 7 days' queries")
+
+    started = time.perf_counter()
+    scheduler = ExpiryScheduler()
+    for key, at in docs:
+        scheduler.update(key, at)
+    print(f"build calendar queue    {time.perf_counter() - started:8.2f} s")
+
+    offsets = [datetime.timedelta(days=rng.randrange(0, 365)) for _ in range(queries)]
+    started = time.perf_counter()
+    for off in offsets:
+        t, horizon = now + off, now + off + datetime.timedelta(days=7)
+        naive = [(at, key) for key, at in docs if t <= at < horizon]
+    scan = (time.perf_counter() - started) / queries
+    print(f"naive full scan         {scan * 1e3:8.2f} ms/query")
+
+    started = time.perf_counter()
+    for off in offsets:
+        found = scheduler.expiring(now + off)
+    bucketed = (time.perf_counter() - started) / queries
+    print(f"calendar queue range    {bucketed * 1e3:8.2f} ms/query   x{scan / bucketed:.0f}")
+    assert sorted(naive) == found
+
+    renewals = [(docs[rng.randrange(num_docs)][0], now + datetime.timedelta(days=rng.randrange(365, 1460)))
+                for _ in range(100000)]
+    started = time.perf_counter()
+    for key, at in renewals:
+        scheduler.update(key, at)
+    print(f"incremental renewal     {(time.perf_counter() - started) / len(renewals) * 1e6:8.2f} us/upload")
+
+    scheduler.tick(now)
+    started = time.perf_counter()
+    emitted = sum(len(scheduler.tick(now + datetime.timedelta(hours=h))) for h in range(1, 24 * 30 + 1))
+    print(f"hourly ticks for 30 days {(time.perf_counter() - started) / (24 * 30) * 1e3:7.2f} ms/tick "
+          f"({emitted:,} events)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Document expiry scheduler")
+    parser.add_argument("--benchmark", type=int, metavar="DOCS", help="synthetic benchmark with DOCS documents")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=60, help="seconds between refresh/tick cycles")
+    parser.add_argument("--suspend", action="store_true", help="suspend vehicles/enrollments on overdue events")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.queries)
+    else:
+        cn = connect(autocommit=False)
+        cur = cn.cursor()
+        scheduler = ExpiryScheduler.from_db(cur)
+        print(f"tracking {len(scheduler.queue)} document expiries")
+        while True:
+            scheduler.refresh(cur)
+            events = scheduler.tick(scheduler.loaded_at)
+            for e in events:
+                print(f"{e.state:8} {e.table:16} {e.owner_id} {e.doc_type or '':20} {e.expires_at}")
+            if args.suspend and events:
+                print(f"suspended {apply_overdue(cn, events)} vehicles/enrollments")
+            cn.commit()
+            time.sleep(args.interval)
@@ -0,0 +1,141 @@
+import csv
+import datetime
+import decimal
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:     # Arrow / Parquet export are optional
+    pa = pq = None
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def available_formats():
+    return [f for f in FORMATS if f == "csv" or pa is not None]
+
+
+class _Drain:
+    """Write-only file object whose contents are taken out after every batch."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# ---------- CSV ----------
+def csv_chunks(cur, batch_size):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c[0] for c in cur.description])
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    tail = buf.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+# ---------- Arrow / Parquet ----------
+def _arrow_type(description):
+    # Map a pyodbc cursor.description entry (name, type_code, _, _, precision, scale, _)
+    type_code, precision, scale = description[1], description[4], description[5]
+    if type_code is bool:
+        return pa.bool_()
+    if type_code is int:
+        return pa.int64()
+    if type_code is float:
+        return pa.float64()
+    if type_code is decimal.Decimal:
+        return pa.decimal128(precision or 38, scale or 0)
+    if type_code is datetime.datetime:
+        return pa.timestamp("us")
+    if type_code is datetime.date:
+        return pa.date32()
+    if type_code is datetime.time:
+        return pa.time64("us")
+    if type_code in (bytes, bytearray):
+        return pa.binary()
+    return pa.string()
+
+
+def arrow_schema(cur):
+    return pa.schema([pa.field(d[0] or f"col{i}", _arrow_type(d)) for i, d in enumerate(cur.description)])
+
+
+def record_batches(cur, batch_size, schema=None):
+    """Yield one pyarrow RecordBatch per fetchmany batch, built column by column."""
+    schema = schema or arrow_schema(cur)
+    text_columns = [i for i, f in enumerate(schema) if pa.types.is_string(f.type)]
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        for i in text_columns:
+            # GUIDs and other driver objects arrive as non-str values
+            if any(v is not None and not isinstance(v, str) for v in columns[i]):
+                columns[i] = [None if v is None else str(v) for v in columns[i]]
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema)
+
+
+def arrow_chunks(cur, batch_size):
+    schema = arrow_schema(cur)
+    sink = _Drain()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.take()
+        for batch in record_batches(cur, batch_size, schema):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def parquet_chunks(cur, batch_size):
+    # One row group per fetched batch; only the footer metadata grows with the result
+    schema = arrow_schema(cur)
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+        for batch in record_batches(cur, batch_size, schema):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def export_chunks(cur, fmt, batch_size=10000):
+    if fmt not in available_formats():
+        raise ValueError(f"unsupported export format: {fmt}")
+    chunks = {"csv": csv_chunks, "arrow": arrow_chunks, "parquet": parquet_chunks}[fmt]
+    return (chunk for chunk in chunks(cur, batch_size) if chunk)
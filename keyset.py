@@ -0,0 +1,174 @@
+import base64
+import datetime
+import decimal
+import hashlib
+import hmac
+import json
+import re
+import uuid
+
+from query_cache import normalize_sql
+
+_WORD = re.compile(r"[A-Za-z_]\w*")
+_IDENT_PART = r"(?:\[[^\]]+\]|[A-Za-z_]\w*)"
+_COLUMN = re.compile(rf"^(?:{_IDENT_PART}\.)*({_IDENT_PART})$")
+
+
+class TokenError(ValueError):
+    pass
+
+
+def _top_level_words(sql):
+    """(position, UPPER word) for every keyword outside parentheses, strings and brackets."""
+    depth, i, n = 0, 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch in "'\"":
+            end = sql.find(ch, i + 1)
+            while end != -1 and end + 1 < n and sql[end + 1] == ch:     # doubled quote escape
+                end = sql.find(ch, end + 2)
+            i = n if end == -1 else end + 1
+        elif ch == "[":
+            end = sql.find("]", i + 1)
+            i = n if end == -1 else end + 1
+        elif ch == "-" and sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = n if end == -1 else end + 1
+        elif ch == "(":
+            depth, i = depth + 1, i + 1
+        elif ch == ")":
+            depth, i = depth - 1, i + 1
+        else:
+            m = _WORD.match(sql, i)
+            if m:
+                if depth == 0:
+                    yield i, m.group(0).upper()
+                i = m.end()
+            else:
+                i += 1
+
+
+def _split_top_level(text, sep=","):
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        depth += (ch == "(") - (ch == ")")
+        if ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts]
+
+
+class KeysetQuery:
+    """A SELECT paged by seeking past the last key instead of OFFSET.
+
+    `inner` is the user's query without its ORDER BY; `keys` are
+    (output column, descending) pairs. Page n+1 is
+    `SELECT TOP (size) * FROM (inner) t WHERE (k1, k2, ...) > (last row) ORDER BY keys`,
+    which an index on the keys answers with one seek however deep the page.
+    The keys should be unique together (end with the primary key) and
+    non-NULL, or rows tied across a page boundary are skipped.
+    """
+
+    def __init__(self, inner, keys):
+        self.inner = inner
+        self.keys = keys
+
+    @classmethod
+    def plan(cls, sql, key=None):
+        """KeysetQuery for `sql`, or None when it has no usable ORDER BY and no `key` is given.
+
+        `key` ("col [DESC], ...") overrides the query's own ORDER BY.
+        """
+        sql = sql.strip().rstrip(";")
+        words = list(_top_level_words(sql))
+        if any(w in ("TOP", "OFFSET", "FOR", "OPTION", "UNION", "EXCEPT", "INTERSECT", "INTO") for _p, w in words[1:]):
+            return None
+        order_at = [p for (p, w), (_q, nxt) in zip(words, words[1:]) if w == "ORDER" and nxt == "BY"]
+        inner, order_by = (sql[:order_at[-1]].rstrip(), sql[order_at[-1]:].split(None, 2)[2]) if order_at \
+            else (sql, None)
+        spec = key or order_by
+        if not spec:
+            return None
+        keys = []
+        for item in _split_top_level(spec):
+            parts = item.rsplit(None, 1)
+            descending = len(parts) == 2 and parts[1].upper() == "DESC"
+            expr = parts[0] if len(parts) == 2 and parts[1].upper() in ("ASC", "DESC") else item
+            m = _COLUMN.match(expr.strip())
+            if not m:
+                raise ValueError(f"can only page on plain columns, not {expr!r}")
+            keys.append((m.group(1).strip("[]"), descending))
+        return cls(inner, keys)
+
+    @property
+    def fingerprint(self):
+        return hashlib.sha256(repr((normalize_sql(self.inner), self.keys)).encode()).hexdigest()[:16]
+
+    def order_by(self):
+        return ", ".join(f"[{c}]{' DESC' if d else ''}" for c, d in self.keys)
+
+    def page_sql(self, size, after=None):
+        """(sql, params) for the page after the key values `after` (first page if None)."""
+        where, params = "", []
+        if after is not None:
+            # (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... with < for descending keys
+            terms = []
+            for i, (col, desc) in enumerate(self.keys):
+                eq = [f"[{c}] = ?" for c, _d in self.keys[:i]]
+                terms.append("(" + " AND ".join(eq + [f"[{col}] {'<' if desc else '>'} ?"]) + ")")
+                params += list(after[:i + 1])
+            where = " WHERE " + " OR ".join(terms)
+        return f"SELECT TOP ({int(size)}) * FROM ({self.inner}) AS t{where} ORDER BY {self.order_by()}", params
+
+    def last_key(self, columns, row):
+        index = {c.lower(): i for i, c in enumerate(columns)}
+        try:
+            return [row[index[c.lower()]] for c, _d in self.keys]
+        except KeyError as e:
+            raise ValueError(f"order key {e.args[0]!r} must be one of the selected columns") from None
+
+
+# ---------- continuation tokens ----------
+def _encode_value(v):
+    if isinstance(v, datetime.datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, datetime.date):
+        return {"d": v.isoformat()}
+    if isinstance(v, decimal.Decimal):
+        return {"dec": str(v)}
+    if isinstance(v, uuid.UUID):
+        return {"uuid": str(v)}
+    if isinstance(v, (bytes, bytearray)):
+        return {"b": base64.b64encode(v).decode()}
+    return v
+
+
+def _decode_value(v):
+    if not isinstance(v, dict):
+        return v
+    (tag, raw), = v.items()
+    return {"dt": datetime.datetime.fromisoformat, "d": datetime.date.fromisoformat, "dec": decimal.Decimal,
+            "uuid": str, "b": base64.b64decode}[tag](raw)
+
+
+def make_token(secret, query, last_key, page):
+    body = json.dumps({"q": query.fingerprint, "k": [_encode_value(v) for v in last_key], "p": page},
+                      separators=(",", ":")).encode()
+    sig = hmac.new(secret, body, hashlib.sha256).digest()[:12]
+    return base64.urlsafe_b64encode(sig + body).decode().rstrip("=")
+
+
+def read_token(secret, query, token):
+    """(last key values, page number) from a token minted for this same query."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except ValueError:
+        raise TokenError("invalid continuation token") from None
+    sig, body = raw[:12], raw[12:]
+    if not hmac.compare_digest(sig, hmac.new(secret, body, hashlib.sha256).digest()[:12]):
+        raise TokenError("invalid continuation token")
+    data = json.loads(body)
+    if data["q"] != query.fingerprint:
+        raise TokenError("continuation token belongs to a different query")
+    return [_decode_value(v) for v in data["k"]], data["p"]
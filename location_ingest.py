@@ -0,0 +1,304 @@
+import argparse
+import datetime
+import random
+import sqlite3
+import threading
+import time
+
+
+class Backpressure(Exception):
+    pass
+
+
+class LocationIngestor:
+    """Coalesces vehicle location pings and writes them in batches.
+
+    Only the newest ping per VehicleId is kept between flushes. A background
+    thread flushes every `flush_interval` seconds or as soon as `max_batch`
+    vehicles are pending. When `max_pending` vehicles are buffered (the
+    writer is falling behind) new vehicles are refused or made to wait;
+    updates for vehicles already in the buffer are always accepted, since
+    they cost no extra memory.
+
+    A failed batch is split in halves until the rows the writer rejects are
+    found; the rest is written. Rejected pings go back in the buffer and are
+    dropped after `max_retries` failed flushes, so one bad VehicleId cannot
+    hold the buffer full forever.
+    """
+
+    def __init__(self, writer, max_batch=5000, flush_interval=1.0, max_pending=50000, max_retries=3, log=print):
+        self.writer = writer            # callable(rows) with rows = [(VehicleId, Lat, Lng, UpdatedAt)]
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.log = log
+
+        self._buffer = {}               # VehicleId -> (Lat, Lng, UpdatedAt)
+        self._failures = {}             # VehicleId -> failed flushes of its buffered ping
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._started_at = time.monotonic()
+        self._metrics = dict.fromkeys(
+            ("pings", "rejected", "rows_written", "flushes", "flush_errors", "dropped"), 0)
+        self._flush_seconds = 0.0
+        self._flush_max = 0.0
+
+    # ---------- producer side ----------
+    def submit(self, vehicle_id, lat, lng, at=None, timeout=0):
+        """Buffer a ping; waits up to `timeout` seconds when full, then raises Backpressure."""
+        at = at or datetime.datetime.utcnow()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while vehicle_id not in self._buffer and len(self._buffer) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["rejected"] += 1
+                    raise Backpressure(f"{len(self._buffer)} vehicles pending")
+                self._cond.wait(remaining)
+            self._metrics["pings"] += 1
+            current = self._buffer.get(vehicle_id)
+            if current is None or at >= current[2]:     # ignore pings that arrive out of order
+                self._buffer[vehicle_id] = (lat, lng, at)
+            if len(self._buffer) >= self.max_batch:
+                self._cond.notify_all()
+
+    # ---------- flushing ----------
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, {}
+                self._cond.notify_all()     # wake producers blocked on backpressure
+            if not batch:
+                return 0
+            rows = [(vehicle_id, lat, lng, at) for vehicle_id, (lat, lng, at) in batch.items()]
+            started = time.perf_counter()
+            failed, error = self._write(rows)
+            elapsed = time.perf_counter() - started
+            written = len(rows) - len(failed)
+            dropped = 0
+            with self._cond:
+                for vehicle_id, _lat, _lng, _at in failed:
+                    failures = self._failures.get(vehicle_id, 0) + 1
+                    if failures >= self.max_retries:
+                        self._failures.pop(vehicle_id, None)
+                        dropped += 1
+                        continue
+                    self._failures[vehicle_id] = failures
+                    # Put the ping back, unless a newer one arrived meanwhile
+                    ping = batch[vehicle_id]
+                    current = self._buffer.get(vehicle_id)
+                    if current is None or current[2] < ping[2]:
+                        self._buffer[vehicle_id] = ping
+                if written:
+                    for vehicle_id in batch.keys() - {row[0] for row in failed}:
+                        self._failures.pop(vehicle_id, None)
+                    self._metrics["flushes"] += 1
+                    self._metrics["rows_written"] += written
+                    self._flush_seconds += elapsed
+                    self._flush_max = max(self._flush_max, elapsed)
+                if failed:
+                    self._metrics["flush_errors"] += 1
+                    self._metrics["dropped"] += dropped
+            if failed:
+                self.log(f"location flush failed ({len(failed)} of {len(rows)} rows, {dropped} dropped): {error}")
+            return written
+
+    def _write(self, rows):
+        """Write rows; returns (rows the writer rejected, last error)."""
+        try:
+            self.writer(rows)
+            return [], None
+        except Exception as e:
+            error = e
+        # Bisect towards the rejected rows. When both halves fail (a database
+        # outage looks like that) stop and retry everything on the next flush,
+        # so an outage costs three writer calls per flush rather than one per row.
+        while len(rows) > 1:
+            mid = len(rows) // 2
+            failed = []
+            for half in (rows[:mid], rows[mid:]):
+                try:
+                    self.writer(half)
+                except Exception as e:
+                    failed.append(half)
+                    error = e
+            if len(failed) != 1:
+                return [row for half in failed for row in half], error
+            rows = failed[0]
+        return rows, error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._buffer) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="location-flush", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def metrics(self):
+        with self._cond:
+            m = dict(self._metrics, pending=len(self._buffer))
+            flush_seconds, flush_max = self._flush_seconds, self._flush_max
+        elapsed = time.monotonic() - self._started_at
+        m["ping_rate"] = m["pings"] / elapsed if elapsed else 0.0
+        m["coalesce_ratio"] = m["pings"] / m["rows_written"] if m["rows_written"] else 0.0
+        m["flush_avg_ms"] = flush_seconds / m["flushes"] * 1000 if m["flushes"] else 0.0
+        m["flush_max_ms"] = flush_max * 1000
+        return m
+
+
+# ---------- writers ----------
+# Pings for unknown or deleted vehicles are skipped instead of failing FK_VehicleLocationLive_Vehicle
+MERGE_SQL = """
+    MERGE dbo.VehicleLocationLive WITH (HOLDLOCK) AS t
+    USING #VehicleLocationBatch AS s
+    ON t.VehicleId = s.VehicleId
+    WHEN MATCHED AND s.UpdatedAt >= t.UpdatedAt THEN
+        UPDATE SET Lat = s.Lat, Lng = s.Lng, UpdatedAt = s.UpdatedAt
+    WHEN NOT MATCHED AND EXISTS (SELECT 1 FROM dbo.Vehicle v WHERE v.VehicleId = s.VehicleId) THEN
+        INSERT (VehicleId, Lat, Lng, UpdatedAt) VALUES (s.VehicleId, s.Lat, s.Lng, s.UpdatedAt);
+"""
+
+
+def sqlserver_writer(pool):
+    """Bulk-loads the batch into a session temp table, then applies one MERGE."""
+    def write(rows):
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("""
+                    IF OBJECT_ID('tempdb..#VehicleLocationBatch') IS NULL
+                        CREATE TABLE #VehicleLocationBatch (
+                            VehicleId UNIQUEIDENTIFIER NOT NULL PRIMARY KEY,
+                            Lat DECIMAL(9,6) NOT NULL,
+                            Lng DECIMAL(9,6) NOT NULL,
+                            UpdatedAt DATETIME2(0) NOT NULL);
+                    TRUNCATE TABLE #VehicleLocationBatch;
+                """)
+                cur.fast_executemany = True
+                cur.executemany("INSERT #VehicleLocationBatch(VehicleId, Lat, Lng, UpdatedAt) VALUES(?,?,?,?)", rows)
+                cur.execute(MERGE_SQL)
+                conn.commit()
+            finally:
+                cur.close()
+    return write
+
+
+def sqlite_writer(conn):
+    """Local stand-in for dbo.VehicleLocationLive (same upsert semantics)."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS VehicleLocationLive (
+                        VehicleId TEXT PRIMARY KEY, Lat REAL NOT NULL, Lng REAL NOT NULL,
+                        UpdatedAt TEXT NOT NULL)""")
+    lock = threading.Lock()
+
+    def write(rows):
+        with lock, conn:
+            conn.executemany("""
+                INSERT INTO VehicleLocationLive(VehicleId, Lat, Lng, UpdatedAt) VALUES(?,?,?,?)
+                ON CONFLICT(VehicleId) DO UPDATE SET Lat = excluded.Lat, Lng = excluded.Lng,
+                    UpdatedAt = excluded.UpdatedAt
+                WHERE excluded.UpdatedAt >= VehicleLocationLive.UpdatedAt
+            """, [(v, lat, lng, at.isoformat()) for v, lat, lng, at in rows])
+    return write
+
+
+# ---------- rejected row check ----------
+def check_rejected_row(max_retries=3):
+    """A writer that rejects one VehicleId must not stop the other vehicles' pings from landing."""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    store = sqlite_writer(conn)
+    calls = []
+
+    def write(rows):
+        calls.append(len(rows))
+        if any(vehicle_id == "veh-bad" for vehicle_id, *_ in rows):
+            raise ValueError("FK_VehicleLocationLive_Vehicle")
+        store(rows)
+
+    ingestor = LocationIngestor(write, max_retries=max_retries, log=lambda msg: None)
+    at = datetime.datetime(2025, 1, 1, 12, 0)
+    for flush in range(max_retries + 2):
+        for i in range(100):
+            ingestor.submit(f"veh-{i}", 32.0 + flush * 1e-3, 34.8, at + datetime.timedelta(seconds=flush))
+        if flush < max_retries:
+            ingestor.submit("veh-bad", 32.0, 34.8, at)
+        assert ingestor.flush() == 100
+        landed = conn.execute("SELECT COUNT(*), MIN(Lat) FROM VehicleLocationLive").fetchone()
+        assert landed == (100, round(32.0 + flush * 1e-3, 6)), landed
+    m = ingestor.metrics()
+    assert (m["dropped"], m["pending"], m["flush_errors"], m["rows_written"]) == \
+        (1, 0, max_retries, 100 * (max_retries + 2)), m
+    print(f"rejected row check passed ({len(calls)} writer calls)")
+
+
+# ---------- load generator ----------
+def replay(ingestor, num_vehicles, rate, seconds, producers=4, seed=342):
+    """Send synthetic pings at roughly `rate` per second from `producers` threads."""
+    def produce(worker):
+        rng = random.Random(seed + worker)
+        positions = {}
+        per_thread = rate / producers
+        started = time.monotonic()
+        sent = 0
+        while time.monotonic() - started < seconds:
+            vehicle_id = f"veh-{rng.randrange(num_vehicles)}"
+            lat, lng = positions.get(vehicle_id, (rng.uniform(34.6, 35.2), rng.uniform(32.4, 34.0)))
+            lat, lng = lat + rng.uniform(-1e-4, 1e-4), lng + rng.uniform(-1e-4, 1e-4)
+            positions[vehicle_id] = (lat, lng)
+            try:
+                ingestor.submit(vehicle_id, round(lat, 6), round(lng, 6), timeout=0.5)
+            except Backpressure:
+                pass
+            sent += 1
+            ahead = sent / per_thread - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    threads = [threading.Thread(target=produce, args=(w,)) for w in range(producers)]
+    for t in threads:
+        t.start()
+    for _ in range(int(seconds)):
+        time.sleep(1)
+        m = ingestor.metrics()
+        print(f"pings/s {m['ping_rate']:9.0f}  written {m['rows_written']:8}  "
+              f"coalesce x{m['coalesce_ratio']:5.1f}  flush avg {m['flush_avg_ms']:6.1f} ms  "
+              f"pending {m['pending']:6}  rejected {m['rejected']}")
+    for t in threads:
+        t.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay synthetic location pings through the ingestor")
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--rate", type=int, default=20000, help="target pings per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=1.0, help="flush interval in seconds")
+    parser.add_argument("--db", default=":memory:", help="sqlite stand-in database file")
+    parser.add_argument("--check", action="store_true", help="check that a rejected row does not block later batches")
+    args = parser.parse_args()
+    if args.check:
+        check_rejected_row()
+    else:
+        ingestor = LocationIngestor(sqlite_writer(sqlite3.connect(args.db, check_same_thread=False)),
+                                    flush_interval=args.interval).start()
+        replay(ingestor, args.vehicles, args.rate, args.seconds)
+        ingestor.stop()
+        print(ingestor.metrics())
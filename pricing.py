@@ -0,0 +1,183 @@
+import argparse
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from spatial_index import EARTH_RADIUS_KM, haversine_km
+
+OSRH_FEE_RATE = Decimal("0.10")
+MONEY_MAX_CENTS = 10 ** 10 - 1      # dbo.MoneyAmount is DECIMAL(10,2)
+
+
+class UnknownProfileError(KeyError):
+    """A RideProfileId without an active tariff: unknown, or its Servicetype is not valid right now."""
+
+    def __str__(self):
+        return f"no active tariff for ride profile {self.args[0]!r}"
+
+
+def to_cents(value):
+    return int((Decimal(str(value)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    # Decimal with exactly two places, as stored in a MoneyAmount column
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def haversine_km_np(lat1, lng1, lat2, lng2):
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dp, dl = p2 - p1, np.radians(np.subtract(lng2, lng1))
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class FareEngine:
+    """Fare quotes from the active Servicetype tariffs.
+
+    fare = BaseFare + PerKm * km + PerMin * minutes, rounded half-up to the
+    cent; OsrhFee is `fee_rate` of the fare (half-up) and DriverPayout the
+    rest, so fee + payout == fare exactly. Tariffs are held in integer cents;
+    quote() prices whole arrays of requests in one NumPy pass and only falls
+    back to Decimal for the rare fares that land within float noise of a
+    half cent, so results match the per-row Decimal path (quote_one) exactly.
+    """
+
+    def __init__(self, fee_rate=OSRH_FEE_RATE):
+        self.fee_rate = Decimal(fee_rate)
+        self._fee_num, self._fee_den = self.fee_rate.as_integer_ratio()
+        self.tariffs = {}           # ServiceTypeId -> (BaseFare, PerKm, PerMin) as Decimal
+        self.profiles = {}          # RideProfileId -> ServiceTypeId
+        self._rows = {}             # RideProfileId -> row in the tariff arrays
+        self._arrays = None
+
+    @classmethod
+    def from_db(cls, cur, fee_rate=OSRH_FEE_RATE):
+        engine = cls(fee_rate)
+        for service_id, base, per_km, per_min in cur.execute("""
+                SELECT ServiceTypeId, BaseFare, PerKm, PerMin FROM dbo.Servicetype
+                WHERE Active = 1 AND ValidFrom <= SYSUTCDATETIME()
+                  AND (ValidTo IS NULL OR ValidTo > SYSUTCDATETIME())""").fetchall():
+            engine.add_tariff(service_id, base, per_km, per_min)
+        for profile_id, service_id in cur.execute(
+                "SELECT RideProfileId, ServiceTypeId FROM dbo.AllowedRideProfile").fetchall():
+            if service_id in engine.tariffs:
+                engine.add_profile(profile_id, service_id)
+        return engine
+
+    def add_tariff(self, service_type_id, base_fare, per_km, per_min):
+        self.tariffs[service_type_id] = tuple(Decimal(str(v)) for v in (base_fare, per_km, per_min))
+        self._arrays = None
+
+    def add_profile(self, ride_profile_id, service_type_id):
+        self.profiles[ride_profile_id] = service_type_id
+        self._arrays = None
+
+    def _tariff_arrays(self):
+        # One row per profile: (base, per_km, per_min) in cents
+        if self._arrays is None:
+            self._rows = {p: i for i, p in enumerate(self.profiles)}
+            cents = [[int(v * 100) for v in self.tariffs[s]] for s in self.profiles.values()]
+            self._arrays = np.array(cents, dtype=np.int64).reshape(-1, 3).T
+        return self._arrays
+
+    # ---------- money ----------
+    def _fee_cents(self, fare_cents):
+        # Half-up on non-negative integers: floor((2 * fare * num + den) / (2 * den))
+        return (2 * fare_cents * self._fee_num + self._fee_den) // (2 * self._fee_den)
+
+    def _exact_fare_cents(self, profile_id, km, minutes):
+        if profile_id not in self.profiles:
+            raise UnknownProfileError(profile_id)
+        base, per_km, per_min = self.tariffs[self.profiles[profile_id]]
+        fare = (base + per_km * Decimal(float(km)) + per_min * Decimal(float(minutes))) * 100
+        return int(fare.to_integral_value(ROUND_HALF_UP))
+
+    # ---------- quotes ----------
+    def quote_one(self, pickup_lat, pickup_lng, drop_lat, drop_lng, minutes, profile_id):
+        """(km, fare, fee, payout) for one request; money as Decimal."""
+        km = haversine_km(float(pickup_lat), float(pickup_lng), float(drop_lat), float(drop_lng))
+        fare = self._exact_fare_cents(profile_id, km, minutes)
+        if fare > MONEY_MAX_CENTS:
+            raise ValueError(f"fare {from_cents(fare)} does not fit MoneyAmount")
+        fee = self._fee_cents(fare)
+        return km, from_cents(fare), from_cents(fee), from_cents(fare - fee)
+
+    def quote(self, pickup_lat, pickup_lng, drop_lat, drop_lng, minutes, profile_ids):
+        """Arrays (km, fare, fee, payout) for many requests; money in integer cents."""
+        base, per_km, per_min = self._tariff_arrays()
+        try:
+            rows = np.fromiter(map(self._rows.__getitem__, profile_ids), dtype=np.intp, count=len(profile_ids))
+        except KeyError as exc:
+            raise UnknownProfileError(exc.args[0]) from None
+        km = haversine_km_np(np.asarray(pickup_lat, dtype=np.float64), np.asarray(pickup_lng, dtype=np.float64),
+                             np.asarray(drop_lat, dtype=np.float64), np.asarray(drop_lng, dtype=np.float64))
+        minutes = np.asarray(minutes, dtype=np.float64)
+
+        raw = base[rows] + per_km[rows] * km + per_min[rows] * minutes
+        fare = np.floor(raw + 0.5).astype(np.int64)
+        # Fares within float noise of a half cent are re-rounded exactly
+        for i in np.flatnonzero(np.abs(raw - np.floor(raw) - 0.5) < 1e-6):
+            fare[i] = self._exact_fare_cents(profile_ids[i], km[i], minutes[i])
+        if len(fare) and fare.max() > MONEY_MAX_CENTS:
+            raise ValueError(f"fare {from_cents(fare.max())} does not fit MoneyAmount")
+        fee = self._fee_cents(fare)
+        return km, fare, fee, fare - fee
+
+    def quote_rows(self, pickup_lat, pickup_lng, drop_lat, drop_lng, minutes, profile_ids):
+        """[(fare, fee, payout)] as Decimal, ready to bind to MoneyAmount parameters."""
+        _km, fare, fee, payout = self.quote(pickup_lat, pickup_lng, drop_lat, drop_lng, minutes, profile_ids)
+        return [(from_cents(f), from_cents(c), from_cents(p))
+                for f, c, p in zip(fare.tolist(), fee.tolist(), payout.tolist())]
+
+
+# ---------- benchmark ----------
+def synthetic_engine(num_services=5, profiles_per_service=4, seed=342):
+    rng = random.Random(seed)
+    engine = FareEngine()
+    for service_id in range(1, num_services + 1):
+        engine.add_tariff(service_id, f"{rng.uniform(2, 6):.2f}", f"{rng.uniform(0.5, 2):.2f}",
+                          f"{rng.uniform(0.1, 0.5):.2f}")
+        for p in range(profiles_per_service):
+            engine.add_profile(f"profile-{service_id}-{p}", service_id)
+    return engine
+
+
+def benchmark(num_requests, seed=342):
+    engine = synthetic_engine(seed=seed)
+    rng = random.Random(seed)
+    profiles = list(engine.profiles)
+    plat = [rng.uniform(34.6, 35.2) for _ in range(num_requests)]
+    plng = [rng.uniform(32.4, 34.0) for _ in range(num_requests)]
+    dlat = [rng.uniform(34.6, 35.2) for _ in range(num_requests)]
+    dlng = [rng.uniform(32.4, 34.0) for _ in range(num_requests)]
+    minutes = [rng.randint(3, 90) for _ in range(num_requests)]
+    profile_ids = [rng.choice(profiles) for _ in range(num_requests)]
+    print(f"{num_requests} requests, {len(engine.tariffs)} tariffs, {len(profiles)} profiles")
+
+    started = time.perf_counter()
+    looped = [engine.quote_one(*args) for args in zip(plat, plng, dlat, dlng, minutes, profile_ids)]
+    loop = time.perf_counter() - started
+    print(f"per-row Decimal loop   {loop * 1e3:9.1f} ms   {num_requests / loop:12,.0f} quotes/s")
+
+    started = time.perf_counter()
+    rows = engine.quote_rows(plat, plng, dlat, dlng, minutes, profile_ids)
+    vec = time.perf_counter() - started
+    print(f"NumPy + Decimal edges  {vec * 1e3:9.1f} ms   {num_requests / vec:12,.0f} quotes/s   x{loop / vec:.1f}")
+
+    started = time.perf_counter()
+    engine.quote(plat, plng, dlat, dlng, minutes, profile_ids)
+    cents = time.perf_counter() - started
+    print(f"NumPy, cents only      {cents * 1e3:9.1f} ms   {num_requests / cents:12,.0f} quotes/s   x{loop / cents:.1f}")
+
+    mismatches = sum(1 for a, b in zip(looped, rows) if a[1:] != b)
+    print(f"mismatches vs loop: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorised fare quotes against a per-row loop")
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+    benchmark(args.requests)
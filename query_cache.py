@@ -0,0 +1,98 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# String literals are kept verbatim; whitespace elsewhere is collapsed
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+((?:\[[^\]]+\]|\w+)(?:\.(?:\[[^\]]+\]|\w+))*)", re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    parts = _LITERAL.split(sql.strip().rstrip(";"))
+    return "".join(p if i % 2 else " ".join(p.split()) for i, p in enumerate(parts)).strip()
+
+
+def referenced_tables(sql):
+    # Lower-cased table names without schema or brackets, e.g. "dbo.[User]" -> "user"
+    tables = set()
+    for ref in _TABLE_REF.findall(_LITERAL.sub("''", sql)):
+        tables.add(ref.split(".")[-1].strip("[]").lower())
+    return tables
+
+
+class QueryCache:
+    """LRU cache of console results keyed on normalized SQL text.
+
+    Entries expire after `ttl` seconds. Memory is bounded by the total number
+    of cached cells (rows x columns) as well as the number of entries; the
+    least recently used results are evicted first.
+    """
+
+    def __init__(self, ttl=60, max_entries=256, max_cells=1_000_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_cells = max_cells
+        self._entries = OrderedDict()   # key -> (columns, rows, tables, cells, stored_at, expires_at)
+        self._cells = 0
+        self._lock = threading.Lock()
+        self._metrics = dict.fromkeys(("hits", "misses", "evictions", "expirations", "invalidations"), 0)
+
+    def get(self, sql):
+        """(columns, rows, age_seconds) for a live entry, else None."""
+        key = normalize_sql(sql)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[5] <= now:
+                self._drop(key)
+                self._metrics["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return entry[0], entry[1], now - entry[4]
+
+    def put(self, sql, columns, rows, ttl=None):
+        cells = len(rows) * max(1, len(columns))
+        if cells > self.max_cells:
+            return False
+        key = normalize_sql(sql)
+        now = time.monotonic()
+        entry = (columns, rows, referenced_tables(key), cells, now, now + (self.ttl if ttl is None else ttl))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._cells += cells
+            while len(self._entries) > self.max_entries or self._cells > self.max_cells:
+                self._drop(next(iter(self._entries)))
+                self._metrics["evictions"] += 1
+        return True
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._cells -= entry[3]
+
+    def invalidate_table(self, table):
+        """Drop every entry that reads `table` (call after writes to it)."""
+        table = table.split(".")[-1].strip("[]").lower()
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if table in entry[2]]
+            for key in stale:
+                self._drop(key)
+            self._metrics["invalidations"] += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._metrics["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._cells = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics, entries=len(self._entries), cells=self._cells,
+                        max_entries=self.max_entries, max_cells=self.max_cells, ttl=self.ttl)
@@ -0,0 +1,203 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class Saturated(Exception):
+    """Too many queries in flight (overall or for this user); retry later."""
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class _Job:
+    __slots__ = ("user", "sql", "params", "max_rows", "deadline", "profile", "future", "cursor", "cancelled")
+
+    def __init__(self, user, sql, params, max_rows, deadline, profile=None):
+        self.user = user
+        self.sql = sql
+        self.params = params
+        self.max_rows = max_rows
+        self.deadline = deadline
+        self.profile = profile          # optional query_profiler.QueryProfile
+        self.future = Future()
+        self.cursor = None
+        self.cancelled = False
+
+
+class QueryExecutor:
+    """Runs console queries on a fixed set of worker threads.
+
+    Admission: at most `workers + max_queue` queries are in flight overall
+    and `per_user` per user; anything beyond is refused with Saturated
+    instead of piling up behind a slow statement. Queued jobs are taken
+    round-robin across users, so one user's backlog cannot starve others.
+    Every query has a deadline (`deadline` seconds from submission). The
+    driver enforces it as the statement timeout, and a waiter that gives up
+    cancels the statement on the server via cursor.cancel().
+    """
+
+    def __init__(self, pool, workers=4, max_queue=16, per_user=2, deadline=30):
+        self.pool = pool
+        self.workers = workers
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self.deadline = deadline
+
+        self._queues = OrderedDict()    # user -> deque of _Job, in round-robin order
+        self._inflight = {}             # user -> queued + running + streaming
+        self._total = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._metrics = dict.fromkeys(("submitted", "completed", "failed", "rejected", "deadlines"), 0)
+        self._threads = [threading.Thread(target=self._run, name=f"console-query-{i}", daemon=True)
+                         for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    # ---------- admission ----------
+    def _admit_locked(self, user):
+        if self._closed:
+            raise Saturated("executor is closed")
+        if self._total >= self.workers + self.max_queue:
+            self._metrics["rejected"] += 1
+            raise Saturated(f"{self._total} queries in flight")
+        if self._inflight.get(user, 0) >= self.per_user:
+            self._metrics["rejected"] += 1
+            raise Saturated(f"{self.per_user} queries already running for {user}")
+        self._inflight[user] = self._inflight.get(user, 0) + 1
+        self._total += 1
+
+    def admit(self, user):
+        """Take an in-flight slot for work run outside the workers (e.g. streamed results)."""
+        with self._cond:
+            self._admit_locked(user)
+
+    def release(self, user):
+        with self._cond:
+            self._total -= 1
+            if self._inflight[user] <= 1:
+                del self._inflight[user]
+            else:
+                self._inflight[user] -= 1
+
+    # ---------- workers ----------
+    def _next_job_locked(self):
+        # Pop from the first user's queue, then move that user to the back
+        user, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(user)
+        else:
+            del self._queues[user]
+        return job
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queues and not self._closed:
+                    self._cond.wait()
+                if not self._queues:
+                    return
+                job = self._next_job_locked()
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    self._execute(job)
+            finally:
+                self.release(job.user)
+
+    def _execute(self, job):
+        remaining = job.deadline - time.monotonic()
+        profile = job.profile
+        if profile:
+            profile.phase("queue")
+        try:
+            if remaining <= 0:
+                raise DeadlineExceeded("deadline passed while queued")
+            with self.pool.connection(timeout=remaining) as conn:
+                if hasattr(conn, "timeout"):
+                    conn.timeout = max(1, math.ceil(job.deadline - time.monotonic()))
+                cur = conn.cursor()
+                job.cursor = cur
+                try:
+                    if job.cancelled:
+                        raise DeadlineExceeded("cancelled before execution")
+                    if profile:
+                        profile.before_execute(cur)
+                    cur.execute(job.sql, *job.params)
+                    if profile:
+                        profile.phase("execute")
+                    columns = [c[0] for c in cur.description]
+                    rows = cur.fetchmany(job.max_rows) if job.max_rows else cur.fetchall()
+                    if profile:
+                        profile.after_fetch(cur, rows)
+                finally:
+                    job.cursor = None
+                    if profile:
+                        profile.finish(cur)
+                    cur.close()
+                    if hasattr(conn, "timeout"):
+                        conn.timeout = 0
+        except Exception as e:
+            if job.cancelled or time.monotonic() >= job.deadline:
+                e = DeadlineExceeded(f"query exceeded its {self.deadline}s deadline: {e}")
+            with self._cond:
+                self._metrics["deadlines" if isinstance(e, DeadlineExceeded) else "failed"] += 1
+            job.future.set_exception(e)
+        else:
+            with self._cond:
+                self._metrics["deadlines" if job.cancelled else "completed"] += 1
+            job.future.set_result((columns, rows))
+
+    # ---------- public API ----------
+    def submit(self, user, sql, params=(), max_rows=None, deadline=None, profile=None):
+        job = _Job(user, sql, params, max_rows, time.monotonic() + (deadline or self.deadline), profile)
+        with self._cond:
+            self._admit_locked(user)
+            self._metrics["submitted"] += 1
+            self._queues.setdefault(user, deque()).append(job)
+            self._cond.notify()
+        return job
+
+    def cancel(self, job):
+        job.cancelled = True
+        if job.future.cancel():
+            with self._cond:
+                self._metrics["deadlines"] += 1
+            return
+        cur = job.cursor
+        if cur is not None and hasattr(cur, "cancel"):
+            try:
+                cur.cancel()        # SQLCancel: the server aborts the running statement
+            except Exception:
+                pass
+
+    def execute(self, user, sql, params=(), max_rows=None, deadline=None, profile=None):
+        """(columns, rows) of `sql`; raises Saturated or DeadlineExceeded."""
+        job = self.submit(user, sql, params, max_rows, deadline, profile)
+        try:
+            return job.future.result(timeout=max(0, job.deadline - time.monotonic()))
+        except FutureTimeout:
+            self.cancel(job)
+            raise DeadlineExceeded(f"query exceeded its {deadline or self.deadline}s deadline") from None
+
+    def stats(self):
+        with self._cond:
+            return dict(self._metrics, in_flight=self._total, queued=sum(len(q) for q in self._queues.values()),
+                        users=len(self._inflight), workers=self.workers, max_queue=self.max_queue,
+                        per_user=self.per_user, deadline=self.deadline)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            queued = [job for q in self._queues.values() for job in q]
+            self._queues.clear()
+            self._cond.notify_all()
+        for job in queued:
+            job.future.cancel()
+            self.release(job.user)
+        for t in self._threads:
+            t.join()
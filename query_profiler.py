@@ -0,0 +1,122 @@
+import datetime
+import threading
+import time
+from collections import deque
+
+_STATS_ON = "SET STATISTICS IO ON; SET STATISTICS TIME ON;"
+_STATS_OFF = "SET STATISTICS IO OFF; SET STATISTICS TIME OFF;"
+
+
+class QueryProfile:
+    """Timings and sizes for one console query; filled in as the query runs.
+
+    Phases are queue (waiting for an executor worker), connect (pool
+    checkout), execute, fetch and render, all in milliseconds. With
+    `capture` the statement also runs under SET STATISTICS IO/TIME (and
+    XML for the actual plan when `plan` is set).
+    """
+
+    PHASES = ("queue", "connect", "execute", "fetch", "render")
+
+    def __init__(self, user, sql, capture=False, plan=False):
+        self.user = user
+        self.sql = sql
+        self.capture = capture or plan
+        self.plan = plan
+        self.at = datetime.datetime.utcnow()
+        self.ms = dict.fromkeys(self.PHASES, 0.0)
+        self.rows = 0
+        self.bytes = 0
+        self.cached = False
+        self.error = None
+        self.showplan = None
+        self.messages = []
+        self._mark = time.perf_counter()
+
+    def phase(self, name):
+        # Close the running phase: time since the previous mark is charged to `name`
+        now = time.perf_counter()
+        self.ms[name] += (now - self._mark) * 1000
+        self._mark = now
+
+    @property
+    def total_ms(self):
+        return sum(self.ms.values())
+
+    # ---------- cursor hooks ----------
+    def before_execute(self, cur):
+        self.phase("connect")
+        if self.capture:
+            cur.execute(_STATS_ON + (" SET STATISTICS XML ON;" if self.plan else ""))
+
+    def after_fetch(self, cur, rows):
+        self.phase("fetch")
+        self.rows = len(rows)
+        self.bytes = sum(len(str(v)) for row in rows for v in row if v is not None)
+        if not self.capture:
+            return
+        # Remaining result sets: unread rows, then the showplan XML; IO/TIME arrive as messages
+        self._collect_messages(cur)
+        while cur.nextset():
+            self._collect_messages(cur)
+            if self.plan and cur.description and "Showplan" in (cur.description[0][0] or ""):
+                row = cur.fetchone()
+                self.showplan = row[0] if row else None
+
+    def finish(self, cur):
+        # Pooled connections are reused: never leave the session with statistics on
+        if self.capture:
+            try:
+                cur.execute(_STATS_OFF + (" SET STATISTICS XML OFF;" if self.plan else ""))
+            except Exception:
+                pass
+
+    def _collect_messages(self, cur):
+        self.messages += [text for _kind, text in getattr(cur, "messages", None) or []]
+
+    def as_dict(self, with_plan=True):
+        d = {"at": self.at.isoformat(timespec="milliseconds"), "user": self.user, "sql": self.sql,
+             "total_ms": round(self.total_ms, 2), "rows": self.rows, "bytes": self.bytes,
+             "cached": self.cached, "error": self.error, "stats": self.messages}
+        d.update({f"{name}_ms": round(v, 2) for name, v in self.ms.items()})
+        if with_plan:
+            d["plan"] = self.showplan
+        return d
+
+
+class SlowQueryLog:
+    """Bounded ring buffer of profiles slower than `threshold_ms` (0 keeps all)."""
+
+    def __init__(self, capacity=200, threshold_ms=500, sql_limit=4000):
+        self.threshold_ms = threshold_ms
+        self.sql_limit = sql_limit
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._metrics = dict.fromkeys(("profiled", "logged"), 0)
+
+    def record(self, profile):
+        entry = profile.as_dict()
+        entry["sql"] = entry["sql"][:self.sql_limit]
+        with self._lock:
+            self._metrics["profiled"] += 1
+            if profile.total_ms < self.threshold_ms and profile.error is None:
+                return False
+            self._metrics["logged"] += 1
+            self._entries.append(entry)
+        return True
+
+    def entries(self, order="recent"):
+        with self._lock:
+            entries = list(self._entries)
+        if order == "slowest":
+            return sorted(entries, key=lambda e: e["total_ms"], reverse=True)
+        return entries[::-1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics, entries=len(self._entries), capacity=self._entries.maxlen,
+                        threshold_ms=self.threshold_ms)
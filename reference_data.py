@@ -0,0 +1,133 @@
+class BiMap:
+    """Two-way key <-> id map for a lookup table, in the caller's key order."""
+
+    def __init__(self):
+        self._by_key = {}
+        self._by_id = {}
+
+    def add(self, key, id_):
+        self._by_key[key] = id_
+        self._by_id[id_] = key
+
+    def id(self, key):
+        return self._by_key[key]
+
+    def key(self, id_):
+        return self._by_id[id_]
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    @property
+    def ids(self):
+        return list(self._by_key.values())
+
+    def items(self):
+        return self._by_key.items()
+
+
+def _merge_missing(cur, table, columns, rows, match_on, insert_cols, insert_vals, output):
+    # One set-based MERGE per table; OUTPUT returns the ids of the inserted rows
+    if not rows:
+        return []
+    row_params = "(" + ", ".join("?" * len(columns)) + ")"
+    sql = f"""
+        MERGE dbo.{table} WITH (HOLDLOCK) AS t
+        USING (VALUES {", ".join([row_params] * len(rows))}) AS s({", ".join(f"[{c}]" for c in columns)})
+        ON {" AND ".join(f"t.[{c}] = s.[{c}]" for c in match_on)}
+        WHEN NOT MATCHED THEN
+            INSERT({insert_cols}) VALUES({insert_vals})
+        OUTPUT {output};
+    """
+    return cur.execute(sql, [v for row in rows for v in row]).fetchall()
+
+
+class ReferenceData:
+    """Ride/service/vehicle types and allowed ride profiles, loaded once.
+
+    Each table is read with a single SELECT; rows missing from the database
+    are inserted with one MERGE ... OUTPUT statement per table.
+    """
+
+    def __init__(self):
+        self.ride_types = BiMap()       # seeder key -> RideTypeId
+        self.services = BiMap()         # service name -> ServiceTypeId
+        self.vehicle_types = BiMap()    # vehicle type name -> VehicleTypeId
+        self.profiles = {}              # (ServiceTypeId, RideTypeId, VehicleTypeId) -> RideProfileId
+        self.combos_by_vehicle_type = {}    # VehicleTypeId -> [(ServiceTypeId, RideTypeId)]
+
+    @classmethod
+    def ensure(cls, cur, ride_types, services, veh_types, combo_specs):
+        ref = cls()
+        ref._load_ride_types(cur, ride_types)
+        ref._load_services(cur, services)
+        ref._load_vehicle_types(cur, veh_types)
+        ref._load_profiles(cur, combo_specs)
+        return ref
+
+    def _load_ride_types(self, cur, ride_types):
+        existing = dict(cur.execute("SELECT [Name], RideTypeId FROM dbo.Ridetype").fetchall())
+        missing = {label for _key, label in ride_types if label not in existing}
+        created = _merge_missing(
+            cur, "Ridetype", ["Name", "Description"], [(label, label) for label in sorted(missing)],
+            match_on=["Name"], insert_cols="[Name], [Description]", insert_vals="s.[Name], s.[Description]",
+            output="inserted.[Name], inserted.RideTypeId")
+        existing.update(dict(created))
+        for key, label in ride_types:
+            self.ride_types.add(key, existing[label])
+
+    def _load_services(self, cur, services):
+        existing = dict(cur.execute("SELECT [Name], ServiceTypeId FROM dbo.Servicetype").fetchall())
+        created = _merge_missing(
+            cur, "Servicetype", ["Name", "Description"],
+            [(name, desc) for name, desc in services if name not in existing],
+            match_on=["Name"],
+            insert_cols="[Name], [Description], BaseFare, PerKm, PerMin, ValidFrom, Active",
+            # UtcStamp rounds to the second, and a ValidFrom rounded up past SYSUTCDATETIME() would hide
+            # the new tariff from FareEngine.from_db; a second back keeps it at least 0.5 s in the past
+            insert_vals="s.[Name], s.[Description], 3.50, 0.80, 0.20, "
+                        "DATEADD(SECOND, -1, CAST(SYSUTCDATETIME() AS DATETIME2(0))), 1",
+            output="inserted.[Name], inserted.ServiceTypeId")
+        existing.update(dict(created))
+        for name, _desc in services:
+            self.services.add(name, existing[name])
+
+    def _load_vehicle_types(self, cur, veh_types):
+        existing = dict(cur.execute("SELECT [Name], VehicleTypeId FROM dbo.VehicleType").fetchall())
+        created = _merge_missing(
+            cur, "VehicleType", ["Name"], [(vt,) for vt in veh_types if vt not in existing],
+            match_on=["Name"], insert_cols="[Name]", insert_vals="s.[Name]",
+            output="inserted.[Name], inserted.VehicleTypeId")
+        existing.update(dict(created))
+        for vt in veh_types:
+            self.vehicle_types.add(vt, existing[vt])
+
+    def _load_profiles(self, cur, combo_specs):
+        # AllowedRideProfile (the service/ride/vehicle type combos a request may ask for)
+        for profile_id, svc_id, rt_id, vt_id in cur.execute(
+                "SELECT RideProfileId, ServiceTypeId, RideTypeId, VehicleTypeId FROM dbo.AllowedRideProfile"):
+            self.profiles[(svc_id, rt_id, vt_id)] = profile_id
+        wanted = {}
+        for svc_key, rt_key, vt_name, profile_name in combo_specs:
+            combo = (self.services.id(svc_key), self.ride_types.id(rt_key), self.vehicle_types.id(vt_name))
+            if combo not in self.profiles:
+                wanted.setdefault(combo, profile_name)
+        created = _merge_missing(
+            cur, "AllowedRideProfile", ["ServiceTypeId", "RideTypeId", "VehicleTypeId", "ProfileName"],
+            [combo + (name,) for combo, name in wanted.items()],
+            match_on=["ServiceTypeId", "RideTypeId", "VehicleTypeId"],
+            insert_cols="RideProfileId, ServiceTypeId, RideTypeId, VehicleTypeId, ProfileName",
+            insert_vals="NEWID(), s.ServiceTypeId, s.RideTypeId, s.VehicleTypeId, s.ProfileName",
+            output="inserted.RideProfileId, inserted.ServiceTypeId, inserted.RideTypeId, inserted.VehicleTypeId")
+        for profile_id, svc_id, rt_id, vt_id in created:
+            self.profiles[(svc_id, rt_id, vt_id)] = profile_id
+
+        # Precomputed vehicle type -> compatible (service, ride) combos
+        for svc_key, rt_key, vt_name, _name in combo_specs:
+            combos = self.combos_by_vehicle_type.setdefault(self.vehicle_types.id(vt_name), [])
+            combo = (self.services.id(svc_key), self.ride_types.id(rt_key))
+            if combo not in combos:
+                combos.append(combo)
+
+    def any_profile(self):
+        return next(iter(self.profiles.values()))
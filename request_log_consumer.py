@@ -0,0 +1,254 @@
+import argparse
+import json
+import time
+from collections import Counter
+
+from db import connect
+from spatial_index import ZoneIndex
+
+DIMENSIONS = ("status", "zone", "hour", "profile")
+NO_ZONE = "-"
+
+
+def summary_key(status, zone, created_at, profile_id):
+    """The (status, zone, hour, profile) a request is counted under."""
+    hour = created_at.replace(minute=0, second=0, microsecond=0).isoformat(timespec="hours")
+    return str(status), str(NO_ZONE if zone is None else zone), hour, str(profile_id)
+
+
+def apply_changes(changes, previous, zone_of):
+    """Fold log rows into per-dimension deltas.
+
+    `changes` are (LogEntryId, RequestId, Operation, Status, PickupLat,
+    PickupLng, CreatedAt, RideProfileId) in LogEntryId order and `previous`
+    maps RequestId -> key currently counted for it. Returns the deltas
+    {(dimension, key): n} and the final key per touched request (None if
+    deleted).
+    """
+    deltas = Counter()
+    current = dict(previous)
+    for _entry, request_id, op, status, lat, lng, created_at, profile_id in changes:
+        old = current.get(request_id)
+        if old is not None:
+            for dim, key in zip(DIMENSIONS, old):
+                deltas[dim, key] -= 1
+        new = None
+        if op != "D":
+            new = summary_key(status, zone_of(lat, lng), created_at, profile_id)
+            for dim, key in zip(DIMENSIONS, new):
+                deltas[dim, key] += 1
+        current[request_id] = new
+    return {k: n for k, n in deltas.items() if n}, current
+
+
+class RequestLogConsumer:
+    """Tails dbo.RideRequestLog into dbo.RideRequestSummary.
+
+    Log rows after the persisted watermark are read in LogEntryId order,
+    `batch_size` at a time. Each batch's aggregate deltas, per-request
+    state and new watermark are committed in one transaction, so a
+    restart resumes exactly after the last applied entry and nothing is
+    counted twice.
+
+    LogEntryId is assigned at insert, not at commit, so a transaction that
+    commits late can leave a lower id behind one already visible. Under
+    RCSI a plain read skips that row and the watermark would pass it for
+    good, so the batch is read WITH (READCOMMITTEDLOCK): it waits for any
+    uncommitted entry in its range to commit or roll back instead (the
+    consumer stalls behind a long writer, it never loses its row). Gaps left
+    after that are rolled-back or cached identity values and never fill in.
+    A batch also stops at the first entry younger than `settle` seconds,
+    which covers the instant between an id being generated and its row
+    being locked.
+    """
+
+    def __init__(self, conn, zones=None, name="ride_request_summary", batch_size=5000, settle=2.0):
+        self.conn = conn
+        self.zones = zones or ZoneIndex()
+        self.name = name
+        self.batch_size = batch_size
+        self.settle = settle
+        self.watermark = 0
+        self.source = "dbo.RideRequestLog"
+        self.counts = {dim: Counter() for dim in DIMENSIONS}
+        self._metrics = dict.fromkeys(("batches", "entries", "seconds"), 0)
+
+    def _zone_of(self, lat, lng):
+        hits = self.zones.zones_at(float(lat), float(lng))
+        return min(hits) if hits else None
+
+    def load(self):
+        """Read the watermark and current aggregates (O(keys), not O(requests))."""
+        cur = self.conn.cursor()
+        row = cur.execute("SELECT LastLogEntryId FROM dbo.ChangeConsumerWatermark WHERE Consumer = ?",
+                          self.name).fetchone()
+        self.watermark = row[0] if row else 0
+        # archiver.py only moves entries every consumer has read, but a rebuild re-reads them too
+        if cur.execute("SELECT OBJECT_ID('dbo.RideRequestLogHistory')").fetchone()[0] is not None:
+            self.source = "dbo.RideRequestLogHistory"
+        self.counts = {dim: Counter() for dim in DIMENSIONS}
+        for dim, key, n in cur.execute("SELECT Dimension, [Key], Requests FROM dbo.RideRequestSummary"):
+            self.counts[dim][key] = n
+        cur.close()
+        return self
+
+    def poll(self):
+        """Apply at most one batch; returns the number of log entries consumed."""
+        started = time.perf_counter()
+        cur = self.conn.cursor()
+        try:
+            rows = cur.execute(f"""
+                SELECT TOP (?) LogEntryId, RequestId, Operation, [Status], PickupLat, PickupLng,
+                       CreatedAt, RideProfileId,
+                       CASE WHEN ChangedAt < DATEADD(MILLISECOND, -?, SYSUTCDATETIME()) THEN 1 ELSE 0 END
+                FROM {self.source} WITH (READCOMMITTEDLOCK)
+                WHERE LogEntryId > ?
+                ORDER BY LogEntryId""", self.batch_size, int(self.settle * 1000), self.watermark).fetchall()
+            # Stop at the first unsettled entry so the watermark never passes it
+            changes = []
+            for *change, settled in rows:
+                if not settled:
+                    break
+                changes.append(change)
+            if not changes:
+                return 0
+
+            ids = json.dumps(sorted({c[1] for c in changes}))
+            previous = {request_id: tuple(key) for request_id, *key in cur.execute("""
+                SELECT RequestId, [Status], [Zone], [Hour], [Profile] FROM dbo.RideRequestSummaryState
+                WHERE RequestId IN (SELECT CAST([value] AS INT) FROM OPENJSON(?))""", ids)}
+            deltas, current = apply_changes(changes, previous, self._zone_of)
+            last = changes[-1][0]
+
+            if deltas:
+                cur.executemany("""
+                    MERGE dbo.RideRequestSummary WITH (HOLDLOCK) AS t
+                    USING (VALUES (?, ?, ?)) AS s(Dimension, [Key], Delta)
+                    ON t.Dimension = s.Dimension AND t.[Key] = s.[Key]
+                    WHEN MATCHED THEN UPDATE SET Requests = t.Requests + s.Delta
+                    WHEN NOT MATCHED THEN INSERT (Dimension, [Key], Requests) VALUES (s.Dimension, s.[Key], s.Delta);
+                """, [(dim, key, n) for (dim, key), n in deltas.items()])
+                cur.execute("DELETE dbo.RideRequestSummary WHERE Requests = 0")
+            cur.execute("DELETE dbo.RideRequestSummaryState WHERE RequestId IN "
+                        "(SELECT CAST([value] AS INT) FROM OPENJSON(?))", ids)
+            live = [(request_id, *key) for request_id, key in current.items() if key is not None]
+            if live:
+                cur.fast_executemany = True
+                cur.executemany("INSERT dbo.RideRequestSummaryState(RequestId, [Status], [Zone], [Hour], [Profile]) "
+                                "VALUES (?, ?, ?, ?, ?)", live)
+            cur.execute("""
+                MERGE dbo.ChangeConsumerWatermark WITH (HOLDLOCK) AS t
+                USING (VALUES (?, ?)) AS s(Consumer, LastLogEntryId) ON t.Consumer = s.Consumer
+                WHEN MATCHED THEN UPDATE SET LastLogEntryId = s.LastLogEntryId, UpdatedAt = SYSUTCDATETIME()
+                WHEN NOT MATCHED THEN INSERT (Consumer, LastLogEntryId) VALUES (s.Consumer, s.LastLogEntryId);
+            """, self.name, last)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+        # In-memory view follows only once the batch is durable
+        for (dim, key), n in deltas.items():
+            self.counts[dim][key] += n
+            if not self.counts[dim][key]:
+                del self.counts[dim][key]
+        self.watermark = last
+        self._metrics["batches"] += 1
+        self._metrics["entries"] += len(changes)
+        self._metrics["seconds"] += time.perf_counter() - started
+        return len(changes)
+
+    def catch_up(self):
+        total = 0
+        while True:
+            n = self.poll()
+            total += n
+            if n < self.batch_size:
+                return total
+
+    def follow(self, interval=1.0, log=print):
+        while True:
+            n = self.catch_up()
+            if n:
+                log(f"applied {n} log entries, watermark {self.watermark}")
+            time.sleep(interval)
+
+    def rebuild(self):
+        """Forget everything and re-consume the whole log on the next poll."""
+        cur = self.conn.cursor()
+        cur.execute("DELETE dbo.RideRequestSummary")
+        cur.execute("DELETE dbo.RideRequestSummaryState")
+        cur.execute("DELETE dbo.ChangeConsumerWatermark WHERE Consumer = ?", self.name)
+        self.conn.commit()
+        cur.close()
+        return self.load()
+
+    def check_delete(self, timeout=30.0):
+        """Insert and delete a throwaway request and wait for its 'D' entry to be applied.
+
+        Raises AssertionError if the delete is not logged or its counts are
+        never retracted from RideRequestSummaryState within `timeout` seconds.
+        """
+        cur = self.conn.cursor()
+        row = cur.execute("SELECT TOP 1 p.UserId, a.RideProfileId "
+                          "FROM dbo.Passenger p CROSS JOIN dbo.AllowedRideProfile a").fetchone()
+        if row is None:
+            raise RuntimeError("check needs at least one Passenger and AllowedRideProfile")
+        cur.execute("INSERT dbo.RideRequest (PassengerId, NumOfPeople, PickupLat, PickupLng, DropLat, DropLng, "
+                    "RideProfileId) VALUES (?, 1, 0, 0, 0, 0, ?)", row[0], row[1])
+        request_id = cur.execute("SELECT CAST(SCOPE_IDENTITY() AS INT)").fetchone()[0]
+        self.conn.commit()
+
+        def counted():
+            return cur.execute("SELECT 1 FROM dbo.RideRequestSummaryState WHERE RequestId = ?",
+                               request_id).fetchone() is not None
+
+        def wait_for(expected):
+            deadline = time.monotonic() + timeout
+            while counted() != expected:
+                assert time.monotonic() < deadline, f"request {request_id} never {'counted' if expected else 'retracted'}"
+                time.sleep(self.settle / 4 or 0.1)
+                self.catch_up()
+
+        wait_for(True)
+        cur.execute("DELETE dbo.RideRequest WHERE RequestId = ?", request_id)
+        self.conn.commit()
+        wait_for(False)
+        entry = cur.execute(f"SELECT MAX(LogEntryId) FROM {self.source} WHERE RequestId = ? AND Operation = 'D'",
+                            request_id).fetchone()[0]
+        cur.close()
+        assert entry is not None and entry <= self.watermark, f"no applied 'D' entry for request {request_id}"
+        return request_id
+
+    def metrics(self):
+        m = dict(self._metrics, watermark=self.watermark)
+        m["entries_per_s"] = m["entries"] / m["seconds"] if m["seconds"] else 0.0
+        return m
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consume RideRequestLog into the request summary tables")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--follow", action="store_true", help="keep polling for new log entries")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between polls with --follow")
+    parser.add_argument("--rebuild", action="store_true", help="reset the summary and replay the whole log")
+    parser.add_argument("--check-delete", action="store_true",
+                        help="delete a throwaway request and confirm its 'D' entry is consumed")
+    args = parser.parse_args()
+
+    cn = connect(autocommit=False)
+    consumer = RequestLogConsumer(cn, ZoneIndex.from_db(cn.cursor()), batch_size=args.batch_size).load()
+    if args.rebuild:
+        consumer.rebuild()
+    print(f"resuming after LogEntryId {consumer.watermark}")
+    if args.check_delete:
+        print(f"delete of request {consumer.check_delete()} logged and retracted")
+    elif args.follow:
+        consumer.follow(args.interval)
+    else:
+        consumer.catch_up()
+        print(consumer.metrics())
+        for dim in DIMENSIONS:
+            print(dim, dict(consumer.counts[dim].most_common(10)))
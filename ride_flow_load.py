@@ -0,0 +1,503 @@
+import argparse
+import datetime
+import decimal
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from db import conn_str
+from stats import percentile
+
+STEPS = ("request", "offer", "respond", "start", "messages", "finish", "rate")
+
+# Outcome mixes: relative weights, overridable on the command line as name=weight,...
+OFFER_MIX = {"accepted": 0.7, "declined": 0.2, "expired": 0.1}
+RIDE_MIX = {"completed": 0.9, "cancelled": 0.1}
+PAYMENT_MIX = {"completed": 0.95, "failed": 0.05}
+RATING_RATE = 0.6
+
+# Pickup/drop points are drawn inside this box (lat0, lat1, lng0, lng1)
+AREA = (34.60, 35.20, 32.40, 34.00)
+
+
+class StepFailed(Exception):
+    pass
+
+
+# ---------- backends ----------
+class SqlServerBackend:
+    """The real schema: one pyodbc connection per worker, SET LOCK_TIMEOUT per session.
+
+    Lock waits are read from sys.dm_exec_session_wait_stats (LCK_M_* waits of
+    the worker's own session) after every step; tracking is switched off if
+    the view is not readable.
+    """
+
+    name = "sqlserver"
+    schema = "dbo."
+
+    def __init__(self, lock_timeout_ms=5000):
+        import pyodbc
+
+        self.pyodbc = pyodbc
+        self.lock_timeout_ms = lock_timeout_ms
+        self.track_lock_waits = True
+        self.cn_str = conn_str()
+
+    def connect(self):
+        cn = self.pyodbc.connect(self.cn_str, autocommit=False)
+        cn.execute(f"SET LOCK_TIMEOUT {int(self.lock_timeout_ms)}")
+        cn.commit()
+        return cn
+
+    def insert_id(self, cur, table, columns, values, id_column):
+        # No OUTPUT INSERTED: RideRequest, Payment and Rating have triggers, which forbid it without INTO
+        cur.execute(f"SET NOCOUNT ON; INSERT {self.schema}{table}({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(values))}); SELECT CAST(SCOPE_IDENTITY() AS INT)", values)
+        return cur.fetchone()[0]
+
+    def classify(self, exc):
+        if not isinstance(exc, self.pyodbc.Error):
+            return None
+        message = str(exc)
+        if exc.args and exc.args[0] == "40001" or "(1205)" in message:
+            return "deadlocks"
+        if "(1222)" in message:
+            return "lock_timeouts"
+        return None
+
+    def lock_wait_ms(self, cur):
+        if not self.track_lock_waits:
+            return None
+        try:
+            return cur.execute("""SELECT COALESCE(SUM(wait_time_ms), 0) FROM sys.dm_exec_session_wait_stats
+                                  WHERE session_id = @@SPID AND wait_type LIKE 'LCK[_]M[_]%'""").fetchone()[0]
+        except self.pyodbc.Error:
+            self.track_lock_waits = False
+            return None
+
+    def actors(self, limit):
+        """(passenger UserIds, [(driver UserId, VehicleId)], FareEngine) sampled from the database."""
+        from pricing import FareEngine
+
+        cn = self.connect()
+        try:
+            cur = cn.cursor()
+            passengers = [r[0] for r in cur.execute(
+                "SELECT TOP (?) UserId FROM dbo.Passenger ORDER BY UserId", limit)]
+            drivers = [tuple(r) for r in cur.execute(
+                """SELECT DISTINCT TOP (?) e.UserId, e.VehicleId FROM dbo.UserServiceEnrollment e
+                   JOIN dbo.Vehicle v ON v.VehicleId = e.VehicleId
+                   WHERE e.[Status] = 'Approved' AND v.[Status] = 'Active'
+                   ORDER BY e.UserId, e.VehicleId""", limit)]
+            fares = FareEngine.from_db(cur)
+            cn.rollback()
+        finally:
+            cn.close()
+        if not passengers or not drivers or not fares.profiles:
+            raise SystemExit("need passengers, approved drivers with active vehicles and ride profiles: "
+                             "build the schema from DDL-Queries.sql and seed it with db_seeder.py first")
+        return passengers, drivers, fares
+
+
+class SqliteBackend:
+    """Local stand-in with the flow tables only; same statements, file-level locking.
+
+    Writers take the database lock at BEGIN IMMEDIATE and wait up to the lock
+    timeout for it, so contention shows up as latency and lock timeouts.
+    Lock wait time is not observable here.
+    """
+
+    name = "sqlite"
+    schema = ""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS RideRequest (
+            RequestId INTEGER PRIMARY KEY AUTOINCREMENT, PassengerId TEXT NOT NULL, NumOfPeople INT NOT NULL,
+            PickupAt TEXT NOT NULL, PickupLat REAL NOT NULL, PickupLng REAL NOT NULL, DropLat REAL NOT NULL,
+            DropLng REAL NOT NULL, CreatedAt TEXT NOT NULL, UpdatedAt TEXT, [Status] TEXT NOT NULL
+                CHECK ([Status] IN ('Pending','Accepted','Declined','Cancelled','Completed','Edited')),
+            RideProfileId TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS ItineraryLeg (
+            LegId INTEGER PRIMARY KEY AUTOINCREMENT, SeqNo INT NOT NULL, ViaBridgeId INT,
+            RideRequestId INT NOT NULL REFERENCES RideRequest(RequestId), UNIQUE (SeqNo, RideRequestId));
+        CREATE TABLE IF NOT EXISTS DispatchOffer (
+            OfferId INTEGER PRIMARY KEY AUTOINCREMENT, LegId INT NOT NULL REFERENCES ItineraryLeg(LegId),
+            RecipientUserId TEXT NOT NULL, [Status] TEXT NOT NULL
+                CHECK ([Status] IN ('Sent','Accepted','Declined','Expired')),
+            SentAt TEXT, RespondedAt TEXT);
+        CREATE TABLE IF NOT EXISTS Payment (
+            PaymentId TEXT PRIMARY KEY, SenderUserId TEXT NOT NULL, ReceiverUserId TEXT NOT NULL,
+            GrossAmount TEXT NOT NULL, OsrhFee TEXT NOT NULL, DriverPayout TEXT NOT NULL, PaidAt TEXT,
+            Method TEXT NOT NULL, [Status] TEXT NOT NULL
+                CHECK ([Status] IN ('Pending','Completed','Failed','Refunded')));
+        CREATE TABLE IF NOT EXISTS Rating (
+            RatingId INTEGER PRIMARY KEY AUTOINCREMENT, AuthorUserId TEXT NOT NULL, TargetUserId TEXT NOT NULL,
+            Stars INT NOT NULL CHECK (Stars BETWEEN 1 AND 5), Comment TEXT, CreatedAt TEXT NOT NULL,
+            CHECK (AuthorUserId <> TargetUserId));
+        CREATE TABLE IF NOT EXISTS Ride (
+            RideId INTEGER PRIMARY KEY AUTOINCREMENT, OfferId INT NOT NULL REFERENCES DispatchOffer(OfferId),
+            DriverUserId TEXT NOT NULL, PassengerUserId TEXT NOT NULL, VehicleId TEXT NOT NULL,
+            StartedAt TEXT NOT NULL, EndedAt TEXT NOT NULL, PriceFinal TEXT NOT NULL, [Status] TEXT NOT NULL
+                CHECK ([Status] IN ('Scheduled','InProgress','Completed','Cancelled')),
+            Rating INT REFERENCES Rating(RatingId), Payment TEXT REFERENCES Payment(PaymentId),
+            CHECK (EndedAt > StartedAt));
+        CREATE TABLE IF NOT EXISTS InAppMessage (
+            MsgId INTEGER PRIMARY KEY AUTOINCREMENT, SenderUserId TEXT NOT NULL, RecipientUserId TEXT NOT NULL,
+            Body TEXT NOT NULL, SentAt TEXT NOT NULL, Ride INT NOT NULL REFERENCES Ride(RideId));
+    """
+
+    def __init__(self, path, lock_timeout_ms=5000):
+        import sqlite3
+
+        sqlite3.register_adapter(decimal.Decimal, str)
+        sqlite3.register_adapter(datetime.datetime, lambda v: v.isoformat(" "))
+        self.sqlite3 = sqlite3
+        self.path = path
+        self.lock_timeout_ms = lock_timeout_ms
+        cn = sqlite3.connect(path)
+        cn.execute("PRAGMA journal_mode=WAL")
+        cn.executescript(self.SCHEMA)
+        cn.close()
+
+    def connect(self):
+        cn = self.sqlite3.connect(self.path, timeout=self.lock_timeout_ms / 1000, isolation_level="IMMEDIATE",
+                                  check_same_thread=False)
+        cn.execute("PRAGMA foreign_keys=ON")
+        return cn
+
+    def insert_id(self, cur, table, columns, values, id_column):
+        cur.execute(f"INSERT INTO {table}({', '.join(columns)}) VALUES ({', '.join('?' * len(values))}) "
+                    f"RETURNING {id_column}", values)
+        return cur.fetchone()[0]
+
+    def classify(self, exc):
+        if isinstance(exc, self.sqlite3.OperationalError) and "locked" in str(exc):
+            return "lock_timeouts"
+        return None
+
+    def lock_wait_ms(self, cur):
+        return None
+
+    def actors(self, limit):
+        from pricing import synthetic_engine
+
+        rng = random.Random(limit)
+        ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(limit * 3)]
+        return ids[:limit], list(zip(ids[limit:2 * limit], ids[2 * limit:])), synthetic_engine()
+
+
+# ---------- load generator ----------
+class _WorkerStats:
+    def __init__(self):
+        self.steps = {name: {"ms": [], "retries": 0, "deadlocks": 0, "lock_timeouts": 0, "failures": 0,
+                             "lock_wait_ms": 0.0} for name in STEPS}
+        self.ride_ms = []
+        self.lag_ms = []
+        self.outcomes = Counter()
+        self.last_wait = 0
+
+
+class RideFlowLoad:
+    """Drives the seeder's ride flow from `workers` threads at `rate` rides per second.
+
+    Each ride is request -> offer -> respond -> start -> messages -> finish
+    -> rate, every step its own short transaction. Rides are scheduled on a
+    fixed timeline (ride i is due at i / rate), so a slow database shows up
+    as ride latency measured from the due time rather than as a lower
+    request rate. Deadlock victims and lock timeouts roll back and retry the
+    step with jittered backoff, up to `retries` times.
+    """
+
+    def __init__(self, backend, workers=8, rate=20.0, retries=3, offer_mix=OFFER_MIX, ride_mix=RIDE_MIX,
+                 payment_mix=PAYMENT_MIX, rating_rate=RATING_RATE, actors=200, seed=342):
+        self.backend = backend
+        self.workers = workers
+        self.rate = rate
+        self.retries = retries
+        self.offer_mix = offer_mix
+        self.ride_mix = ride_mix
+        self.payment_mix = payment_mix
+        self.rating_rate = rating_rate
+        self.seed = seed
+        self.passengers, self.drivers, self.fares = backend.actors(actors)
+        self.profiles = sorted(self.fares.profiles, key=str)
+        self._stats = []
+        self._stats_lock = threading.Lock()
+
+    def run(self, seconds=30.0, max_rides=None):
+        self._tickets = itertools.count()     # next() on a count is atomic under the GIL
+        self._started = time.perf_counter()
+        self._deadline = self._started + seconds
+        self._max_rides = max_rides
+        self._stats = []
+        threads = [threading.Thread(target=self._worker, args=(w,)) for w in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.report(time.perf_counter() - self._started)
+
+    # ---------- worker ----------
+    def _worker(self, worker):
+        rng = random.Random(self.seed * 1000 + worker)
+        stats = _WorkerStats()
+        cn = self.backend.connect()
+        cur = cn.cursor()
+        stats.last_wait = self.backend.lock_wait_ms(cur) or 0
+        cn.commit()
+        try:
+            while True:
+                i = next(self._tickets)
+                due = self._started + i / self.rate if self.rate else time.perf_counter()
+                if due >= self._deadline or (self._max_rides is not None and i >= self._max_rides):
+                    break
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                stats.lag_ms.append(max(0.0, -delay) * 1000)
+                try:
+                    stats.outcomes[self._ride(cn, cur, rng, stats)] += 1
+                except StepFailed:
+                    stats.outcomes["failed"] += 1
+                stats.ride_ms.append((time.perf_counter() - due) * 1000)
+        finally:
+            cn.close()
+            with self._stats_lock:
+                self._stats.append(stats)
+
+    def _step(self, cn, cur, stats, name, fn, *args):
+        step = stats.steps[name]
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                result = fn(cur, *args)
+                cn.commit()
+                break
+            except Exception as e:
+                cn.rollback()
+                kind = self.backend.classify(e)
+                if kind is None:
+                    step["failures"] += 1
+                    raise StepFailed(f"{name}: {e}") from e
+                step[kind] += 1
+                if attempt == self.retries:
+                    step["failures"] += 1
+                    raise StepFailed(f"{name}: gave up after {attempt + 1} attempts") from e
+                step["retries"] += 1
+                time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        step["ms"].append((time.perf_counter() - started) * 1000)
+        waited = self.backend.lock_wait_ms(cur)
+        if waited is not None:
+            # Session wait counters are cumulative: charge the step with the increase
+            step["lock_wait_ms"] += waited - stats.last_wait
+            stats.last_wait = waited
+            cn.commit()
+        return result
+
+    # ---------- ride flow ----------
+    def _ride(self, cn, cur, rng, stats):
+        lat0, lat1, lng0, lng1 = AREA
+        passenger = rng.choice(self.passengers)
+        driver, vehicle = rng.choice(self.drivers)
+        ride = {"passenger": passenger, "driver": driver, "vehicle": vehicle, "profile": rng.choice(self.profiles),
+                "pickup": (round(rng.uniform(lat0, lat1), 6), round(rng.uniform(lng0, lng1), 6)),
+                "drop": (round(rng.uniform(lat0, lat1), 6), round(rng.uniform(lng0, lng1), 6)),
+                "people": rng.randint(1, 3), "minutes": rng.randint(5, 45)}
+        step = self._step
+
+        step(cn, cur, stats, "request", self._request, ride)
+        step(cn, cur, stats, "offer", self._offer, ride)
+        response = _pick(rng, self.offer_mix)
+        step(cn, cur, stats, "respond", self._respond, ride, response)
+        if response != "accepted":
+            return response
+        step(cn, cur, stats, "start", self._start, ride)
+        step(cn, cur, stats, "messages", self._messages, ride)
+        outcome = _pick(rng, self.ride_mix)
+        step(cn, cur, stats, "finish", self._finish, ride, outcome, _pick(rng, self.payment_mix), rng)
+        if outcome == "completed" and rng.random() < self.rating_rate:
+            stars = rng.randint(4, 5) if rng.random() < 0.7 else rng.randint(1, 3)
+            step(cn, cur, stats, "rate", self._rate, ride, stars)
+        return outcome
+
+    def _request(self, cur, ride):
+        now = _utcnow()
+        ride["request_id"] = self.backend.insert_id(
+            cur, "RideRequest",
+            ["PassengerId", "NumOfPeople", "PickupAt", "PickupLat", "PickupLng", "DropLat", "DropLng",
+             "CreatedAt", "[Status]", "RideProfileId"],
+            [ride["passenger"], ride["people"], now, *ride["pickup"], *ride["drop"], now, "Pending",
+             ride["profile"]], "RequestId")
+        ride["leg_id"] = self.backend.insert_id(cur, "ItineraryLeg", ["SeqNo", "RideRequestId"],
+                                                [1, ride["request_id"]], "LegId")
+
+    def _offer(self, cur, ride):
+        ride["offer_id"] = self.backend.insert_id(cur, "DispatchOffer",
+                                                  ["LegId", "RecipientUserId", "[Status]", "SentAt"],
+                                                  [ride["leg_id"], ride["driver"], "Sent", _utcnow()], "OfferId")
+
+    def _respond(self, cur, ride, response):
+        s = self.backend.schema
+        now = _utcnow()
+        cur.execute(f"UPDATE {s}DispatchOffer SET [Status] = ?, RespondedAt = ? WHERE OfferId = ? AND [Status] = 'Sent'",
+                    [response.capitalize(), now, ride["offer_id"]])
+        status = {"accepted": "Accepted", "declined": "Declined", "expired": "Cancelled"}[response]
+        cur.execute(f"UPDATE {s}RideRequest SET [Status] = ?, UpdatedAt = ? WHERE RequestId = ?",
+                    [status, now, ride["request_id"]])
+
+    def _start(self, cur, ride):
+        _km, gross, fee, payout = self.fares.quote_one(*ride["pickup"], *ride["drop"], ride["minutes"],
+                                                       ride["profile"])
+        ride["fare"] = (gross, fee, payout)
+        started = _utcnow()
+        ride["ride_id"] = self.backend.insert_id(
+            cur, "Ride",
+            ["OfferId", "DriverUserId", "PassengerUserId", "VehicleId", "StartedAt", "EndedAt", "PriceFinal",
+             "[Status]"],
+            [ride["offer_id"], ride["driver"], ride["passenger"], ride["vehicle"], started,
+             started + datetime.timedelta(minutes=ride["minutes"]), gross, "InProgress"], "RideId")
+
+    def _messages(self, cur, ride):
+        s = self.backend.schema
+        columns = ["SenderUserId", "RecipientUserId", "Body", "SentAt", "Ride"]
+        sql = f"INSERT INTO {s}InAppMessage({', '.join(columns)}) VALUES (?, ?, ?, ?, ?)"
+        cur.execute(sql, [ride["driver"], ride["passenger"], "Φτάνω σε 3 λεπτά", _utcnow(), ride["ride_id"]])
+        cur.execute(sql, [ride["passenger"], ride["driver"], "ΟΚ, είμαι στο σημείο", _utcnow(), ride["ride_id"]])
+
+    def _finish(self, cur, ride, outcome, payment, rng):
+        s = self.backend.schema
+        now = _utcnow()
+        if outcome == "cancelled":
+            cur.execute(f"UPDATE {s}Ride SET [Status] = 'Cancelled' WHERE RideId = ?", [ride["ride_id"]])
+            cur.execute(f"UPDATE {s}RideRequest SET [Status] = 'Cancelled', UpdatedAt = ? WHERE RequestId = ?",
+                        [now, ride["request_id"]])
+            return
+        gross, fee, payout = ride["fare"]
+        payment_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        cur.execute(f"""INSERT INTO {s}Payment(PaymentId, SenderUserId, ReceiverUserId, GrossAmount, OsrhFee,
+                                           DriverPayout, PaidAt, Method, [Status])
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [payment_id, ride["passenger"], ride["driver"], gross, fee, payout,
+                     now if payment == "completed" else None, rng.choice(("CreditCard", "Cash")),
+                     payment.capitalize()])
+        cur.execute(f"UPDATE {s}Ride SET [Status] = 'Completed', Payment = ? WHERE RideId = ?",
+                    [payment_id, ride["ride_id"]])
+        cur.execute(f"UPDATE {s}RideRequest SET [Status] = 'Completed', UpdatedAt = ? WHERE RequestId = ?",
+                    [now, ride["request_id"]])
+
+    def _rate(self, cur, ride, stars):
+        s = self.backend.schema
+        rating_id = self.backend.insert_id(cur, "Rating",
+                                           ["AuthorUserId", "TargetUserId", "Stars", "Comment", "CreatedAt"],
+                                           [ride["passenger"], ride["driver"], stars, "Ευχάριστη διαδρομή",
+                                            _utcnow()], "RatingId")
+        cur.execute(f"UPDATE {s}Ride SET Rating = ? WHERE RideId = ?", [rating_id, ride["ride_id"]])
+
+    # ---------- results ----------
+    def report(self, elapsed):
+        merged = _WorkerStats()
+        for stats in self._stats:
+            for name in STEPS:
+                for key, value in stats.steps[name].items():
+                    merged.steps[name][key] += value
+            merged.ride_ms += stats.ride_ms
+            merged.lag_ms += stats.lag_ms
+            merged.outcomes.update(stats.outcomes)
+        rides = sum(merged.outcomes.values())
+        ride_ms, lag_ms = sorted(merged.ride_ms), sorted(merged.lag_ms)
+        tracked = getattr(self.backend, "track_lock_waits", False)
+        result = {
+            "backend": self.backend.name, "workers": self.workers, "target_rate": self.rate,
+            "seconds": round(elapsed, 2), "rides": rides,
+            "rides_per_s": round((rides - merged.outcomes["failed"]) / elapsed, 2),
+            "outcomes": dict(merged.outcomes),
+            "ride_ms": {f"p{p}": round(percentile(ride_ms, p), 2) for p in (50, 95, 99)},
+            "schedule_lag_ms": {f"p{p}": round(percentile(lag_ms, p), 2) for p in (50, 99)},
+            "steps": {},
+        }
+        for name in STEPS:
+            step = merged.steps[name]
+            ms = sorted(step["ms"])
+            result["steps"][name] = dict(
+                {k: v for k, v in step.items() if k not in ("ms", "lock_wait_ms")}, count=len(ms),
+                commits_per_s=round(len(ms) / elapsed, 2),
+                lock_wait_ms=round(step["lock_wait_ms"], 1) if tracked else None,
+                **{f"p{p}_ms": round(percentile(ms, p), 2) for p in (50, 95, 99)})
+        return result
+
+
+def _pick(rng, mix):
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def _utcnow():
+    return datetime.datetime.utcnow().replace(microsecond=0)
+
+
+def print_report(result):
+    print(f"{result['backend']}: {result['rides']} rides in {result['seconds']} s, "
+          f"{result['rides_per_s']}/s finished without errors (target {result['target_rate'] or 'max'}/s, {result['workers']} workers)")
+    print("outcomes  " + "  ".join(f"{k} {v}" for k, v in sorted(result["outcomes"].items())))
+    print(f"ride latency from due time  p50 {result['ride_ms']['p50']:.1f}  p95 {result['ride_ms']['p95']:.1f}  "
+          f"p99 {result['ride_ms']['p99']:.1f} ms;  start lag p99 {result['schedule_lag_ms']['p99']:.1f} ms")
+    print(f"{'step':10} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'retries':>8} "
+          f"{'deadlock':>9} {'lock t/o':>9} {'failed':>7} {'lock wait ms':>13}")
+    for name, s in result["steps"].items():
+        wait = "n/a" if s["lock_wait_ms"] is None else f"{s['lock_wait_ms']:.0f}"
+        print(f"{name:10} {s['count']:7} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} {s['p99_ms']:8.2f} "
+              f"{s['retries']:8} {s['deadlocks']:9} {s['lock_timeouts']:9} {s['failures']:7} {wait:>13}")
+
+
+def _mix(defaults):
+    def parse(text):
+        mix = {}
+        for item in text.split(","):
+            name, _, weight = item.partition("=")
+            if name.strip() not in defaults:
+                raise argparse.ArgumentTypeError(f"unknown outcome {name!r}; expected {', '.join(defaults)}")
+            mix[name.strip()] = float(weight)
+        if sum(mix.values()) <= 0:
+            raise argparse.ArgumentTypeError("weights must add up to more than 0")
+        return mix
+    return parse
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent end-to-end ride flow load generator")
+    parser.add_argument("--backend", choices=["sqlserver", "sqlite"], default="sqlserver",
+                        help="sqlserver uses DB_HOST/DB_NAME/DB_PASS from .env; sqlite is a local stand-in")
+    parser.add_argument("--db", help="sqlite stand-in database file (default: a temporary file)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20, help="target rides per second (0 = as fast as possible)")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--rides", type=int, help="stop after this many rides")
+    parser.add_argument("--retries", type=int, default=3, help="retries per step on deadlock / lock timeout")
+    parser.add_argument("--lock-timeout", type=int, default=5000, help="milliseconds to wait for a lock")
+    parser.add_argument("--offer-mix", type=_mix(OFFER_MIX), default=OFFER_MIX, help="e.g. accepted=7,declined=2,expired=1")
+    parser.add_argument("--ride-mix", type=_mix(RIDE_MIX), default=RIDE_MIX, help="e.g. completed=9,cancelled=1")
+    parser.add_argument("--payment-mix", type=_mix(PAYMENT_MIX), default=PAYMENT_MIX, help="e.g. completed=19,failed=1")
+    parser.add_argument("--rating-rate", type=float, default=RATING_RATE, help="share of completed rides rated")
+    parser.add_argument("--actors", type=int, default=200, help="passengers and drivers to draw from")
+    parser.add_argument("--seed", type=int, default=342)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        path = args.db or os.path.join(tempfile.mkdtemp(), "ride_flow.sqlite")
+        backend = SqliteBackend(path, args.lock_timeout)
+    else:
+        backend = SqlServerBackend(args.lock_timeout)
+    load = RideFlowLoad(backend, args.workers, args.rate, args.retries, args.offer_mix, args.ride_mix,
+                        args.payment_mix, args.rating_rate, args.actors, args.seed)
+    result = load.run(args.seconds, args.rides)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
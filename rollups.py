@@ -0,0 +1,128 @@
+import argparse
+
+from db import connect
+
+# Same definitions as the triggers in Driver-Rollups.sql, computed from scratch
+_DAILY_FROM_BASE = """
+    SELECT DriverUserId, [Day], SUM(Ratings) AS Ratings, SUM(StarsSum) AS StarsSum, SUM(Payments) AS Payments,
+           CAST(SUM(Gross) AS DECIMAL(14,2)) AS Gross, CAST(SUM(Fee) AS DECIMAL(14,2)) AS Fee,
+           CAST(SUM(Payout) AS DECIMAL(14,2)) AS Payout
+    FROM (SELECT r.TargetUserId AS DriverUserId, CAST(r.CreatedAt AS DATE) AS [Day], 1 AS Ratings,
+                 r.Stars AS StarsSum, 0 AS Payments, 0 AS Gross, 0 AS Fee, 0 AS Payout
+          FROM dbo.Rating r WITH (TABLOCK, HOLDLOCK)
+          JOIN dbo.Driver dr ON dr.UserId = r.TargetUserId
+          UNION ALL
+          SELECT p.ReceiverUserId, CAST(p.PaidAt AS DATE), 0, 0, 1, p.GrossAmount, p.OsrhFee, p.DriverPayout
+          FROM {payments} p WITH (TABLOCK, HOLDLOCK)
+          JOIN dbo.Driver dr ON dr.UserId = p.ReceiverUserId
+          WHERE p.[Status] = 'Completed' AND p.PaidAt IS NOT NULL) AS x
+    GROUP BY DriverUserId, [Day]
+"""
+
+_COLUMNS = "DriverUserId, [Day], Ratings, StarsSum, Payments, Gross, Fee, Payout"
+
+
+def _daily_from_base(cur):
+    # Payments moved by archiver.py still count: read live + archived when the archive exists
+    archived = cur.execute("SELECT OBJECT_ID('dbo.PaymentHistory')").fetchone()[0] is not None
+    return _DAILY_FROM_BASE.format(payments="dbo.PaymentHistory" if archived else "dbo.Payment")
+
+
+def rebuild(conn):
+    """Recompute both rollup tables from Rating and Payment in one transaction.
+
+    Shared table locks on the base tables are taken first, so writers (and
+    their triggers) wait until the rebuild commits instead of racing it.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {_COLUMNS} INTO #Rebuilt FROM ({_daily_from_base(cur)}) AS b")
+        cur.execute("DELETE dbo.DriverDailyRollup")
+        cur.execute("DELETE dbo.DriverRollup")
+        cur.execute(f"INSERT dbo.DriverDailyRollup({_COLUMNS}) SELECT {_COLUMNS} FROM #Rebuilt")
+        cur.execute("""
+            INSERT dbo.DriverRollup(DriverUserId, Ratings, StarsSum, Payments, Gross, Fee, Payout)
+            SELECT DriverUserId, SUM(Ratings), SUM(StarsSum), SUM(Payments), SUM(Gross), SUM(Fee), SUM(Payout)
+            FROM #Rebuilt GROUP BY DriverUserId""")
+        drivers = cur.rowcount
+        cur.execute("DROP TABLE #Rebuilt")
+        conn.commit()
+        return drivers
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def verify(conn, limit=20):
+    """Rows where the rollups disagree with the base tables: [(table, side, row)]."""
+    cur = conn.cursor()
+    try:
+        mismatches = []
+        daily = _daily_from_base(cur)
+        checks = [
+            ("DriverDailyRollup", f"SELECT {_COLUMNS} FROM dbo.DriverDailyRollup WHERE Ratings <> 0 OR Payments <> 0",
+             f"SELECT {_COLUMNS} FROM ({daily}) AS b"),
+            ("DriverRollup",
+             """SELECT DriverUserId, Ratings, StarsSum, Payments, Gross, Fee, Payout FROM dbo.DriverRollup
+                WHERE Ratings <> 0 OR Payments <> 0""",
+             f"""SELECT DriverUserId, SUM(Ratings) AS Ratings, SUM(StarsSum) AS StarsSum, SUM(Payments) AS Payments,
+                        SUM(Gross) AS Gross, SUM(Fee) AS Fee, SUM(Payout) AS Payout
+                 FROM ({daily}) AS b GROUP BY DriverUserId"""),
+        ]
+        for table, rollup, base in checks:
+            for side, a, b in (("rollup only", rollup, base), ("base only", base, rollup)):
+                rows = cur.execute(f"SELECT TOP (?) * FROM (({a}) EXCEPT ({b})) AS diff", limit).fetchall()
+                mismatches += [(table, side, tuple(row)) for row in rows]
+        conn.rollback()     # release the shared locks taken by the base query
+        return mismatches
+    finally:
+        cur.close()
+
+
+# ---------- lookups ----------
+def driver_summary(cur, driver_user_id, days=None):
+    """Totals for one driver, plus the last `days` daily rows if requested."""
+    row = cur.execute("""
+        SELECT Ratings, AvgStars, Payments, Gross, Fee, Payout FROM dbo.DriverRollup WHERE DriverUserId = ?""",
+        driver_user_id).fetchone()
+    summary = dict(zip(("ratings", "avg_stars", "payments", "gross", "fee", "payout"),
+                       row or (0, None, 0, 0, 0, 0)))
+    if days:
+        summary["daily"] = [tuple(r) for r in cur.execute("""
+            SELECT [Day], Ratings, StarsSum, Payments, Gross, Fee, Payout FROM dbo.DriverDailyRollup
+            WHERE DriverUserId = ? AND [Day] >= DATEADD(DAY, -?, CAST(SYSUTCDATETIME() AS DATE))
+            ORDER BY [Day] DESC""", driver_user_id, days)]
+    return summary
+
+
+def top_drivers(cur, by="rating", n=10, min_ratings=5):
+    if by == "rating":
+        sql = """SELECT TOP (?) DriverUserId, AvgStars, Ratings FROM dbo.DriverRollup
+                 WHERE Ratings >= ? ORDER BY AvgStars DESC"""
+        return [tuple(r) for r in cur.execute(sql, n, min_ratings)]
+    if by == "payout":
+        sql = "SELECT TOP (?) DriverUserId, Payout, Payments FROM dbo.DriverRollup ORDER BY Payout DESC"
+        return [tuple(r) for r in cur.execute(sql, n)]
+    raise ValueError(f"unknown ranking: {by}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild, verify or query the driver rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from Rating and Payment")
+    parser.add_argument("--verify", action="store_true", help="compare the rollups with the base tables")
+    parser.add_argument("--top", choices=["rating", "payout"], help="print the top 10 drivers")
+    args = parser.parse_args()
+
+    cn = connect(autocommit=False)
+    if args.rebuild:
+        print(f"rebuilt rollups for {rebuild(cn)} drivers")
+    if args.verify:
+        mismatches = verify(cn)
+        for table, side, row in mismatches:
+            print(f"{table}: {side}: {row}")
+        print("rollups match the base tables" if not mismatches else f"{len(mismatches)} mismatching rows")
+    if args.top:
+        for row in top_drivers(cn.cursor(), args.top):
+            print(*row)
@@ -0,0 +1,248 @@
+import argparse
+import functools
+import heapq
+import random
+import time
+
+import numpy as np
+
+from pricing import haversine_km_np
+from spatial_index import ZoneIndex, haversine_km
+
+
+class RoutePlanner:
+    """Shortest bridge sequences over the Geofencezone/Bridge graph.
+
+    Zones are nodes placed at their box centroid; each Bridge is a directed
+    FromZone -> ToZone edge weighted by the centroid distance in km. Queries
+    run A* guided by the straight-line distance and, once build_landmarks()
+    has been called, by landmark (ALT) lower bounds. The bound for every
+    zone is computed in one NumPy pass per query, so a tighter bound costs
+    no more per expanded zone than the plain one. Results are memoised
+    until the graph changes.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.zones = ZoneIndex()
+        self.centroids = {}     # ZoneId -> (lat, lng)
+        self.edges = {}         # ZoneId -> [(ToZone, BridgeId, km)]
+        self.reverse = {}       # ZoneId -> [(FromZone, km)]
+        self.landmarks = []     # landmark ZoneIds
+        self._index = None      # ZoneId -> column in the arrays below
+        self._coords = None     # (lat, lng) arrays of the centroids
+        self._from = None       # landmarks x zones: km from each landmark (inf if unreachable)
+        self._to = None         # landmarks x zones: km to each landmark
+        self.route = functools.lru_cache(maxsize=cache_size)(self._route)
+
+    @classmethod
+    def from_db(cls, cur, landmarks=8):
+        planner = cls()
+        for zone_id, min_lat, min_lng, max_lat, max_lng in cur.execute(
+                "SELECT ZoneId, MinLat, MinLng, MaxLat, MaxLng FROM dbo.Geofencezone"):
+            planner.add_zone(zone_id, min_lat, min_lng, max_lat, max_lng)
+        for bridge_id, from_zone, to_zone in cur.execute("SELECT BridgeId, FromZone, ToZone FROM dbo.Bridge"):
+            planner.add_bridge(bridge_id, from_zone, to_zone)
+        if landmarks:
+            planner.build_landmarks(landmarks)
+        return planner
+
+    # ---------- graph ----------
+    def add_zone(self, zone_id, min_lat, min_lng, max_lat, max_lng):
+        self.zones.upsert(zone_id, min_lat, min_lng, max_lat, max_lng)
+        a, b, c, d = self.zones.zones[zone_id]
+        self.centroids[zone_id] = ((a + c) / 2, (b + d) / 2)
+        self.edges.setdefault(zone_id, [])
+        self.reverse.setdefault(zone_id, [])
+        self._changed()
+
+    def add_bridge(self, bridge_id, from_zone, to_zone):
+        km = haversine_km(*self.centroids[from_zone], *self.centroids[to_zone])
+        self.edges[from_zone].append((to_zone, bridge_id, km))
+        self.reverse[to_zone].append((from_zone, km))
+        self._changed()
+
+    def _changed(self):
+        # Landmark distances, zone arrays and memoised routes are stale once the graph changes
+        self.landmarks = []
+        self._index = self._coords = self._from = self._to = None
+        self.route.cache_clear()
+
+    def _columns(self):
+        if self._index is None:
+            self._index = {zone: i for i, zone in enumerate(self.centroids)}
+            self._coords = tuple(np.array(c, dtype=np.float64) for c in zip(*self.centroids.values()))
+        return self._index
+
+    def _distances(self, source, adjacency):
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            d, zone = heapq.heappop(heap)
+            if d > dist[zone]:
+                continue
+            for edge in adjacency[zone]:
+                nxt, km = edge[0], edge[-1]
+                nd = d + km
+                if nd < dist.get(nxt, float("inf")):
+                    dist[nxt] = nd
+                    heapq.heappush(heap, (nd, nxt))
+        return dist
+
+    def _table(self, source, adjacency):
+        index = self._columns()
+        row = np.full(len(index), np.inf)
+        for zone, km in self._distances(source, adjacency).items():
+            row[index[zone]] = km
+        return row
+
+    def build_landmarks(self, count=8):
+        # Farthest-point selection on the graph itself: start at the zone farthest from an
+        # arbitrary one (the periphery), then keep adding the zone farthest from every landmark
+        # so far. Landmarks "behind" a target give the tightest bounds, and the periphery is
+        # behind most of the graph.
+        self.landmarks, self._from, self._to = [], None, None
+        if not count or not self.centroids:
+            return
+        zones = list(self._columns())
+
+        def spread(f, t):
+            # Round-trip km, counting only the directions that are reachable
+            return np.where(np.isfinite(f), f, 0.0) + np.where(np.isfinite(t), t, 0.0)
+
+        first = zones[0]
+        zone = zones[int(np.argmax(spread(self._table(first, self.edges), self._table(first, self.reverse))))]
+        froms, tos = [], []
+        nearest = np.full(len(zones), np.inf)
+        while len(self.landmarks) < min(count, len(zones)):
+            self.landmarks.append(zone)
+            froms.append(self._table(zone, self.edges))
+            tos.append(self._table(zone, self.reverse))
+            nearest = np.minimum(nearest, spread(froms[-1], tos[-1]))
+            best = int(np.argmax(nearest))
+            if nearest[best] <= 0:
+                break
+            zone = zones[best]
+        self._from, self._to = np.vstack(froms), np.vstack(tos)
+
+    def _heuristic(self, target):
+        """Lower bound on km to `target` for every zone, as a list indexed like _columns()."""
+        index = self._columns()
+        bound = haversine_km_np(*self._coords, *self.centroids[target])
+        if self.landmarks:
+            col = index[target]
+            # d(zone, target) >= d(L, target) - d(L, zone) and >= d(zone, L) - d(target, L); an
+            # infinite bound means the target is unreachable from that zone, inf - inf carries nothing
+            with np.errstate(invalid="ignore"):
+                alt = np.maximum(self._from[:, col:col + 1] - self._from, self._to - self._to[:, col:col + 1])
+            alt[np.isnan(alt)] = 0.0
+            bound = np.maximum(bound, alt.max(axis=0))
+        return bound.tolist()
+
+    # ---------- queries ----------
+    def _route(self, from_zone, to_zone):
+        """Ordered BridgeIds from one zone to another ([] if same zone, None if unreachable)."""
+        if from_zone == to_zone:
+            return []
+        h = self._heuristic(to_zone)
+        index = self._index
+        dist = {from_zone: 0.0}
+        came_from = {}
+        heap = [(h[index[from_zone]], 0.0, from_zone)]
+        while heap:
+            _f, d, zone = heapq.heappop(heap)
+            if zone == to_zone:
+                bridges = []
+                while zone != from_zone:
+                    zone, bridge_id = came_from[zone]
+                    bridges.append(bridge_id)
+                return bridges[::-1]
+            if d > dist[zone]:
+                continue
+            for nxt, bridge_id, km in self.edges[zone]:
+                nd = d + km
+                if nd < dist.get(nxt, float("inf")):
+                    dist[nxt] = nd
+                    came_from[nxt] = (zone, bridge_id)
+                    heapq.heappush(heap, (nd + h[index[nxt]], nd, nxt))
+        return None
+
+    def zone_for(self, lat, lng):
+        # Zone containing the point, or the one with the closest centroid
+        hits = self.zones.zones_at(float(lat), float(lng))
+        if hits:
+            return hits[0]
+        return min(self.centroids, key=lambda z: haversine_km(float(lat), float(lng), *self.centroids[z]))
+
+    def itinerary_rows(self, request_id, from_zone, to_zone, new_leg_id):
+        """ItineraryLeg rows (LegId, SeqNo, ViaBridgeId, RideRequestId) and LegCrossesBridge rows."""
+        bridges = self.route(from_zone, to_zone)
+        if bridges is None:
+            return None
+        legs, crossings = [], []
+        for seq, bridge_id in enumerate(bridges or [None], 1):
+            leg_id = new_leg_id()
+            legs.append((leg_id, seq, bridge_id, request_id))
+            if bridge_id is not None:
+                crossings.append((leg_id, bridge_id))
+        return legs, crossings
+
+
+# ---------- benchmark ----------
+def synthetic_grid(side, drop=0.2, seed=342):
+    # side x side zones, bridges between neighbours in both directions, some removed
+    rng = random.Random(seed)
+    planner = RoutePlanner(cache_size=0)
+    cell = 0.02
+    for r in range(side):
+        for c in range(side):
+            planner.add_zone(r * side + c, 34.0 + r * cell, 32.0 + c * cell,
+                             34.0 + (r + 1) * cell, 32.0 + (c + 1) * cell)
+    bridge_id = 0
+    for r in range(side):
+        for c in range(side):
+            for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+                rr, cc = r + dr, c + dc
+                if 0 <= rr < side and 0 <= cc < side and rng.random() >= drop:
+                    bridge_id += 1
+                    planner.add_bridge(bridge_id, r * side + c, rr * side + cc)
+    return planner
+
+
+def benchmark(side, num_queries, landmarks, seed=342):
+    planner = synthetic_grid(side, seed=seed)
+    rng = random.Random(seed)
+    pairs = [(rng.randrange(side * side), rng.randrange(side * side)) for _ in range(num_queries)]
+    print(f"{side * side} zones, {sum(len(e) for e in planner.edges.values())} bridges, {num_queries} queries")
+
+    started = time.perf_counter()
+    planner.build_landmarks(0)
+    for a, b in pairs:
+        planner.route(a, b)
+    astar = time.perf_counter() - started
+    print(f"A* (haversine)        {astar / num_queries * 1e3:8.3f} ms/query")
+
+    started = time.perf_counter()
+    planner.build_landmarks(landmarks)
+    print(f"landmark tables ({landmarks})   {time.perf_counter() - started:8.3f} s to build")
+    started = time.perf_counter()
+    for a, b in pairs:
+        planner.route(a, b)
+    alt = time.perf_counter() - started
+    print(f"A* + landmarks (ALT)  {alt / num_queries * 1e3:8.3f} ms/query   x{astar / alt:.1f}")
+
+    planner.route = functools.lru_cache(maxsize=None)(planner._route)
+    for a, b in pairs:
+        planner.route(a, b)
+    started = time.perf_counter()
+    for a, b in pairs:
+        planner.route(a, b)
+    print(f"memoised repeat       {(time.perf_counter() - started) / num_queries * 1e3:8.3f} ms/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bridge routing over a synthetic zone grid")
+    parser.add_argument("--side", type=int, default=100, help="grid is side x side zones")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--landmarks", type=int, default=8)
+    args = parser.parse_args()
+    benchmark(args.side, args.queries, args.landmarks)
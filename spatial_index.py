@@ -0,0 +1,224 @@
+import argparse
+import heapq
+import math
+import random
+import time
+
+# Grid cell size in degrees (~1.1 km of latitude); zones and points are bucketed by cell
+CELL_SIZE = 0.01
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _cell(lat, lng, size):
+    return (math.floor(lat / size), math.floor(lng / size))
+
+
+def _cells_in_box(min_lat, min_lng, max_lat, max_lng, size):
+    r0, c0 = _cell(min_lat, min_lng, size)
+    r1, c1 = _cell(max_lat, max_lng, size)
+    for r in range(r0, r1 + 1):
+        for c in range(c0, c1 + 1):
+            yield (r, c)
+
+
+class ZoneIndex:
+    """Uniform grid over Geofencezone boxes for point-in-zone lookups."""
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.zones = {}     # ZoneId -> (min_lat, min_lng, max_lat, max_lng)
+        self._grid = {}     # cell -> {ZoneId}
+        self.loaded_at = None
+
+    @classmethod
+    def from_db(cls, cur, cell_size=CELL_SIZE):
+        index = cls(cell_size)
+        index.loaded_at = cur.execute("SELECT SYSUTCDATETIME()").fetchone()[0]
+        for zone_id, min_lat, min_lng, max_lat, max_lng in cur.execute(
+                "SELECT ZoneId, MinLat, MinLng, MaxLat, MaxLng FROM dbo.Geofencezone"):
+            index.upsert(zone_id, min_lat, min_lng, max_lat, max_lng)
+        return index
+
+    def refresh(self, cur):
+        # Re-read only zones created/updated since the last load, then drop deleted ones
+        now = cur.execute("SELECT SYSUTCDATETIME()").fetchone()[0]
+        for zone_id, min_lat, min_lng, max_lat, max_lng in cur.execute(
+                """SELECT ZoneId, MinLat, MinLng, MaxLat, MaxLng FROM dbo.Geofencezone
+                   WHERE COALESCE(UpdatedAt, CreatedAt) >= ?""", self.loaded_at):
+            self.upsert(zone_id, min_lat, min_lng, max_lat, max_lng)
+        live = {row[0] for row in cur.execute("SELECT ZoneId FROM dbo.Geofencezone")}
+        for zone_id in [z for z in self.zones if z not in live]:
+            self.remove(zone_id)
+        self.loaded_at = now
+
+    def upsert(self, zone_id, min_lat, min_lng, max_lat, max_lng):
+        if zone_id in self.zones:
+            self.remove(zone_id)
+        box = (float(min_lat), float(min_lng), float(max_lat), float(max_lng))
+        self.zones[zone_id] = box
+        for cell in _cells_in_box(*box, self.cell_size):
+            self._grid.setdefault(cell, set()).add(zone_id)
+
+    def remove(self, zone_id):
+        box = self.zones.pop(zone_id, None)
+        if box is None:
+            return
+        for cell in _cells_in_box(*box, self.cell_size):
+            bucket = self._grid.get(cell)
+            if bucket:
+                bucket.discard(zone_id)
+                if not bucket:
+                    del self._grid[cell]
+
+    def zones_at(self, lat, lng):
+        # Boxes are inclusive on every edge, matching a BETWEEN query
+        hits = []
+        for zone_id in self._grid.get(_cell(lat, lng, self.cell_size), ()):
+            min_lat, min_lng, max_lat, max_lng = self.zones[zone_id]
+            if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+                hits.append(zone_id)
+        return hits
+
+
+class PointIndex:
+    """Uniform grid over moving points (e.g. VehicleLocationLive)."""
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.points = {}    # id -> (lat, lng)
+        self._grid = {}     # cell -> {id}
+
+    @classmethod
+    def from_db(cls, cur, cell_size=CELL_SIZE):
+        index = cls(cell_size)
+        for vehicle_id, lat, lng in cur.execute("SELECT VehicleId, Lat, Lng FROM dbo.VehicleLocationLive"):
+            index.move(vehicle_id, lat, lng)
+        return index
+
+    def move(self, point_id, lat, lng):
+        lat, lng = float(lat), float(lng)
+        cell = _cell(lat, lng, self.cell_size)
+        old = self.points.get(point_id)
+        if old is not None:
+            old_cell = _cell(*old, self.cell_size)
+            if old_cell != cell:
+                self._discard(old_cell, point_id)
+        self.points[point_id] = (lat, lng)
+        self._grid.setdefault(cell, set()).add(point_id)
+
+    def remove(self, point_id):
+        old = self.points.pop(point_id, None)
+        if old is not None:
+            self._discard(_cell(*old, self.cell_size), point_id)
+
+    def _discard(self, cell, point_id):
+        bucket = self._grid.get(cell)
+        if bucket:
+            bucket.discard(point_id)
+            if not bucket:
+                del self._grid[cell]
+
+    def in_box(self, min_lat, min_lng, max_lat, max_lng):
+        hits = []
+        for cell in _cells_in_box(min_lat, min_lng, max_lat, max_lng, self.cell_size):
+            for point_id in self._grid.get(cell, ()):
+                lat, lng = self.points[point_id]
+                if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+                    hits.append(point_id)
+        return hits
+
+    def in_zone(self, zones, zone_id):
+        return self.in_box(*zones.zones[zone_id])
+
+    def nearest(self, lat, lng, k, accept=None, max_km=50.0):
+        """k nearest points as [(id, km)], closest first, skipping ids `accept` rejects.
+
+        Searches rings of cells outwards from the query cell and stops once no
+        unvisited cell can hold anything closer than the current k-th hit.
+        """
+        lat, lng = float(lat), float(lng)
+        size = self.cell_size
+        coslat = math.cos(math.radians(lat))
+        row0, col0 = _cell(lat, lng, size)
+        max_rings = int(max_km / (111.2 * size * coslat)) + 1
+        best = []   # max-heap of (-scaled distance^2, id)
+
+        for ring in range(max_rings + 1):
+            if ring:
+                # Anything outside rings 0..ring-1 is at least (ring-1) cells away on one axis
+                bound = (ring - 1) * size * coslat
+                if len(best) == k and -best[0][0] <= bound * bound:
+                    break
+            for r in range(row0 - ring, row0 + ring + 1):
+                edge = r in (row0 - ring, row0 + ring)
+                cols = range(col0 - ring, col0 + ring + 1) if edge else (col0 - ring, col0 + ring)
+                for c in cols:
+                    for point_id in self._grid.get((r, c), ()):
+                        if accept is not None and not accept(point_id):
+                            continue
+                        plat, plng = self.points[point_id]
+                        d2 = (plat - lat) ** 2 + ((plng - lng) * coslat) ** 2
+                        if len(best) < k:
+                            heapq.heappush(best, (-d2, point_id))
+                        elif d2 < -best[0][0]:
+                            heapq.heapreplace(best, (-d2, point_id))
+
+        hits = [(point_id, haversine_km(lat, lng, *self.points[point_id])) for _d, point_id in best]
+        return sorted((h for h in hits if h[1] <= max_km), key=lambda h: h[1])
+
+
+# ---------- benchmark ----------
+def _naive_zones_at(zones, lat, lng):
+    return [z for z, (a, b, c, d) in zones.items() if a <= lat <= c and b <= lng <= d]
+
+
+def _naive_in_zone(points, box):
+    a, b, c, d = box
+    return [p for p, (lat, lng) in points.items() if a <= lat <= c and b <= lng <= d]
+
+
+def benchmark(num_zones, num_vehicles, num_queries, seed=342):
+    rng = random.Random(seed)
+    # Synthetic zones and vehicles spread over Cyprus
+    lat0, lat1, lng0, lng1 = 34.55, 35.70, 32.25, 34.60
+    zones, vehicles = ZoneIndex(), PointIndex()
+    for zone_id in range(num_zones):
+        lat, lng = rng.uniform(lat0, lat1), rng.uniform(lng0, lng1)
+        zones.upsert(zone_id, lat, lng, lat + rng.uniform(0.002, 0.03), lng + rng.uniform(0.002, 0.03))
+    for vehicle_id in range(num_vehicles):
+        vehicles.move(vehicle_id, rng.uniform(lat0, lat1), rng.uniform(lng0, lng1))
+
+    points = [(rng.uniform(lat0, lat1), rng.uniform(lng0, lng1)) for _ in range(num_queries)]
+    zone_ids = [rng.randrange(num_zones) for _ in range(max(1, num_queries // 10))]
+
+    def timed(label, fn, items):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<28}{len(items):>8} queries {elapsed:>9.3f}s {elapsed / len(items) * 1e6:>10.1f} us/query")
+        return elapsed
+
+    print(f"{num_zones} zones, {num_vehicles} vehicles, cell size {zones.cell_size}")
+    naive = timed("point-in-zone (scan)", lambda p: _naive_zones_at(zones.zones, *p), points)
+    fast = timed("point-in-zone (grid)", lambda p: zones.zones_at(*p), points)
+    print(f"  speed-up x{naive / fast:.0f}")
+    naive = timed("zone contents (scan)", lambda z: _naive_in_zone(vehicles.points, zones.zones[z]), zone_ids)
+    fast = timed("zone contents (grid)", lambda z: vehicles.in_zone(zones, z), zone_ids)
+    print(f"  speed-up x{naive / fast:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the zone/vehicle grid against a full scan")
+    parser.add_argument("--zones", type=int, default=10_000)
+    parser.add_argument("--vehicles", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+    benchmark(args.zones, args.vehicles, args.queries)
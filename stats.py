@@ -0,0 +1,15 @@
+import math
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list (0.0 if empty).
+
+    The smallest value with at least `pct` percent of the samples at or
+    below it: index ceil(pct * n / 100) - 1, so p50 of five samples is the
+    third one.
+    """
+    if not sorted_values:
+        return 0.0
+    # pct * n first: pct / 100 * n picks up float noise (7 / 100 * 100 > 7) and ceil skips a rank
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[index]